@@ -0,0 +1,391 @@
+"""Capture-overhead benchmarks for tracelight.
+
+Measures latency (perf_counter), peak and retained memory (tracemalloc) and
+allocated memory blocks (sys.getallocatedblocks) of log_exception_state, traced, traced_tool and format_for_agent over a matrix
+of stack depths, locals per frame and payload types, plus the success-path
+overhead of the decorators. Results are written as JSON so a later run can be
+compared against a stored baseline.
+
+Usage:
+    python benchmarks/bench_capture.py --output baseline.json
+    python benchmarks/bench_capture.py --quick --baseline baseline.json
+"""
+
+import argparse
+import dataclasses
+import gc
+import json
+import logging
+import platform
+import statistics
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional
+
+# Add the src directory to the Python path if not already there (for local development)
+src_path = Path(__file__).resolve().parent.parent / 'src'
+if str(src_path) not in sys.path:
+    sys.path.insert(0, str(src_path))
+
+import tracelight
+from tracelight import log_exception_state, trace_class, traced
+from tracelight.agent_utils import format_for_agent, traced_tool
+
+RESULT_FORMAT = 1
+
+# Calls per timed sample of the per-call cases; one call is too short to time
+CALLS_PER_SAMPLE = 1000
+
+
+class _FormattingHandler(logging.Handler):
+    """Formats every record like a real handler would, then discards it."""
+
+    def emit(self, record: logging.LogRecord) -> None:
+        self.format(record)
+
+
+def _make_logger() -> logging.Logger:
+    logger = logging.getLogger("tracelight.benchmark")
+    logger.handlers[:] = [_FormattingHandler()]
+    logger.propagate = False
+    logger.setLevel(logging.DEBUG)
+    return logger
+
+
+class SlowRepr:
+    """Object whose repr does real work, like an ORM row or a large array."""
+
+    def __init__(self, size: int):
+        self.size = size
+
+    def __repr__(self) -> str:
+        return "SlowRepr(" + ",".join(str(i * i) for i in range(self.size)) + ")"
+
+
+@dataclasses.dataclass
+class Record:
+    id: int
+    name: str
+    tags: List[str]
+    attributes: Dict[str, int]
+
+
+def _nested_dict(depth: int, width: int) -> Dict[str, Any]:
+    if depth == 0:
+        return {"leaf": list(range(width))}
+    return {f"k{i}": _nested_dict(depth - 1, width) for i in range(width)}
+
+
+def _pydantic_model() -> Any:
+    try:
+        import pydantic
+    except ImportError:
+        return None
+
+    class Order(pydantic.BaseModel):
+        id: int
+        items: List[str]
+        totals: Dict[str, float]
+
+    return Order(id=1, items=[f"item-{i}" for i in range(100)],
+                 totals={f"t{i}": float(i) for i in range(50)})
+
+
+def payloads() -> Dict[str, Any]:
+    """Payload types placed in every benchmarked frame; None if unavailable."""
+    return {
+        "small": 42,
+        "big_list": list(range(100_000)),
+        "nested_dict": _nested_dict(4, 6),
+        "dataclass": Record(1, "x" * 100, ["a"] * 100, {str(i): i for i in range(100)}),
+        "pydantic": _pydantic_model(),
+        "slow_repr": SlowRepr(20_000),
+    }
+
+
+def _frame_function(locals_per_frame: int) -> Callable[[int, Any], Any]:
+    """Build a recursive function whose frames hold `locals_per_frame` locals."""
+    lines = ["def frame_function(depth, payload):"]
+    lines.append("    value = payload")
+    for i in range(max(0, locals_per_frame - 3)):
+        lines.append(f"    local_{i} = {i} * depth")
+    lines.append("    if depth <= 1:")
+    lines.append("        raise ValueError('benchmark failure')")
+    lines.append("    return frame_function(depth - 1, payload)")
+    namespace: Dict[str, Any] = {}
+    exec(compile("\n".join(lines), "<benchmark>", "exec"), namespace)
+    return namespace["frame_function"]
+
+
+def _measure(func: Callable[[], Any], iterations: int, memory_iterations: int) -> Dict[str, Any]:
+    """Time `func` and measure its memory and allocated blocks (in separate runs)."""
+    func()  # warm caches
+    timings = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        func()
+        timings.append((time.perf_counter() - start) * 1e6)
+
+    peaks = []
+    retained = []
+    for _ in range(memory_iterations):
+        tracemalloc.start()
+        try:
+            before = tracemalloc.get_traced_memory()[0]
+            func()
+            current, peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+        peaks.append(peak - before)
+        retained.append(current - before)
+
+    # Blocks a call leaves allocated, cyclic garbage included: the cyclic GC
+    # is paused so a collection can't free earlier garbage mid-call
+    blocks = []
+    for _ in range(memory_iterations):
+        gc.collect()
+        gc.disable()
+        try:
+            before = sys.getallocatedblocks()
+            func()
+            blocks.append(sys.getallocatedblocks() - before)
+        finally:
+            gc.enable()
+    gc.collect()
+
+    timings.sort()
+    return {
+        "latency_us": {
+            "min": timings[0],
+            "median": statistics.median(timings),
+            "p95": timings[min(len(timings) - 1, int(len(timings) * 0.95))],
+            "mean": statistics.fmean(timings) if hasattr(statistics, "fmean")
+            else statistics.mean(timings),
+        },
+        "peak_bytes": int(statistics.median(peaks)),
+        "retained_bytes": int(statistics.median(retained)),
+        "allocated_blocks": int(statistics.median(blocks)),
+        "iterations": iterations,
+    }
+
+
+def _failure_cases(depth: int, locals_per_frame: int, payload: Any,
+                   logger: logging.Logger) -> Dict[str, Callable[[], Any]]:
+    frame_function = _frame_function(locals_per_frame)
+
+    def run_log_exception_state():
+        try:
+            frame_function(depth, payload)
+        except ValueError as e:
+            log_exception_state(e, logger)
+
+    def run_log_exception_state_batched():
+        try:
+            frame_function(depth, payload)
+        except ValueError as e:
+            log_exception_state(e, logger, batched=True)
+
+    def run_format_for_agent():
+        try:
+            frame_function(depth, payload)
+        except ValueError as e:
+            log_exception_state(e, logger, format_var=format_for_agent)
+
+    traced_function = traced(logger=logger, reraise=False)(frame_function)
+    tool_function = traced_tool(logger=logger)(frame_function)
+
+    return {
+        "log_exception_state": run_log_exception_state,
+        "log_exception_state_batched": run_log_exception_state_batched,
+        "format_for_agent": run_format_for_agent,
+        "traced": lambda: traced_function(depth, payload),
+        "traced_tool": lambda: tool_function(depth, payload),
+    }
+
+
+def _success_cases(logger: logging.Logger) -> Dict[str, Callable[[], Any]]:
+    def add(a, b):
+        return a + b
+
+    traced_add = traced(logger=logger)(add)
+    tool_add = traced_tool(logger=logger)(add)
+    return {
+        "success_plain": lambda: add(1, 2),
+        "success_traced": lambda: traced_add(1, 2),
+        "success_traced_tool": lambda: tool_add(1, 2),
+    }
+
+
+class _Service:
+    def handle(self, request, retries=3, *, timeout=None):
+        return request
+
+
+def _per_call_cases(logger: logging.Logger) -> Dict[str, Any]:
+    """Undecorated and traced versions of a call, by signature shape."""
+    def add(a, b):
+        return a + b
+
+    def flexible(*args, **kwargs):
+        return args
+
+    class Service(_Service):
+        handle = _Service.handle
+
+    trace_class(Service, logger=logger, specialize=True)
+    return {
+        "positional": (add, traced(logger=logger)(add), lambda f: f(1, 2)),
+        "positional_specialized": (add, traced(logger=logger, specialize=True)(add),
+                                   lambda f: f(1, 2)),
+        "varargs": (flexible, traced(logger=logger)(flexible), lambda f: f(1, 2, key=3)),
+        "trace_class_method": (_Service().handle, Service().handle,
+                               lambda f: f("request", timeout=1.0)),
+    }
+
+
+def _per_call_loop(func: Callable[..., Any], call: Callable[[Any], Any]) -> Callable[[], Any]:
+    calls = range(CALLS_PER_SAMPLE)
+
+    def loop():
+        for _ in calls:
+            call(func)
+    return loop
+
+
+def run(quick: bool = False,
+        iterations: Optional[int] = None,
+        name_filter: Optional[str] = None) -> Dict[str, Any]:
+    """
+    Run the benchmark matrix.
+
+    Args:
+        quick: Use a reduced matrix and fewer iterations.
+        iterations: Timed iterations per case (overrides the default).
+        name_filter: Only run cases whose key contains this text.
+
+    Returns:
+        The machine-readable results document.
+    """
+    logger = _make_logger()
+    depths = [1, 10] if quick else [1, 10, 50]
+    locals_counts = [5] if quick else [5, 50]
+    iterations = iterations or (20 if quick else 100)
+    memory_iterations = 3 if quick else 5
+
+    results: List[Dict[str, Any]] = []
+
+    def record(key: str, params: Dict[str, Any], func: Callable[[], Any], count: int) -> None:
+        if name_filter and name_filter not in key:
+            return
+        entry = {"key": key, "params": params}
+        entry.update(_measure(func, count, memory_iterations))
+        results.append(entry)
+
+    for name, func in _success_cases(logger).items():
+        record(name, {"target": name}, func, iterations * 100)
+
+    for shape, (plain, wrapped, call) in _per_call_cases(logger).items():
+        measured = {}
+        for variant, func in (("plain", plain), ("traced", wrapped)):
+            before = len(results)
+            record(f"per_call/{shape}/{variant}",
+                   {"target": "per_call", "shape": shape, "variant": variant,
+                    "calls": CALLS_PER_SAMPLE},
+                   _per_call_loop(func, call), iterations)
+            if len(results) > before:
+                entry = measured[variant] = results[-1]
+                entry["per_call_ns"] = entry["latency_us"]["median"] * 1000 / CALLS_PER_SAMPLE
+        if len(measured) == 2:
+            # Cost the wrapper adds to each successful call
+            measured["traced"]["overhead_ns"] = (measured["traced"]["per_call_ns"]
+                                                 - measured["plain"]["per_call_ns"])
+
+    for payload_name, payload in payloads().items():
+        if payload is None:
+            continue
+        for depth in depths:
+            for locals_per_frame in locals_counts:
+                cases = _failure_cases(depth, locals_per_frame, payload, logger)
+                for target, func in cases.items():
+                    params = {"target": target, "payload": payload_name,
+                              "depth": depth, "locals": locals_per_frame}
+                    key = f"{target}/{payload_name}/depth={depth}/locals={locals_per_frame}"
+                    record(key, params, func, iterations)
+
+    return {
+        "format": RESULT_FORMAT,
+        "tracelight": tracelight.__version__,
+        "python": platform.python_version(),
+        "implementation": platform.python_implementation(),
+        "platform": platform.platform(),
+        "timestamp": time.time(),
+        "quick": quick,
+        "results": results,
+    }
+
+
+def compare(current: Dict[str, Any], baseline: Dict[str, Any],
+            threshold: float = 1.25) -> List[Dict[str, Any]]:
+    """
+    Compare median latency and peak memory of matching cases.
+
+    Args:
+        current: Results of this run.
+        baseline: Stored results of an earlier run.
+        threshold: Ratio above which a case counts as a regression.
+
+    Returns:
+        One entry per case present in both runs, with its ratios and
+        whether it regressed.
+    """
+    previous = {entry["key"]: entry for entry in baseline.get("results", [])}
+    rows = []
+    for entry in current["results"]:
+        old = previous.get(entry["key"])
+        if old is None:
+            continue
+        latency_ratio = entry["latency_us"]["median"] / max(old["latency_us"]["median"], 1e-9)
+        peak_ratio = entry["peak_bytes"] / max(old["peak_bytes"], 1)
+        rows.append({
+            "key": entry["key"],
+            "latency_ratio": latency_ratio,
+            "peak_ratio": peak_ratio,
+            "regressed": latency_ratio > threshold or peak_ratio > threshold,
+        })
+    return rows
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--quick", action="store_true", help="reduced matrix")
+    parser.add_argument("--iterations", type=int, help="timed iterations per case")
+    parser.add_argument("--filter", dest="name_filter", help="only run matching cases")
+    parser.add_argument("--output", help="write results JSON to this file")
+    parser.add_argument("--baseline", help="compare against a results JSON file")
+    parser.add_argument("--threshold", type=float, default=1.25,
+                        help="ratio counted as a regression (default 1.25)")
+    args = parser.parse_args(argv)
+
+    results = run(quick=args.quick, iterations=args.iterations, name_filter=args.name_filter)
+    document = json.dumps(results, indent=2)
+    if args.output:
+        Path(args.output).write_text(document + "\n")
+    else:
+        print(document)
+
+    if args.baseline:
+        baseline = json.loads(Path(args.baseline).read_text())
+        rows = compare(results, baseline, args.threshold)
+        for row in rows:
+            flag = "REGRESSED" if row["regressed"] else "ok"
+            print(f"{row['latency_ratio']:6.2f}x time {row['peak_ratio']:6.2f}x peak  "
+                  f"{flag:9}  {row['key']}", file=sys.stderr)
+        if any(row["regressed"] for row in rows):
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -5,8 +5,35 @@ traceback, giving you instant insight into what went wrong without having to add
 statements or run in debug mode.
 """
 
-from tracelight.core import log_exception_state, TracedError
+from tracelight.core import (log_exception_state, log_exception_state_async, TracedError,
+                             capture_snapshot, log_snapshot, ExceptionSnapshot,
+                             clear_exception_frames, snapshot_of)
+from tracelight.aggregate import SnapshotAggregator, send_snapshot
+from tracelight.background import BackgroundEmitter
+from tracelight.buffer import SnapshotBuffer
+from tracelight.budget import summarize_for_agent, summarize_snapshot
+from tracelight.detach import SnapshotLimits
+from tracelight.fingerprint import RateLimiter, exception_fingerprint
+from tracelight.formatting import format_traceback
+from tracelight.frames import FrameFilter
+from tracelight.metrics import stats, export_prometheus
+from tracelight.jsonl import JsonLinesWriter
+from tracelight.redaction import RedactionPolicy
+from tracelight.sampling import AdaptiveSampler
+from tracelight.source import SourceCache
+from tracelight.serializers import SerializerRegistry, register_serializer
 from tracelight.decorators import traced
+from tracelight.hooks import install, uninstall
+from tracelight.instrument import trace_class, trace_module
+from tracelight.bounded_repr import bounded_repr
 
 __version__ = "0.1.3"
-__all__ = ["log_exception_state", "TracedError", "traced"]
+__all__ = ["log_exception_state", "log_exception_state_async", "TracedError", "traced",
+           "bounded_repr", "capture_snapshot", "log_snapshot", "ExceptionSnapshot",
+           "BackgroundEmitter", "RateLimiter", "exception_fingerprint",
+           "SerializerRegistry", "register_serializer", "FrameFilter",
+           "JsonLinesWriter", "SnapshotLimits", "clear_exception_frames",
+           "format_traceback", "SourceCache", "stats", "export_prometheus",
+           "RedactionPolicy", "snapshot_of", "SnapshotAggregator", "send_snapshot",
+           "SnapshotBuffer", "AdaptiveSampler", "install", "uninstall",
+           "trace_class", "trace_module", "summarize_for_agent", "summarize_snapshot"]
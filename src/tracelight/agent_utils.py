@@ -1,9 +1,21 @@
+import asyncio
 import logging
 import functools
-import traceback
-from typing import Any, Dict, Callable, TypeVar, Optional, List, Union, cast
+import inspect
+import threading
+from typing import Any, Dict, Callable, TypeVar, Optional, List, Tuple, Union, cast
 
-from tracelight.core import log_exception_state
+from tracelight.background import BackgroundEmitter
+from tracelight.budget import _SUMMARY_OPTIONS, budget_bytes, budget_error, summarize_snapshot
+from tracelight.buffer import SnapshotBuffer
+from tracelight.core import (ExceptionSnapshot, capture_snapshot, _render_snapshot,
+                             _emit_records, _split_options)
+from tracelight.fingerprint import RateLimiter
+from tracelight.detach import SnapshotLimits
+from tracelight.formatting import format_traceback
+from tracelight.frames import FrameFilter
+from tracelight.redaction import RedactionPolicy
+from tracelight.sampling import AdaptiveSampler
 
 # Type variable for generic function
 F = TypeVar('F', bound=Callable[..., Any])
@@ -11,19 +23,61 @@ F = TypeVar('F', bound=Callable[..., Any])
 def traced_tool(logger: Optional[logging.Logger] = None,
                 level: int = logging.ERROR,
                 max_var_length: int = 1000,
-                exclude_vars: Optional[List[str]] = None) -> Callable[[F], F]:
+                exclude_vars: Optional[List[str]] = None,
+                batched: bool = False,
+                emitter: Optional[BackgroundEmitter] = None,
+                rate_limiter: Optional[RateLimiter] = None,
+                relevant_locals: bool = False,
+                frame_filter: Optional[FrameFilter] = None,
+                limits: Optional[SnapshotLimits] = None,
+                release_frames: bool = False,
+                source_context: Optional[int] = None,
+                redaction: Optional[RedactionPolicy] = None,
+                buffer: Optional[SnapshotBuffer] = None,
+                sampler: Optional[AdaptiveSampler] = None,
+                max_bytes: Optional[int] = None,
+                max_tokens: Optional[int] = None,
+                lazy: bool = False) -> Callable[[F], F]:
     """
     Decorator for agent tool functions that ensures they return a response dict
     with detailed error information when exceptions occur.
     
     Perfect for wrapping MCP Server tool implementations to ensure they never
-    crash the agent and always return useful debugging information.
+    crash the agent and always return useful debugging information. Works on
+    both regular and ``async def`` tools; for coroutine functions the error
+    capture and serialization run in the event loop's default executor.
     
     Args:
         logger: Logger to use (creates one if None)
         level: Log level to use
         max_var_length: Maximum length for variable representations
         exclude_vars: Variable names to exclude from logs
+        batched: Emit each trace as a single log record (see log_exception_state)
+        emitter: BackgroundEmitter that performs the log formatting and handler
+                 I/O on its worker thread (the response data is still built inline)
+        rate_limiter: RateLimiter that skips the full capture of repeated
+                      failures (the response then has no frames)
+        relevant_locals: Only capture arguments and variables used around the
+                         failing line of each frame
+        frame_filter: FrameFilter selecting which frames keep their locals
+        limits: SnapshotLimits bounding the copies of captured locals
+        release_frames: Clear the traceback's frame locals after capture, so
+                        handled exceptions don't linger in reference cycles
+        source_context: Log the failing source line of each frame with this
+                        many lines of context (None for no source)
+        redaction: RedactionPolicy hiding secrets in captured names and values;
+                   build it once and share it between decorators
+        buffer: SnapshotBuffer keeping recent snapshots for later queries
+        sampler: AdaptiveSampler lowering the captured detail (frames only, or
+                 just a count) while exceptions are frequent
+        max_bytes: Budget for the error details in the response, in bytes of
+                   JSON, spent on the innermost frame, the arguments and the
+                   failing line's variables first (see summarize_snapshot);
+                   the log output is not affected
+        max_tokens: The same budget in approximate LLM tokens
+        lazy: Return failures as a ToolErrorResponse, whose `summary` is
+              available at once and whose to_dict() renders the error
+              response below only when called
         
     Return value format on success:
         {"status": "success", "result": <original return value>}
@@ -36,54 +90,202 @@ def traced_tool(logger: Optional[logging.Logger] = None,
             "traceback": "Formatted traceback",
             # Detailed error data directly available at root level
             "frames": [...],  # Detailed frame info with locals
+            "fingerprint": "...",  # Identifies repeated failures
         }
+
+        With a budget, the locals are strings and a "budget" entry reports
+        what was left out.
     """
     _logger = logger or logging.getLogger(__name__)
-    _exclude_vars = exclude_vars or []
+    _capture_kwargs = {
+        "max_var_length": max_var_length,
+        "exclude_vars": tuple(exclude_vars or ()),
+        "batched": batched,
+        "rate_limiter": rate_limiter,
+        "relevant_locals": relevant_locals,
+        "frame_filter": frame_filter,
+        "limits": limits,
+        "release_frames": release_frames,
+        "source_context": source_context,
+        "redaction": redaction,
+        "buffer": buffer,
+        "sampler": sampler,
+    }
+    _budget = budget_bytes(max_bytes, max_tokens)
     
     def decorator(func: F) -> F:
+        if inspect.iscoroutinefunction(func):
+            @functools.wraps(func)
+            async def async_wrapper(*args: Any, **kwargs: Any) -> Any:
+                try:
+                    result = await func(*args, **kwargs)
+                except Exception as e:
+                    # Capture and serialization run off the event loop
+                    loop = asyncio.get_running_loop()
+                    return await loop.run_in_executor(
+                        None,
+                        functools.partial(_error_response, e, _logger, level, _capture_kwargs, emitter,
+                                          _budget, lazy))
+                return _success_response(result)
+
+            return cast(F, async_wrapper)
+
         @functools.wraps(func)
-        def wrapper(*args: Any, **kwargs: Any) -> Dict[str, Any]:
+        def wrapper(*args: Any, **kwargs: Any) -> Any:
             try:
                 result = func(*args, **kwargs)
-                # If already a dict with status, return as is
-                if isinstance(result, dict) and "status" in result:
-                    return result
-                # Otherwise wrap the result
-                return {"status": "success", "result": result}
             except Exception as e:
-                # Get the detailed state data from log_exception_state
-                error_data = log_exception_state(
-                    e, 
-                    _logger, 
-                    level, 
-                    max_var_length=max_var_length,
-                    exclude_vars=_exclude_vars
-                )
-                
-                # Make sure error_data is not None before proceeding
-                if error_data is None:
-                    error_data = {
-                        "error_type": type(e).__name__,
-                        "error": str(e),
-                        "frames": []
-                    }
+                return _error_response(e, _logger, level, _capture_kwargs, emitter, _budget,
+                                       lazy)
+            return _success_response(result)
                 
-                # Return a structured error response with complete error data
-                # Merge the error_data directly into the response for easier access
+        return cast(F, wrapper)
+    return decorator
+
+
+def _success_response(result: Any) -> Dict[str, Any]:
+    """Wrap a tool's return value in the success response format."""
+    # If already a dict with status, return as is
+    if isinstance(result, dict) and "status" in result:
+        return result
+    # Otherwise wrap the result
+    return {"status": "success", "result": result}
+
+
+def _error_response(e: Exception,
+                    logger: logging.Logger,
+                    level: int,
+                    capture_kwargs: Dict[str, Any],
+                    emitter: Optional[BackgroundEmitter] = None,
+                    budget: Optional[int] = None,
+                    lazy: bool = False) -> Union[Dict[str, Any], "ToolErrorResponse"]:
+    """Capture a tool failure, log it and return the error response for it."""
+    snapshot_kwargs, render_kwargs = _split_options(capture_kwargs)
+    snapshot = capture_snapshot(e, **snapshot_kwargs)
+    batched = render_kwargs.pop("batched", False)
+    response = ToolErrorResponse(snapshot, render_kwargs, budget)
+    if emitter is not None:
+        # The log job and the response share one rendering, done by whichever
+        # needs it first
+        response._log_pending = emitter.submit(response._emit, logger, level, batched)
+    elif _is_enabled(logger, level):
+        response._emit(logger, level, batched)
+    return response if lazy else response.to_dict()
+
+
+def _is_enabled(logger: logging.Logger, level: int) -> bool:
+    is_enabled_for = getattr(logger, "isEnabledFor", None)
+    return is_enabled_for is None or is_enabled_for(level)
+
+
+class ToolErrorResponse:
+    """Failure of a traced_tool(lazy=True) call whose details render on demand.
+
+    `summary` is a plain dict with "status", "error_type", "error" and
+    "fingerprint" (plus "suppressed", "sampling_level" and "item_index" when
+    set), available at once. to_dict() returns the complete error response,
+    as traced_tool returns it without `lazy`: "traceback", "frames" and, for
+    chained exceptions, "exceptions" and "chained_frames" are rendered from
+    the snapshot taken at exception time on the first call, and later calls
+    return the same dict. Entries added to `summary` before that are kept. A
+    failure whose summary is all that is read costs little more than the
+    capture, as long as its log output is deferred (emitter=) or disabled.
+
+    The locals are detached at capture time (see SnapshotLimits): builtin
+    containers are copied and other objects replaced by their serializer
+    output or a bounded repr, so details rendered later still show the state
+    at exception time. With a `budget` (bytes), the details come from
+    summarize_snapshot instead, plus a "budget" entry.
+    """
+
+    def __init__(self, snapshot: ExceptionSnapshot, render_kwargs: Dict[str, Any],
+                 budget: Optional[int] = None):
+        self.summary = self._summary(snapshot, budget)
+        self._snapshot: Optional[ExceptionSnapshot] = snapshot
+        self._render_kwargs = render_kwargs
+        self._budget = budget
+        self._rendered: Optional[Tuple[Dict[str, Any], List[Any]]] = None
+        self._response: Optional[Dict[str, Any]] = None
+        # A queued log job still needs the snapshot once the response is built
+        self._log_pending = False
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _summary(snapshot: ExceptionSnapshot, budget: Optional[int] = None) -> Dict[str, Any]:
+        summary = {
+            "status": "error",
+            "error_type": snapshot.error_type,
+            "error": budget_error(snapshot.error, budget),
+            "fingerprint": snapshot.fingerprint,
+        }
+        if snapshot.suppressed:
+            summary["suppressed"] = True
+        if snapshot.level is not None:
+            summary["sampling_level"] = snapshot.level
+        if snapshot.item_index is not None:
+            summary["item_index"] = snapshot.item_index
+        return summary
+
+    def _render(self) -> Tuple[Dict[str, Any], List[Any]]:
+        with self._lock:
+            if self._rendered is None:
+                self._rendered = _render_snapshot(self._snapshot, **self._render_kwargs)
+            return self._rendered
+
+    def _emit(self, logger: logging.Logger, level: int, batched: bool) -> None:
+        error_data, records = self._render()
+        with self._lock:
+            self._log_pending = False
+            if self._response is not None:
+                self._snapshot = None
+        _emit_records(logger, level, records, error_data, batched)
+
+    def _details(self) -> Dict[str, Any]:
+        """Render the deferred entries (under the lock)."""
+        if self._budget is not None:
+            options = {key: self._render_kwargs[key] for key in _SUMMARY_OPTIONS
+                       if key in self._render_kwargs}
+            return summarize_snapshot(self._snapshot, self._budget, **options)
+        error_data, _ = self._rendered
+        details = {"traceback": format_traceback(self._snapshot),
+                   "frames": error_data.get("frames", [])}
+        if "exceptions" in error_data:
+            details["exceptions"] = error_data["exceptions"]
+            details["chained_frames"] = error_data["chained_frames"]
+        return details
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Return the complete error response, rendering it on the first call."""
+        if self._response is not None:
+            return self._response
+        if self._budget is None:
+            self._render()
+        with self._lock:
+            if self._response is None:
+                details = self._details()
                 response = {
                     "status": "error",
-                    "error_type": error_data.get("error_type", type(e).__name__),
-                    "error": error_data.get("error", str(e)),
-                    "traceback": traceback.format_exc(),
-                    # Include frame data at root level for direct access
-                    "frames": error_data.get("frames", [])
+                    "error_type": None,
+                    "error": None,
+                    "traceback": details["traceback"],
+                    "frames": details["frames"],
+                    "fingerprint": None,
                 }
-                
-                return response
-                
-        return cast(F, wrapper)
-    return decorator
+                if "exceptions" in details:
+                    response["exceptions"] = details["exceptions"]
+                    response["chained_frames"] = details["chained_frames"]
+                if "budget" in details:
+                    response["budget"] = details["budget"]
+                # Same key order as the eager response; the summary keeps its
+                # current values, including entries added so far
+                response.update(self.summary)
+                self._response = response
+                if not self._log_pending:
+                    self._snapshot = None
+            return self._response
+
+    def __repr__(self) -> str:
+        return f"ToolErrorResponse({self.summary!r})"
 
 
 def format_for_agent(var_name: str, var_value: Any) -> str:
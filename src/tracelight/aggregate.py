@@ -0,0 +1,137 @@
+"""Collect exception snapshots from worker processes in the parent.
+
+Frames and tracebacks do not survive the trip from a process pool worker to
+its parent, but snapshots do: they pickle to a compact, versioned form made
+of builtin data only (see ExceptionSnapshot). A worker either attaches the
+snapshot to the exception it raises (``attach_snapshot=True``) or sends it
+over a multiprocessing queue with send_snapshot; a SnapshotAggregator in the
+parent logs what arrives with the parent's logging setup and counts the
+failures by fingerprint.
+"""
+
+import logging
+import threading
+from typing import Any, Callable, Dict, Optional, Union
+
+from tracelight.core import (ExceptionSnapshot, capture_snapshot, log_snapshot,
+                             snapshot_of, _split_options)
+
+
+def send_snapshot(queue: Any, exc: BaseException, **kwargs: Any) -> ExceptionSnapshot:
+    """
+    Capture `exc` and put its snapshot on `queue` (e.g. a multiprocessing.Queue).
+
+    Args:
+        queue: Any object with a put() method; the snapshot is pickled by
+               multiprocessing queues.
+        exc: The caught exception (its frames must still be alive).
+        **kwargs: Capture options of log_exception_state (exclude_vars,
+                  redaction, limits, ...); render options are ignored.
+
+    Returns:
+        The snapshot that was sent.
+    """
+    capture_kwargs, _ = _split_options(kwargs)
+    snapshot = capture_snapshot(exc, **capture_kwargs)
+    queue.put(snapshot)
+    return snapshot
+
+
+class SnapshotAggregator:
+    """Handles snapshots sent by worker processes, in the parent process.
+
+    Args:
+        logger: Logger for received snapshots (creates one if None).
+        level: The log level to use.
+        handler: Called with each received snapshot instead of logging it,
+                 e.g. JsonLinesWriter.write_snapshot.
+        **render_options: Render options of log_exception_state
+                          (max_var_length, batched, ...).
+
+    Examples:
+        queue = multiprocessing.Queue()
+        aggregator = SnapshotAggregator(logger)
+        aggregator.listen(queue)
+
+        # in a worker:
+        try:
+            process(item)
+        except Exception as e:
+            send_snapshot(queue, e)
+
+        # or, for exceptions raised by @traced(attach_snapshot=True):
+        try:
+            future.result()
+        except Exception as e:
+            aggregator.submit(e)
+
+        aggregator.stop()
+    """
+
+    def __init__(self,
+                 logger: Optional[logging.Logger] = None,
+                 level: int = logging.ERROR,
+                 handler: Optional[Callable[[ExceptionSnapshot], Any]] = None,
+                 **render_options: Any):
+        self.logger = logger or logging.getLogger(__name__)
+        self.level = level
+        self.handler = handler
+        self.render_options = render_options
+        self._counts: Dict[str, int] = {}
+        self._lock = threading.Lock()
+        self._queue: Any = None
+        self._thread: Optional[threading.Thread] = None
+
+    def submit(self, item: Union[ExceptionSnapshot, BaseException]) -> Optional[ExceptionSnapshot]:
+        """
+        Count and handle a snapshot, or the snapshot attached to an exception.
+
+        Returns:
+            The handled snapshot, or None if `item` is an exception without one.
+        """
+        snapshot = item if isinstance(item, ExceptionSnapshot) else snapshot_of(item)
+        if snapshot is None:
+            return None
+        with self._lock:
+            key = snapshot.fingerprint or snapshot.error_type
+            self._counts[key] = self._counts.get(key, 0) + 1
+        if self.handler is not None:
+            self.handler(snapshot)
+        else:
+            log_snapshot(snapshot, self.logger, self.level, **self.render_options)
+        return snapshot
+
+    def counts(self) -> Dict[str, int]:
+        """Return the number of snapshots received per fingerprint."""
+        with self._lock:
+            return dict(self._counts)
+
+    def listen(self, queue: Any) -> None:
+        """Handle every snapshot put on `queue` on a background thread, until stop()."""
+        if self._thread is not None:
+            raise RuntimeError("SnapshotAggregator is already listening")
+        self._queue = queue
+        self._thread = threading.Thread(target=self._run, args=(queue,),
+                                        name="tracelight-aggregator", daemon=True)
+        self._thread.start()
+
+    def _run(self, queue: Any) -> None:
+        while True:
+            item = queue.get()
+            # None is the stop sentinel put by stop()
+            if item is None:
+                return
+            try:
+                self.submit(item)
+            except Exception:
+                logging.getLogger(__name__).debug("Handling a snapshot failed", exc_info=True)
+
+    def stop(self, timeout: Optional[float] = None) -> None:
+        """Handle the snapshots already queued, then stop listening."""
+        thread = self._thread
+        if thread is None:
+            return
+        self._queue.put(None)
+        thread.join(timeout)
+        self._thread = None
+        self._queue = None
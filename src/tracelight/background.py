@@ -0,0 +1,177 @@
+"""Background worker for deferred trace formatting and log I/O.
+
+The ``except`` path only takes a cheap snapshot of the failing frames (see
+:func:`tracelight.core.capture_snapshot`); a :class:`BackgroundEmitter` then
+does the formatting and handler I/O on its own thread, off the request path.
+"""
+
+import atexit
+import logging
+import queue
+import threading
+from typing import Any, Callable, Optional
+
+from tracelight.core import capture_snapshot, log_snapshot, _split_options
+from tracelight.metrics import metrics
+
+# Sentinel telling the worker thread to exit
+_STOP = object()
+
+_internal_logger = logging.getLogger(__name__)
+
+
+class BackgroundEmitter:
+    """Runs queued logging jobs on a worker thread with a bounded queue.
+
+    Args:
+        maxsize: Maximum number of pending jobs.
+        drop_policy: What to do when the queue is full:
+            - "drop_newest": discard the job being submitted (default)
+            - "drop_oldest": discard the oldest pending job to make room
+            - "block": wait up to `block_timeout` seconds for room
+        block_timeout: Seconds to wait with the "block" policy (None waits forever).
+        name: Name of the worker thread.
+
+    Examples:
+        emitter = BackgroundEmitter(maxsize=500, drop_policy="drop_oldest")
+
+        @traced(emitter=emitter)
+        def handler(request):
+            ...
+
+        emitter.flush(timeout=5)
+    """
+
+    DROP_NEWEST = "drop_newest"
+    DROP_OLDEST = "drop_oldest"
+    BLOCK = "block"
+
+    def __init__(self,
+                 maxsize: int = 1024,
+                 drop_policy: str = DROP_NEWEST,
+                 block_timeout: Optional[float] = None,
+                 name: str = "tracelight-emitter"):
+        if drop_policy not in (self.DROP_NEWEST, self.DROP_OLDEST, self.BLOCK):
+            raise ValueError(f"Unknown drop policy: {drop_policy!r}")
+        self.drop_policy = drop_policy
+        self.block_timeout = block_timeout
+        self.name = name
+        self.dropped = 0
+        self.errors = 0
+        self._queue: "queue.Queue[Any]" = queue.Queue(maxsize)
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+        self._closed = False
+
+    def _ensure_started(self) -> None:
+        # Called with _lock held
+        if self._thread is None:
+            thread = threading.Thread(target=self._run, name=self.name, daemon=True)
+            thread.start()
+            self._thread = thread
+            atexit.register(self.shutdown)
+
+    def _run(self) -> None:
+        while True:
+            job = self._queue.get()
+            try:
+                if job is _STOP:
+                    return
+                func, args, kwargs = job
+                func(*args, **kwargs)
+            except Exception:
+                self.errors += 1
+                metrics.increment("emitter_errors")
+                _internal_logger.debug("Background tracelight job failed", exc_info=True)
+            finally:
+                self._queue.task_done()
+
+    def submit(self, func: Callable[..., Any], *args: Any, **kwargs: Any) -> bool:
+        """
+        Queue `func(*args, **kwargs)` to run on the worker thread.
+
+        Returns:
+            True if the job was queued, False if it was dropped.
+        """
+        job = (func, args, kwargs)
+        # _closed is checked and the job queued under the lock shutdown takes
+        # to queue _STOP, so no job can land behind it and never run
+        with self._lock:
+            if not self._closed:
+                self._ensure_started()
+                if self._put(job):
+                    return True
+        self.dropped += 1
+        metrics.increment("emitter_dropped")
+        return False
+
+    def _put(self, job: Any) -> bool:
+        try:
+            if self.drop_policy == self.BLOCK:
+                self._queue.put(job, timeout=self.block_timeout)
+            else:
+                self._queue.put_nowait(job)
+            return True
+        except queue.Full:
+            pass
+
+        if self.drop_policy == self.DROP_OLDEST:
+            try:
+                self._queue.get_nowait()
+                self._queue.task_done()
+                self.dropped += 1
+                metrics.increment("emitter_dropped")
+                self._queue.put_nowait(job)
+                return True
+            except (queue.Empty, queue.Full):
+                pass
+        return False
+
+    def log_exception(self,
+                      exc: BaseException,
+                      logger: logging.Logger,
+                      level: int = logging.ERROR,
+                      **kwargs: Any) -> bool:
+        """
+        Snapshot `exc` now and log it on the worker thread.
+
+        Args:
+            exc: The caught exception (its frames must still be alive).
+            logger: A logging.Logger (or logger-like) instance.
+            level: The log level to use.
+            **kwargs: Keyword options accepted by log_exception_state.
+
+        Returns:
+            True if the job was queued, False if it was dropped.
+        """
+        capture_kwargs, render_kwargs = _split_options(kwargs)
+        snapshot = capture_snapshot(exc, **capture_kwargs)
+        return self.submit(log_snapshot, snapshot, logger, level, **render_kwargs)
+
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """
+        Wait until every queued job has been processed.
+
+        Returns:
+            True if the queue drained, False if `timeout` expired first.
+        """
+        done = self._queue.all_tasks_done
+        with done:
+            if timeout is None:
+                while self._queue.unfinished_tasks:
+                    done.wait()
+                return True
+            return done.wait_for(lambda: not self._queue.unfinished_tasks, timeout)
+
+    def shutdown(self, timeout: Optional[float] = None) -> None:
+        """Stop accepting jobs, process the pending ones and stop the worker."""
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+            thread = self._thread
+            if thread is None:
+                return
+            # The worker doesn't take the lock, so this can't wait on a full queue forever
+            self._queue.put(_STOP)
+        thread.join(timeout)
@@ -0,0 +1,219 @@
+"""Budgeted repr engine for captured locals.
+
+Calling ``repr()`` on a large container builds the complete string before it
+can be truncated, so a list with millions of items costs seconds of CPU and
+hundreds of MB just to keep the first thousand characters. :func:`bounded_repr`
+walks the builtin containers itself and stops as soon as its character budget
+is spent, producing exactly the same truncated text as
+``repr(obj)[:max_length] + "...<truncated>"``.
+"""
+
+from typing import Any, Callable, Dict, List, Optional, Set, Tuple
+
+TRUNCATION_MARKER = "...<truncated>"
+
+
+class _BudgetExhausted(Exception):
+    """Raised internally once the character budget has been used up."""
+
+
+class _ReprWriter:
+    """Accumulates repr fragments until the character budget runs out."""
+
+    __slots__ = ("parts", "remaining", "max_depth", "max_items", "active")
+
+    def __init__(self, budget: int, max_depth: Optional[int], max_items: Optional[int]):
+        self.parts: List[str] = []
+        self.remaining = budget
+        self.max_depth = max_depth
+        self.max_items = max_items
+        self.active: Set[int] = set()
+
+    def write(self, text: str) -> None:
+        if len(text) < self.remaining:
+            self.parts.append(text)
+            self.remaining -= len(text)
+            return
+        self.parts.append(text[:self.remaining])
+        self.remaining = 0
+        raise _BudgetExhausted
+
+
+def _quoted_prefix(obj: Any, writer: _ReprWriter, prefix: str) -> None:
+    """Write the repr of a str/bytes value without reprs of the unused tail."""
+    if len(obj) < writer.remaining:
+        writer.write(repr(obj))
+        return
+
+    # Every character produces at least one output character, so the repr of
+    # a `remaining`-long head is enough to exhaust the budget.
+    quote, other = ("'", '"') if prefix == "" else (b"'", b'"')
+    head = obj[:writer.remaining]
+    body = repr(head)[len(prefix) + 1:-1]
+    full_double = quote in obj and other not in obj
+    head_double = quote in head and other not in head
+    if full_double == head_double:
+        delim = '"' if full_double else "'"
+    elif full_double:
+        # The head has no single quotes, so its body is already correct.
+        delim = '"'
+    else:
+        # The head was rendered with double quotes; escape its single quotes.
+        delim = "'"
+        body = body.replace("'", "\\'")
+    writer.write(prefix + delim + body + delim)
+
+
+def _repr_str(obj: Any, writer: _ReprWriter, depth: int) -> None:
+    _quoted_prefix(obj, writer, "")
+
+
+def _repr_bytes(obj: Any, writer: _ReprWriter, depth: int) -> None:
+    _quoted_prefix(obj, writer, "b")
+
+
+def _write_items(items: Any, writer: _ReprWriter, depth: int,
+                 write_item: Callable[[Any, _ReprWriter, int], None]) -> int:
+    """Write comma separated items, honouring ``max_items``; return the count."""
+    count = 0
+    for item in items:
+        if count:
+            writer.write(", ")
+        if writer.max_items is not None and count >= writer.max_items:
+            writer.write("...")
+            break
+        write_item(item, writer, depth)
+        count += 1
+    return count
+
+
+def _container(open_: str, close: str, placeholder: str) -> Callable:
+    def decorate(write_body: Callable[[Any, _ReprWriter, int], int]) -> Callable:
+        def handler(obj: Any, writer: _ReprWriter, depth: int) -> None:
+            key = id(obj)
+            if key in writer.active or (writer.max_depth is not None and depth > writer.max_depth):
+                writer.write(placeholder)
+                return
+            writer.active.add(key)
+            try:
+                writer.write(open_)
+                write_body(obj, writer, depth + 1)
+                writer.write(close)
+            finally:
+                writer.active.discard(key)
+        return handler
+    return decorate
+
+
+@_container("[", "]", "[...]")
+def _repr_list(obj: Any, writer: _ReprWriter, depth: int) -> int:
+    return _write_items(obj, writer, depth, _write_value)
+
+
+@_container("(", ")", "(...)")
+def _repr_tuple(obj: Any, writer: _ReprWriter, depth: int) -> int:
+    count = _write_items(obj, writer, depth, _write_value)
+    if count == 1 and len(obj) == 1:
+        writer.write(",")
+    return count
+
+
+def _write_pair(item: Any, writer: _ReprWriter, depth: int) -> None:
+    _write_value(item[0], writer, depth)
+    writer.write(": ")
+    _write_value(item[1], writer, depth)
+
+
+@_container("{", "}", "{...}")
+def _repr_dict(obj: Any, writer: _ReprWriter, depth: int) -> int:
+    return _write_items(obj.items(), writer, depth, _write_pair)
+
+
+def _repr_set(obj: Any, writer: _ReprWriter, depth: int) -> None:
+    cls = type(obj)
+    name = cls.__name__
+    if not obj:
+        writer.write(name + "()")
+        return
+    bare = cls is set
+    key = id(obj)
+    if key in writer.active or (writer.max_depth is not None and depth > writer.max_depth):
+        writer.write("{...}" if bare else name + "(...)")
+        return
+    writer.active.add(key)
+    try:
+        writer.write("{" if bare else name + "({")
+        _write_items(obj, writer, depth + 1, _write_value)
+        writer.write("}" if bare else "})")
+    finally:
+        writer.active.discard(key)
+
+
+# Dispatch on the class' __repr__ slot rather than the class itself, so that
+# subclasses which inherit the builtin repr are walked too, while subclasses
+# with their own __repr__ (OrderedDict, namedtuples, ...) fall back to repr().
+_HANDLERS: Dict[Any, Callable[[Any, _ReprWriter, int], None]] = {
+    str.__repr__: _repr_str,
+    bytes.__repr__: _repr_bytes,
+    list.__repr__: _repr_list,
+    tuple.__repr__: _repr_tuple,
+    dict.__repr__: _repr_dict,
+    set.__repr__: _repr_set,
+    frozenset.__repr__: _repr_set,
+}
+
+
+def _write_value(obj: Any, writer: _ReprWriter, depth: int) -> None:
+    handler = _HANDLERS.get(type(obj).__repr__)
+    if handler is None:
+        writer.write(repr(obj))
+    else:
+        handler(obj, writer, depth)
+
+
+def repr_within(obj: Any,
+                max_length: int = 1000,
+                *,
+                max_depth: Optional[int] = None,
+                max_items: Optional[int] = None) -> Tuple[str, bool]:
+    """
+    Return the first ``max_length`` characters of ``repr(obj)`` and whether it was cut.
+
+    Same walk as bounded_repr, without appending a marker, for callers that
+    need to know whether the representation is complete.
+    """
+    writer = _ReprWriter(max_length + 1, max_depth, max_items)
+    try:
+        _write_value(obj, writer, 0)
+    except _BudgetExhausted:
+        return "".join(writer.parts)[:max_length], True
+    return "".join(writer.parts), False
+
+
+def bounded_repr(obj: Any,
+                 max_length: int = 1000,
+                 *,
+                 max_depth: Optional[int] = None,
+                 max_items: Optional[int] = None,
+                 marker: str = TRUNCATION_MARKER) -> str:
+    """
+    Return ``repr(obj)``, truncated to ``max_length`` characters, at bounded cost.
+
+    Builtin containers, strings and bytes are rendered incrementally and the
+    walk stops as soon as more than ``max_length`` characters were produced.
+    Other objects are rendered with their own ``repr``.
+
+    Args:
+        obj: The value to represent.
+        max_length: Maximum number of characters to keep before ``marker``.
+        max_depth: Nesting depth beyond which containers render as ``[...]``
+            (None for no limit).
+        max_items: Number of items shown per container before ``...``
+            (None for no limit).
+        marker: Appended to the text when it was truncated.
+
+    Returns:
+        The (possibly truncated) representation.
+    """
+    text, truncated = repr_within(obj, max_length, max_depth=max_depth, max_items=max_items)
+    return text + marker if truncated else text
@@ -0,0 +1,373 @@
+"""Whole-trace size budgets for error summaries sent to agents.
+
+format_for_agent and max_var_length bound each variable on its own, so a
+deep trace can still come to tens of kilobytes, all of which ends up in an
+LLM's context. summarize_snapshot renders a snapshot within one budget for
+the whole summary, in bytes of JSON or approximate tokens, spent in a single
+pass in order of usefulness:
+
+1. the exception line, the end of the traceback and the frame locations,
+   innermost first
+2. the innermost frame's locals; each further frame gets half of what is
+   left, and chained exceptions' frames come last
+3. within a frame, the function's arguments and the variables used on the
+   failing line before the other locals
+
+Each variable is rendered once, bounded by its share. When the share runs
+short a value is truncated, then shown as its type only (``<dict>``), then
+omitted; frames whose locations don't fit are dropped from the outside in.
+Unused shares carry over to what follows.
+
+Sizes are bytes of ``json.dumps`` output with its defaults (``ensure_ascii``:
+non-ASCII text counts as its ``\\uXXXX`` escapes); the UTF-8 encoding of
+``json.dumps(..., ensure_ascii=False)`` is never larger.
+"""
+
+import json
+from typing import Any, Callable, Dict, List, Optional
+
+from tracelight.bounded_repr import TRUNCATION_MARKER
+from tracelight.core import (ExceptionSnapshot, FrameSnapshot, _RenderTally, _render_local,
+                             _split_options, capture_snapshot)
+from tracelight.formatting import format_traceback
+from tracelight.relevance import relevant_names
+from tracelight.serializers import SerializerRegistry, default_registry
+
+# Approximate bytes of English text or code per LLM token
+BYTES_PER_TOKEN = 4
+
+# Share of the budget the exception message and the traceback may use
+_ERROR_SHARE = 0.1
+_TRACEBACK_SHARE = 0.25
+
+# Share of the frames' budget their locations may use; outer frames that
+# don't fit are dropped
+_LOCATION_SHARE = 0.5
+
+# Share of the remaining locals budget given to each frame, innermost first
+_FRAME_SHARE = 0.5
+
+# Share of a frame's budget reserved for arguments and failing-line variables
+_PRIORITY_SHARE = 0.75
+
+# Shortest truncated value worth showing; shorter shares show the type only
+_MIN_VALUE_LENGTH = 24
+
+# Estimated JSON bytes of the summary's fixed keys (including "budget"),
+# around a frame's data, around one variable and around a chained exception
+_SUMMARY_OVERHEAD = 220
+_FRAME_OVERHEAD = 130
+_VAR_OVERHEAD = 6
+_EXCEPTION_OVERHEAD = 130
+
+# Rendering options of log_exception_state that apply to summaries; the
+# others only affect the log output and are ignored
+_SUMMARY_OPTIONS = ("max_var_length", "format_var", "max_var_depth", "max_var_items",
+                   "serializers")
+_LOG_ONLY_OPTIONS = ("level", "batched", "source_context")
+
+# Length to which chained exceptions' messages are cut
+_CHAINED_ERROR_LENGTH = 200
+
+# Encodings tried until "used_bytes" counts itself (two, unless its digit
+# count or "exceeded" changes)
+_MEASURE_ATTEMPTS = 4
+
+
+def budget_bytes(max_bytes: Optional[int] = None,
+                 max_tokens: Optional[int] = None) -> Optional[int]:
+    """Return the byte budget for the given limits (the tighter one), or None."""
+    limits = [limit for limit in (max_bytes,
+                                  None if max_tokens is None else max_tokens * BYTES_PER_TOKEN)
+              if limit is not None]
+    return min(limits) if limits else None
+
+
+def budget_error(error: str, limit: Optional[float]) -> str:
+    """Cut an exception message to its share of the budget `limit`."""
+    if limit is None:
+        return error
+    return _cut(error, max(_MIN_VALUE_LENGTH, limit * _ERROR_SHARE))
+
+
+def _json_size(text: str) -> int:
+    """Bytes of `text` as a JSON string, with its quotes and escapes."""
+    return len(json.dumps(text))
+
+
+def _cut(text: str, length: float) -> str:
+    if len(text) <= length:
+        return text
+    return text[:max(0, int(length) - len(TRUNCATION_MARKER))] + TRUNCATION_MARKER
+
+
+def _trim_traceback(text: str, allowance: float) -> str:
+    """Keep the last lines of a traceback (innermost frames) within `allowance`."""
+    if _json_size(text) <= allowance:
+        return text
+    lines = text.splitlines(keepends=True)
+    kept: List[str] = []
+    # The header and the omission line (with an upper bound of the count)
+    size = _json_size(lines[0] + f"  [... {len(lines)} lines omitted ...]\n")
+    for line in reversed(lines[1:]):
+        size += _json_size(line) - 2
+        if size > allowance:
+            break
+        kept.append(line)
+    omitted = len(lines) - 1 - len(kept)
+    return "".join([lines[0], f"  [... {omitted} lines omitted ...]\n"] + kept[::-1])
+
+
+class _Summarizer:
+    """Spends one budget over a snapshot's frames; see the module docstring."""
+
+    def __init__(self, remaining: float, max_var_length: int,
+                 format_var: Optional[Callable[[str, Any], str]],
+                 max_var_depth: Optional[int], max_var_items: Optional[int],
+                 serializers: SerializerRegistry, snapshot: ExceptionSnapshot):
+        self.remaining = remaining
+        self.max_var_length = max_var_length
+        self.format_var = format_var
+        self.max_var_depth = max_var_depth
+        self.max_var_items = max_var_items
+        self.serializers = serializers
+        self.snapshot = snapshot
+        self.tally = _RenderTally()
+        self.omitted_frames = 0
+        self.omitted_locals = 0
+
+    def charge(self, size: float) -> None:
+        self.remaining -= size
+
+    def frames(self, frames: List[FrameSnapshot]) -> List[Dict[str, Any]]:
+        """Render `frames` (innermost first) within the remaining budget."""
+        kept = []
+        locations = self.remaining * _LOCATION_SHARE
+        for frame in frames:
+            cost = _FRAME_OVERHEAD + _json_size(frame.function) + _json_size(frame.file)
+            # The innermost frame's location is kept whenever it fits at all
+            if cost > (locations if kept else self.remaining):
+                break
+            locations -= cost
+            self.remaining -= cost
+            kept.append(frame)
+        self.omitted_frames += len(frames) - len(kept)
+
+        rendered = []
+        for index, frame in enumerate(kept):
+            last = index == len(kept) - 1
+            share = self.remaining if last else self.remaining * _FRAME_SHARE
+            frame_data, spent = self._frame(frame, share)
+            self.remaining -= spent
+            rendered.append(frame_data)
+        return rendered
+
+    def _frame(self, frame: FrameSnapshot, share: float) -> Any:
+        frame_data: Dict[str, Any] = {
+            "frame_number": frame.frame_number,
+            "frame_id": frame.frame_id,
+            "function": frame.function,
+            "file": frame.file,
+            "line": frame.line,
+        }
+        if frame.locals is None:
+            frame_data["locals"] = {}
+            frame_data["locals_omitted"] = True
+            return frame_data, 0
+
+        priority_names = (relevant_names(frame.code, frame.line, 0)
+                          if frame.code is not None else frozenset())
+        priority = [name for name in frame.locals if name in priority_names]
+        others = [name for name in frame.locals if name not in priority_names]
+        priority_pool = share * _PRIORITY_SHARE if priority and others else share
+
+        frame_locals: Dict[str, str] = {}
+        omitted = 0
+        spent = 0.0
+        for names, pool in ((priority, priority_pool), (others, None)):
+            # The second pool gets whatever the first one left
+            left = share - spent if pool is None else pool
+            for position, name in enumerate(names):
+                allowance = left / (len(names) - position)
+                rep = self._value(name, frame.locals[name], allowance)
+                if rep is None:
+                    omitted += 1
+                    continue
+                cost = _VAR_OVERHEAD + len(name) + _json_size(rep)
+                frame_locals[name] = rep
+                left -= cost
+                spent += cost
+        frame_data["locals"] = frame_locals
+        if omitted:
+            frame_data["omitted_locals"] = omitted
+            self.omitted_locals += omitted
+        return frame_data, spent
+
+    def _value(self, name: str, value: Any, allowance: float) -> Optional[str]:
+        """Render one local within `allowance` bytes, degrading as needed."""
+        available = allowance - _VAR_OVERHEAD - len(name) - 2
+        if available >= _MIN_VALUE_LENGTH:
+            length = int(min(self.max_var_length, available - len(TRUNCATION_MARKER)))
+            _, rep = _render_local(name, value, length, self.format_var, self.max_var_depth,
+                                   self.max_var_items, self.serializers, self.snapshot.limits,
+                                   self.tally, self.snapshot.redaction)
+            rep = _cut(rep, available)
+            # Escaped quotes and backslashes take extra bytes in JSON
+            excess = _json_size(rep) - 2 - available
+            return _cut(rep, len(rep) - excess) if excess > 0 else rep
+        placeholder = f"<{type(value).__name__}>"
+        if available >= len(placeholder):
+            return placeholder
+        return None
+
+
+def summarize_snapshot(snapshot: ExceptionSnapshot,
+                       max_bytes: Optional[int] = None,
+                       max_tokens: Optional[int] = None,
+                       *,
+                       max_var_length: int = 1000,
+                       format_var: Optional[Callable[[str, Any], str]] = None,
+                       max_var_depth: Optional[int] = None,
+                       max_var_items: Optional[int] = None,
+                       serializers: Optional[SerializerRegistry] = None) -> Dict[str, Any]:
+    """
+    Render a snapshot as an error summary that fits a size budget.
+
+    Args:
+        snapshot: Snapshot taken by capture_snapshot.
+        max_bytes: Budget for the summary's JSON encoding, in bytes of
+                   json.dumps output.
+        max_tokens: Budget in approximate LLM tokens (BYTES_PER_TOKEN bytes
+                    each); the tighter of the two budgets applies.
+        max_var_length: Maximum length of one variable, even with budget left.
+        format_var: Custom variable formatter (its output is cut to the share).
+        max_var_depth: Maximum nesting depth rendered for containers.
+        max_var_items: Maximum items rendered per container.
+        serializers: Serializer registry (defaults to the global registry).
+
+    Returns:
+        Dict with "error_type", "error", "fingerprint", "traceback", "frames"
+        (innermost last, like tracebacks), "exceptions" and "chained_frames"
+        for chained exceptions, and "budget" with "max_bytes", "used_bytes"
+        (the exact size of json.dumps(summary)), "exceeded" (True when even
+        the exception line and the first frame's location don't fit),
+        "omitted_frames" and "omitted_locals".
+
+    Examples:
+        summary = summarize_snapshot(snapshot, max_tokens=2000)
+        send_to_model(json.dumps(summary))
+    """
+    limit = budget_bytes(max_bytes, max_tokens)
+    budget = float("inf") if limit is None else float(limit)
+    summarizer = _Summarizer(budget, max_var_length, format_var, max_var_depth, max_var_items,
+                             serializers or default_registry, snapshot)
+
+    error = budget_error(snapshot.error, limit)
+    summary: Dict[str, Any] = {
+        "error_type": snapshot.error_type,
+        "error": error,
+        "fingerprint": snapshot.fingerprint,
+    }
+    summarizer.charge(_SUMMARY_OVERHEAD + _json_size(snapshot.error_type) + _json_size(error)
+                      + _json_size(snapshot.fingerprint or ""))
+    if snapshot.level is not None:
+        summary["sampling_level"] = snapshot.level
+    if snapshot.item_index is not None:
+        summary["item_index"] = snapshot.item_index
+    if snapshot.suppressed:
+        summary["suppressed"] = True
+
+    traceback_text = _trim_traceback(format_traceback(snapshot),
+                                     max(0.0, summarizer.remaining * _TRACEBACK_SHARE))
+    summary["traceback"] = traceback_text
+    summarizer.charge(_json_size(traceback_text))
+
+    exceptions = []
+    for chained in snapshot.related:
+        message = _cut(chained.error, _CHAINED_ERROR_LENGTH)
+        exceptions.append({
+            "exception_id": chained.exception_id,
+            "parent": chained.parent,
+            "relation": chained.relation,
+            "error_type": chained.error_type,
+            "error": message,
+            "frame_ids": [frame.frame_id for frame in chained.frames],
+        })
+        summarizer.charge(_EXCEPTION_OVERHEAD + _json_size(chained.error_type)
+                          + _json_size(message) + 8 * len(chained.frames))
+
+    # Innermost frame first; chained exceptions' frames after the primary ones
+    frames = summarizer.frames(list(reversed(snapshot.frames)))
+    summary["frames"] = frames[::-1]
+    if snapshot.related:
+        seen = {frame.frame_id for frame in snapshot.frames}
+        chained_frames = []
+        for chained in snapshot.related:
+            for frame in reversed(chained.frames):
+                if frame.frame_id not in seen:
+                    seen.add(frame.frame_id)
+                    chained_frames.append(frame)
+        summary["exceptions"] = exceptions
+        summary["chained_frames"] = summarizer.frames(chained_frames)[::-1]
+
+    summary["budget"] = {
+        "max_bytes": limit,
+        "used_bytes": None,
+        "exceeded": False,
+        "omitted_frames": summarizer.omitted_frames,
+        "omitted_locals": summarizer.omitted_locals,
+    }
+    if limit is not None:
+        _measure(summary, limit)
+    return summary
+
+
+def _measure(summary: Dict[str, Any], limit: int) -> None:
+    """Store the summary's exact encoded size, which includes the stored number."""
+    report = summary["budget"]
+    report["used_bytes"] = 0
+    for _ in range(_MEASURE_ATTEMPTS):
+        size = len(json.dumps(summary))
+        if size == report["used_bytes"]:
+            return
+        report["used_bytes"] = size
+        # The fixed parts alone can outgrow a tiny budget
+        report["exceeded"] = size > limit
+
+
+def summarize_for_agent(exc: BaseException,
+                        max_bytes: Optional[int] = None,
+                        max_tokens: Optional[int] = None,
+                        **options: Any) -> Dict[str, Any]:
+    """
+    Capture an exception and summarize it within a size budget.
+
+    Args:
+        exc: The exception to summarize.
+        max_bytes: Budget in bytes of JSON (see summarize_snapshot).
+        max_tokens: Budget in approximate LLM tokens.
+        **options: Options of log_exception_state: capture options (exclude_vars,
+                   redaction, limits, ...) and the rendering options of
+                   summarize_snapshot are applied, options that only
+                   affect log output (level, batched, source_context) are
+                   ignored.
+
+    Returns:
+        The summary dict of summarize_snapshot.
+
+    Examples:
+        try:
+            run_step(state)
+        except Exception as e:
+            messages.append({"role": "tool",
+                             "content": json.dumps(summarize_for_agent(e, max_tokens=1500))})
+    """
+    capture_kwargs, render_kwargs = _split_options(options)
+    unknown = sorted(set(render_kwargs) - set(_SUMMARY_OPTIONS) - set(_LOG_ONLY_OPTIONS))
+    if unknown:
+        raise TypeError(f"summarize_for_agent() got unexpected keyword arguments: "
+                        f"{', '.join(unknown)}")
+    snapshot = capture_snapshot(exc, **capture_kwargs)
+    return summarize_snapshot(snapshot, max_bytes, max_tokens,
+                              **{key: value for key, value in render_kwargs.items()
+                                 if key in _SUMMARY_OPTIONS})
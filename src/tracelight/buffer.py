@@ -0,0 +1,152 @@
+"""In-process ring buffer of recent exception snapshots.
+
+Once an exception has been logged, the only copy of its data is usually the
+log text. A SnapshotBuffer keeps the most recent snapshots in memory, bounded
+by count and by estimated bytes, so a health endpoint or a debugging tool can
+inspect recent failures directly. add() only appends the snapshot, so a
+buffer adds O(1) work to the capture; stored snapshots are turned into
+portable copies (see ExceptionSnapshot.portable) when they are first read.
+The lock only covers the deque operations: queries filter a copy of the
+entries taken under it and convert the matches outside it.
+"""
+
+import threading
+from collections import deque
+from typing import Deque, List, Optional, Union
+
+from tracelight.core import ExceptionSnapshot
+
+# Estimated bytes of a stored snapshot on top of its copied data
+_SNAPSHOT_OVERHEAD = 512
+
+
+class _Entry:
+    """A stored snapshot, replaced by its portable copy when first read."""
+
+    __slots__ = ("snapshot", "cost", "converted")
+
+    def __init__(self, snapshot: ExceptionSnapshot, cost: int):
+        self.snapshot = snapshot
+        self.cost = cost
+        self.converted = False
+
+    def portable(self) -> ExceptionSnapshot:
+        if not self.converted:
+            # Concurrent readers may both convert; the copies are equal
+            self.snapshot = self.snapshot.portable()
+            self.converted = True
+        return self.snapshot
+
+
+class SnapshotBuffer:
+    """Thread-safe, memory-bounded buffer of the most recent snapshots.
+
+    Pass it as `buffer=` to log_exception_state, traced, traced_tool or
+    TracedError to record every captured (not rate-limited) snapshot.
+    Snapshots taken with SnapshotLimits(keep_references=True) keep their
+    objects alive until they are first read or evicted.
+
+    Args:
+        max_snapshots: Snapshots kept; the oldest are evicted first.
+        max_bytes: Estimated bytes kept for all snapshots (see
+                   ExceptionSnapshot.size); None for no byte limit.
+
+    Examples:
+        recent = SnapshotBuffer(max_snapshots=200, max_bytes=16 * 1024 * 1024)
+
+        @traced(buffer=recent)
+        def handler(request):
+            ...
+
+        recent.query(error_type="KeyError", since=time.time() - 300)
+    """
+
+    def __init__(self, max_snapshots: int = 100, max_bytes: Optional[int] = 16 * 1024 * 1024):
+        if max_snapshots < 1:
+            raise ValueError("max_snapshots must be at least 1")
+        self.max_snapshots = max_snapshots
+        self.max_bytes = max_bytes
+        self.evicted = 0
+        self._entries: Deque[_Entry] = deque()
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _cost(snapshot: ExceptionSnapshot) -> int:
+        return snapshot.size + _SNAPSHOT_OVERHEAD
+
+    def add(self, snapshot: ExceptionSnapshot) -> None:
+        """Store `snapshot`, evicting the oldest beyond the limits."""
+        entry = _Entry(snapshot, self._cost(snapshot))
+        with self._lock:
+            self._entries.append(entry)
+            self._bytes += entry.cost
+            while len(self._entries) > self.max_snapshots or (
+                    self.max_bytes is not None and self._bytes > self.max_bytes
+                    and len(self._entries) > 1):
+                self._bytes -= self._entries.popleft().cost
+                self.evicted += 1
+
+    def query(self,
+              fingerprint: Optional[str] = None,
+              error_type: Union[str, type, None] = None,
+              function: Optional[str] = None,
+              since: Optional[float] = None,
+              until: Optional[float] = None,
+              limit: Optional[int] = None) -> List[ExceptionSnapshot]:
+        """
+        Return the stored snapshots matching all given criteria, newest first.
+
+        Args:
+            fingerprint: Exception fingerprint (see exception_fingerprint).
+            error_type: Exception class, or its name.
+            function: Name of a function in the exception's traceback.
+            since: Earliest timestamp (time.time()), inclusive.
+            until: Latest timestamp, exclusive.
+            limit: Maximum number of snapshots returned.
+
+        Returns:
+            The matching snapshots, as portable copies.
+        """
+        if isinstance(error_type, type):
+            error_type = error_type.__name__
+        with self._lock:
+            entries = list(self._entries)
+        matches = []
+        for entry in reversed(entries):
+            snapshot = entry.snapshot
+            if limit is not None and len(matches) >= limit:
+                break
+            if fingerprint is not None and snapshot.fingerprint != fingerprint:
+                continue
+            if error_type is not None and snapshot.error_type != error_type:
+                continue
+            if since is not None and snapshot.timestamp < since:
+                continue
+            if until is not None and snapshot.timestamp >= until:
+                continue
+            if function is not None and not any(frame.function == function
+                                                for frame in snapshot.frames):
+                continue
+            matches.append(entry.portable())
+        return matches
+
+    def latest(self) -> Optional[ExceptionSnapshot]:
+        """Return the most recent snapshot, or None if the buffer is empty."""
+        with self._lock:
+            entry = self._entries[-1] if self._entries else None
+        return entry.portable() if entry is not None else None
+
+    @property
+    def total_bytes(self) -> int:
+        """Estimated bytes of the stored snapshots."""
+        return self._bytes
+
+    def clear(self) -> None:
+        """Remove all stored snapshots."""
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
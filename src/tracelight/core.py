@@ -1,8 +1,946 @@
+import asyncio
+import builtins
+import dis
+import functools
 import logging
 import traceback
 import inspect
-from types import FrameType
-from typing import Any, Optional, Dict, Union, List, Callable
+import sys
+import time
+from types import CodeType, FrameType, TracebackType
+from typing import (TYPE_CHECKING, Any, Optional, Dict, Union, List, Callable, Tuple, Iterable,
+                    Collection)
+
+from tracelight.bounded_repr import TRUNCATION_MARKER, repr_within
+from tracelight.detach import ByteBudget, DetachedRepr, SnapshotLimits, DEFAULT_LIMITS, detach
+from tracelight.frames import FULL, SKIP, FrameFilter, frame_module
+from tracelight.metrics import metrics
+from tracelight.redaction import RedactionPolicy
+from tracelight.relevance import relevant_names
+from tracelight import sampling
+from tracelight.sampling import AdaptiveSampler
+from tracelight.source import default_source_cache
+from tracelight.serializers import KEEP_VALUE, SerializerRegistry, default_registry
+if TYPE_CHECKING:
+    from tracelight.buffer import SnapshotBuffer
+from tracelight.fingerprint import (RateLimiter, fingerprint_from, fingerprint_label,
+                                   traceback_locations)
+
+
+class FrameSnapshot:
+    """Raw state of one traceback frame, detached from the live frame object.
+
+    Holds the frame's location and a bounded, detached copy of its locals (see
+    tracelight.detach), so it can be rendered later without keeping the frame
+    (and everything it references through f_back and the traceback) alive,
+    and without seeing later mutations. `locals` is None for frames recorded
+    with metadata only.
+    """
+
+    __slots__ = ("frame_number", "function", "file", "line", "code", "locals", "frame_id")
+
+    def __init__(self, frame_number: int, function: str, file: str, line: int,
+                 code: Optional[CodeType], locals: Optional[Dict[str, Any]],
+                 frame_id: int = 0):
+        self.frame_number = frame_number
+        self.function = function
+        self.file = file
+        self.line = line
+        self.code = code
+        self.locals = locals
+        self.frame_id = frame_id
+
+
+# Relation of a chained exception to the exception it is attached to
+CAUSE = "cause"
+CONTEXT = "context"
+GROUP = "group"
+
+# Estimated bytes of a FrameSnapshot without its locals
+_FRAME_SIZE = 256
+
+# Limit on chained and grouped exceptions captured per snapshot
+MAX_CHAINED_EXCEPTIONS = 100
+
+# ExceptionGroup exists on Python 3.11+
+_EXCEPTION_GROUP = getattr(builtins, "BaseExceptionGroup", None)
+
+
+class ChainedException:
+    """An exception of the tree below a snapshot's primary exception.
+
+    `parent` is the exception_id of the exception it is attached to (0 for the
+    primary exception) and `relation` is CAUSE (raise ... from), CONTEXT
+    (raised while handling) or GROUP (member of an ExceptionGroup). `frames`
+    may share FrameSnapshot objects with other exceptions of the snapshot.
+    `qualified_type` is the type name as tracebacks print it (see
+    ExceptionSnapshot).
+    """
+
+    __slots__ = ("exception_id", "parent", "relation", "error_type", "error", "frames",
+                 "qualified_type")
+
+    def __init__(self, exception_id: int, parent: int, relation: str,
+                 error_type: str, error: str, frames: List[FrameSnapshot],
+                 qualified_type: Optional[str] = None):
+        self.exception_id = exception_id
+        self.parent = parent
+        self.relation = relation
+        self.error_type = error_type
+        self.error = error
+        self.frames = frames
+        self.qualified_type = qualified_type or error_type
+
+
+class ExceptionSnapshot:
+    """Cheap capture of an exception and the raw locals of its traceback frames.
+
+    A snapshot suppressed by a RateLimiter has no frames; `summary` then holds
+    the one-line text to log for it (None to log nothing). `report` carries the
+    limiter's periodic suppression counts, if one was due at capture time.
+    `related` lists the chained and grouped exceptions below the primary one,
+    in depth-first order. `redaction` is the RedactionPolicy applied at capture,
+    which rendering applies to serializer output and representations too.
+    `size` estimates the bytes held by the snapshot's copied data. `level` is
+    the detail level an AdaptiveSampler chose for it (None without a sampler).
+    `item_index` is the index of the item a traced generator was producing
+    when it failed (None otherwise). `sampler` is the AdaptiveSampler that
+    chose `level`; rendering the snapshot adds its time to the sampler's CPU
+    budget. It is not pickled. `error_type` is the class name, while
+    `qualified_type` is the name traceback.format_exception prints: prefixed
+    with the module for exceptions not defined in builtins or __main__.
+
+    Snapshots can always be pickled, e.g. to send them from a worker process
+    to its parent. The pickled form is versioned (SNAPSHOT_FORMAT) and holds
+    only builtin data: locals that are not builtin data are stored as their
+    serialized form or bounded (and redacted) representation, and code
+    objects are dropped, so unpickled snapshots render without source lines.
+    """
+
+    __slots__ = ("error_type", "error", "frames", "timestamp", "fingerprint",
+                 "suppressed", "summary", "report", "limits", "related", "redaction",
+                 "size", "level", "item_index", "sampler", "qualified_type")
+
+    def __init__(self, error_type: str, error: str, frames: List[FrameSnapshot],
+                 timestamp: Optional[float] = None,
+                 fingerprint: Optional[str] = None,
+                 suppressed: bool = False,
+                 summary: Optional[str] = None,
+                 report: Optional[Dict[str, Tuple[str, int]]] = None,
+                 limits: Optional[SnapshotLimits] = None,
+                 related: Optional[List[ChainedException]] = None,
+                 redaction: Optional[RedactionPolicy] = None,
+                 size: int = 0,
+                 level: Optional[str] = None,
+                 item_index: Optional[int] = None,
+                 sampler: Optional[AdaptiveSampler] = None,
+                 qualified_type: Optional[str] = None):
+        self.error_type = error_type
+        self.error = error
+        self.frames = frames
+        self.timestamp = time.time() if timestamp is None else timestamp
+        self.fingerprint = fingerprint
+        self.suppressed = suppressed
+        self.summary = summary
+        self.report = report or {}
+        self.limits = limits or DEFAULT_LIMITS
+        self.related = related or []
+        self.redaction = redaction
+        self.size = size
+        self.level = level
+        self.item_index = item_index
+        self.sampler = sampler
+        self.qualified_type = qualified_type or error_type
+
+    def portable(self) -> "ExceptionSnapshot":
+        """Return a copy holding builtin data only, as if pickled and loaded."""
+        copy = ExceptionSnapshot.__new__(ExceptionSnapshot)
+        copy.__setstate__(self.__getstate__())
+        return copy
+
+    def __getstate__(self) -> Dict[str, Any]:
+        portable: Dict[int, Dict[str, Any]] = {}
+        # Counts the representations made for locals kept by reference
+        tally = _RenderTally()
+
+        def frame_state(frame: FrameSnapshot) -> Dict[str, Any]:
+            state = portable.get(id(frame))
+            if state is None:
+                state = portable[id(frame)] = {
+                    "frame_number": frame.frame_number,
+                    "frame_id": frame.frame_id,
+                    "function": frame.function,
+                    "file": frame.file,
+                    "line": frame.line,
+                    "locals": None if frame.locals is None else {
+                        str(name): _portable_value(value, self.redaction, tally)
+                        for name, value in frame.locals.items()},
+                }
+            return state
+
+        frames = [frame_state(frame) for frame in self.frames]
+        primary_ids = {frame.frame_id for frame in self.frames}
+        chained_frames: Dict[int, Dict[str, Any]] = {}
+        related = []
+        for chained in self.related:
+            for frame in chained.frames:
+                if frame.frame_id not in primary_ids:
+                    chained_frames.setdefault(frame.frame_id, frame_state(frame))
+            related.append({
+                "exception_id": chained.exception_id,
+                "parent": chained.parent,
+                "relation": chained.relation,
+                "error_type": chained.error_type,
+                "qualified_type": chained.qualified_type,
+                "error": chained.error,
+                "frame_ids": [frame.frame_id for frame in chained.frames],
+            })
+        return {
+            "format": SNAPSHOT_FORMAT,
+            "error_type": self.error_type,
+            "qualified_type": self.qualified_type,
+            "error": self.error,
+            "timestamp": self.timestamp,
+            "fingerprint": self.fingerprint,
+            "suppressed": self.suppressed,
+            "summary": self.summary,
+            "report": {fingerprint: (label, count)
+                       for fingerprint, (label, count) in self.report.items()},
+            "frames": frames,
+            "chained_frames": list(chained_frames.values()),
+            "related": related,
+            "size": self.size + tally.rendered_bytes,
+            "level": self.level,
+            "item_index": self.item_index,
+        }
+
+    def __setstate__(self, state: Dict[str, Any]) -> None:
+        # Read every key with a default and ignore unknown ones, so snapshots
+        # pickled by older or newer versions of tracelight still load
+        def frame(data: Dict[str, Any]) -> FrameSnapshot:
+            return FrameSnapshot(data.get("frame_number", 0), data.get("function", "?"),
+                                 data.get("file", "?"), data.get("line", 0), None,
+                                 data.get("locals"), data.get("frame_id", 0))
+
+        self.__init__(state.get("error_type", "Exception"), state.get("error", ""),
+                      [frame(data) for data in state.get("frames", ())],
+                      timestamp=state.get("timestamp"),
+                      fingerprint=state.get("fingerprint"),
+                      suppressed=state.get("suppressed", False),
+                      summary=state.get("summary"),
+                      report=state.get("report"),
+                      size=state.get("size", 0),
+                      level=state.get("level"),
+                      item_index=state.get("item_index"),
+                      qualified_type=state.get("qualified_type"))
+        by_id = {frame.frame_id: frame for frame in self.frames}
+        by_id.update((data.get("frame_id", 0), frame(data))
+                     for data in state.get("chained_frames", ()))
+        self.related = [
+            ChainedException(data.get("exception_id", 0), data.get("parent", 0),
+                             data.get("relation", CONTEXT), data.get("error_type", "Exception"),
+                             data.get("error", ""),
+                             [by_id[frame_id] for frame_id in data.get("frame_ids", ())
+                              if frame_id in by_id],
+                             data.get("qualified_type"))
+            for data in state.get("related", ())]
+
+
+# Version of the pickled form of ExceptionSnapshot. Later versions may add
+# keys, but never change the meaning of existing ones.
+SNAPSHOT_FORMAT = 1
+
+# Length of the representations stored for non-builtin locals when pickling
+_PORTABLE_REPR_LENGTH = 1000
+
+_PORTABLE_SCALARS = frozenset((type(None), bool, int, float, complex, str, bytes))
+
+
+def _portable_value(value: Any, redaction: Optional[RedactionPolicy],
+                    tally: "_RenderTally") -> Any:
+    """Return `value` as builtin data that any Python process can unpickle."""
+    cls = type(value)
+    if cls in _PORTABLE_SCALARS or cls is DetachedRepr:
+        return value
+    try:
+        if cls is list or cls is tuple or cls is set or cls is frozenset:
+            return cls(_portable_value(item, redaction, tally) for item in value)
+        if cls is dict:
+            return {_portable_value(key, redaction, tally):
+                    _portable_value(item, redaction, tally)
+                    for key, item in value.items()}
+        serializer = default_registry.resolve(cls)
+        if serializer is not None and serializer is not KEEP_VALUE:
+            data = serializer(value)
+            if redaction is not None:
+                data = redaction.redact_fields(cls, data)
+            return _portable_value(detach(data, policy=redaction), redaction, tally)
+        rep, truncated = repr_within(value, _PORTABLE_REPR_LENGTH)
+        if truncated:
+            rep += TRUNCATION_MARKER
+    except Exception as portable_err:
+        rep = f"<unrepresentable: {type(portable_err).__name__}>"
+    if redaction is not None:
+        rep = redaction.redact_text(rep)
+    tally.rendered_bytes += len(rep)
+    return DetachedRepr(rep)
+
+
+def capture_snapshot(exc: BaseException,
+                     *,
+                     exclude_vars: Optional[List[str]] = None,
+                     rate_limiter: Optional[RateLimiter] = None,
+                     relevant_locals: bool = False,
+                     frame_filter: Optional[FrameFilter] = None,
+                     limits: Optional[SnapshotLimits] = None,
+                     release_frames: bool = False,
+                     redaction: Optional[RedactionPolicy] = None,
+                     attach_snapshot: bool = False,
+                     buffer: Optional["SnapshotBuffer"] = None,
+                     sampler: Optional[AdaptiveSampler] = None,
+                     item_index: Optional[int] = None,
+                     serializers: Optional[SerializerRegistry] = None) -> ExceptionSnapshot:
+    """
+    Copy the raw state of `exc`'s traceback into a detached snapshot.
+
+    This is the cheap first phase of log_exception_state: it walks the frames
+    once and makes a bounded copy of each frame's locals, without formatting
+    anything or calling the logger. Objects other than builtin data are
+    replaced by their serializer output or a bounded repr (unless
+    limits.keep_references is set), so the snapshot does not change when the
+    application later mutates them. It must run while the traceback frames
+    are still alive.
+
+    The exception's cause or context and, for an ExceptionGroup, its member
+    exceptions are captured recursively into `related`. A frame that appears
+    in several of these tracebacks is copied once and shared.
+
+    Args:
+        exc: The caught exception.
+        exclude_vars: Variable names that are not copied at all (e.g. passwords).
+        rate_limiter: RateLimiter consulted with the exception's fingerprint
+                      before any locals are touched; suppressed occurrences
+                      produce a snapshot without frames.
+        relevant_locals: Only copy the function arguments and the names used on
+                         the failing line and the lines around it (see
+                         tracelight.relevance.relevant_names).
+        frame_filter: FrameFilter deciding which frames are dropped and which
+                      are recorded without locals.
+        limits: SnapshotLimits for the copied locals (item count, depth,
+                string length and estimated bytes of the whole snapshot).
+        release_frames: After copying, clear the locals of the traceback's
+                        frames (see clear_exception_frames), so the exception
+                        no longer keeps them alive through a reference cycle.
+        redaction: RedactionPolicy applied to variable names, dict keys,
+                   string values and exception messages while copying.
+        attach_snapshot: Store the snapshot on `exc` (see snapshot_of), so it
+                         travels with the exception when it is pickled, e.g.
+                         from a process pool worker to the parent process.
+        buffer: SnapshotBuffer that keeps a copy of the snapshot for later
+                queries (rate-limited snapshots are not stored).
+        sampler: AdaptiveSampler choosing whether locals, frames only or just
+                 a count are captured, from the recent exception rate.
+        item_index: Index of the item a generator was producing when it
+                    failed, recorded on the snapshot (see traced).
+        serializers: SerializerRegistry converting objects in the locals
+                     (defaults to tracelight.serializers.default_registry).
+
+    Returns:
+        An ExceptionSnapshot that can be rendered later, on any thread.
+    """
+    start = time.perf_counter()
+    level = sampler.choose() if sampler is not None else None
+    try:
+        snapshot = _take_snapshot(exc, exclude_vars, rate_limiter, relevant_locals,
+                                  frame_filter, limits, redaction, level,
+                                  serializers or default_registry)
+    finally:
+        if release_frames:
+            clear_exception_frames(exc)
+    snapshot.item_index = item_index
+    snapshot.sampler = sampler
+    if sampler is not None:
+        sampler.record_cost(time.perf_counter() - start)
+    try:
+        setattr(exc, _CAPTURED_ATTRIBUTE, True)
+        if attach_snapshot:
+            setattr(exc, _SNAPSHOT_ATTRIBUTE, snapshot)
+    except (AttributeError, TypeError):
+        pass
+    if metrics.enabled:
+        _record_capture(snapshot, time.perf_counter() - start)
+    if buffer is not None and not snapshot.suppressed:
+        buffer.add(snapshot)
+    return snapshot
+
+
+# Exception attribute holding an attached snapshot; exceptions pickle their
+# __dict__, so the snapshot is sent along with them
+_SNAPSHOT_ATTRIBUTE = "__tracelight_snapshot__"
+
+# Exception attribute marking exceptions that were captured already
+_CAPTURED_ATTRIBUTE = "__tracelight_captured__"
+
+
+def is_captured(exc: BaseException) -> bool:
+    """Return True if tracelight has already captured `exc` (e.g. in a decorator)."""
+    return getattr(exc, _CAPTURED_ATTRIBUTE, False) is True
+
+
+def snapshot_of(exc: BaseException) -> Optional[ExceptionSnapshot]:
+    """
+    Return the snapshot attached to `exc` with attach_snapshot=True, if any.
+
+    Args:
+        exc: An exception, possibly received from another process.
+
+    Returns:
+        The attached ExceptionSnapshot, or None.
+
+    Examples:
+        with ProcessPoolExecutor() as pool:
+            future = pool.submit(traced_job, data)   # @traced(attach_snapshot=True)
+            try:
+                future.result()
+            except Exception as e:
+                snapshot = snapshot_of(e)
+    """
+    snapshot = getattr(exc, _SNAPSHOT_ATTRIBUTE, None)
+    return snapshot if isinstance(snapshot, ExceptionSnapshot) else None
+
+
+def _record_capture(snapshot: ExceptionSnapshot, seconds: float) -> None:
+    frames = {frame.frame_id: frame for frame in snapshot.frames}
+    for chained in snapshot.related:
+        frames.update((frame.frame_id, frame) for frame in chained.frames)
+    variables = sum(len(frame.locals) for frame in frames.values() if frame.locals)
+    metrics.record_capture(seconds, len(frames), variables, snapshot.suppressed,
+                           snapshot.level)
+
+
+def _qualified_type(cls: type) -> str:
+    """Name of an exception class as traceback.format_exception prints it."""
+    module = cls.__module__
+    if module in ("builtins", "__main__"):
+        return cls.__qualname__
+    if not isinstance(module, str):
+        module = "<unknown>"
+    return f"{module}.{cls.__qualname__}"
+
+
+def _take_snapshot(exc: BaseException,
+                   exclude_vars: Optional[List[str]],
+                   rate_limiter: Optional[RateLimiter],
+                   relevant_locals: bool,
+                   frame_filter: Optional[FrameFilter],
+                   limits: Optional[SnapshotLimits],
+                   redaction: Optional[RedactionPolicy],
+                   level: Optional[str] = None,
+                   serializers: SerializerRegistry = default_registry) -> ExceptionSnapshot:
+    def message(error: BaseException) -> str:
+        text = str(error)
+        return redaction.redact_text(text) if redaction is not None else text
+
+    fingerprint = None
+    report = None
+    if rate_limiter is not None:
+        locations = traceback_locations(exc)
+        fingerprint = fingerprint_from(type(exc), locations)
+        label = fingerprint_label(exc, locations)
+        allowed = rate_limiter.allow(fingerprint, label)
+        report = rate_limiter.collect_report()
+        if not allowed:
+            summary = None
+            if rate_limiter.summarize:
+                summary = (f"Suppressed repeated exception {label}: {message(exc)} "
+                           f"[fingerprint {fingerprint}]")
+            return ExceptionSnapshot(type(exc).__name__, message(exc), [],
+                                     fingerprint=fingerprint, suppressed=True,
+                                     summary=summary, report=report, redaction=redaction,
+                                     level=level, qualified_type=_qualified_type(type(exc)))
+
+    exclude_vars = exclude_vars or []
+    limits = limits or DEFAULT_LIMITS
+    budget = ByteBudget(limits.max_bytes)
+    entries = _traceback_entries(exc)
+    if fingerprint is None:
+        fingerprint = fingerprint_from(type(exc), [
+            (t.tb_frame.f_code.co_filename, t.tb_frame.f_code.co_name, t.tb_lineno)
+            for t in entries])
+    if level == sampling.COUNT:
+        return ExceptionSnapshot(type(exc).__name__, message(exc), [],
+                                 fingerprint=fingerprint, suppressed=True, report=report,
+                                 redaction=redaction, level=level,
+                                 qualified_type=_qualified_type(type(exc)))
+
+    # Frames already copied, by (frame, line), so shared frames are stored once
+    captured: Dict[Tuple[int, int], FrameSnapshot] = {}
+
+    def capture_frames(tb_entries: List[TracebackType]) -> List[FrameSnapshot]:
+        return _capture_frames(tb_entries, exclude_vars, relevant_locals, frame_filter,
+                               limits, budget, captured, redaction,
+                               with_locals=level != sampling.FRAMES,
+                               serializers=serializers)
+
+    frames = capture_frames(entries)
+
+    related: List[ChainedException] = []
+    seen = {id(exc)}
+    pending = [(0, relation, sub) for relation, sub in reversed(_related_exceptions(exc))]
+    while pending and len(related) < MAX_CHAINED_EXCEPTIONS:
+        parent, relation, current = pending.pop()
+        if id(current) in seen:
+            continue
+        seen.add(id(current))
+        exception_id = len(related) + 1
+        related.append(ChainedException(exception_id, parent, relation,
+                                        type(current).__name__, message(current),
+                                        capture_frames(_traceback_entries(current)),
+                                        _qualified_type(type(current))))
+        pending.extend((exception_id, sub_relation, sub) for sub_relation, sub
+                       in reversed(_related_exceptions(current)))
+
+    size = (limits.max_bytes - budget.remaining) + _FRAME_SIZE * len(captured)
+    return ExceptionSnapshot(type(exc).__name__, message(exc), frames,
+                             fingerprint=fingerprint, report=report, limits=limits,
+                             related=related, redaction=redaction, size=size, level=level,
+                             qualified_type=_qualified_type(type(exc)))
+
+
+def _copy_locals(f_locals: Dict[str, Any],
+                 names: Iterable[str],
+                 exclude_vars: Collection[str],
+                 limits: SnapshotLimits,
+                 budget: ByteBudget,
+                 redaction: Optional[RedactionPolicy],
+                 serializers: SerializerRegistry = default_registry) -> Dict[str, Any]:
+    """Copy the locals listed in `names`, applying exclusions and redaction."""
+    copied = {}
+    for name in names:
+        if name in exclude_vars or name not in f_locals:
+            continue
+        if redaction is not None and redaction.matches_name(name):
+            copied[name] = redaction.replacement
+        else:
+            copied[name] = detach(f_locals[name], limits, budget, redaction, serializers)
+    return copied
+
+
+def _traceback_entries(exc: BaseException) -> List[TracebackType]:
+    entries = []
+    tb = exc.__traceback__
+    while tb is not None:
+        entries.append(tb)
+        tb = tb.tb_next
+    return entries
+
+
+def _related_exceptions(exc: BaseException) -> List[Tuple[str, BaseException]]:
+    """Return the exceptions shown below `exc` in a traceback, with their relation."""
+    related: List[Tuple[str, BaseException]] = []
+    if exc.__cause__ is not None:
+        related.append((CAUSE, exc.__cause__))
+    elif exc.__context__ is not None and not exc.__suppress_context__:
+        related.append((CONTEXT, exc.__context__))
+    if _EXCEPTION_GROUP is not None and isinstance(exc, _EXCEPTION_GROUP):
+        related.extend((GROUP, sub) for sub in exc.exceptions)
+    return related
+
+
+def _capture_frames(entries: List[TracebackType],
+                    exclude_vars: List[str],
+                    relevant_locals: bool,
+                    frame_filter: Optional[FrameFilter],
+                    limits: SnapshotLimits,
+                    budget: ByteBudget,
+                    captured: Dict[Tuple[int, int], FrameSnapshot],
+                    redaction: Optional[RedactionPolicy] = None,
+                    with_locals: bool = True,
+                    serializers: SerializerRegistry = default_registry) -> List[FrameSnapshot]:
+    """Copy the frames of one traceback, reusing frames already in `captured`."""
+    if frame_filter is not None:
+        classes = frame_filter.apply_depth_limits([
+            frame_filter.classify(t.tb_frame.f_code, frame_module(t.tb_frame))
+            for t in entries])
+    else:
+        classes = [FULL] * len(entries)
+
+    frames: List[FrameSnapshot] = []
+    for number, (tb, frame_class) in enumerate(zip(entries, classes), 1):
+        if frame_class == SKIP:
+            continue
+        frame: FrameType = tb.tb_frame
+        key = (id(frame), tb.tb_lineno)
+        frame_snapshot = captured.get(key)
+        if frame_snapshot is None:
+            code = frame.f_code
+            frame_locals: Optional[Dict[str, Any]] = None
+            if frame_class == FULL and with_locals:
+                f_locals = frame.f_locals
+                names = relevant_names(code, tb.tb_lineno) if relevant_locals else f_locals
+                frame_locals = _copy_locals(f_locals, names, exclude_vars, limits, budget,
+                                            redaction, serializers)
+            frame_snapshot = FrameSnapshot(number, code.co_name, code.co_filename,
+                                           tb.tb_lineno, code, frame_locals,
+                                           frame_id=len(captured) + 1)
+            captured[key] = frame_snapshot
+        frames.append(frame_snapshot)
+    return frames
+
+
+def clear_exception_frames(exc: BaseException) -> None:
+    """
+    Clear the locals of the finished frames in the tracebacks of `exc`.
+
+    A caught exception references its traceback, which references every frame
+    and, through their locals, often the exception itself. Such cycles keep
+    all locals alive until the cyclic garbage collector runs. Clearing the
+    frames (tracebacks of chained exceptions included) breaks the cycles, so
+    everything is freed by reference counting as soon as the exception is
+    dropped. Frames that are still executing are left alone, and so are
+    generator, coroutine and async generator frames suspended at a yield or
+    an ``await``: clearing one would finalize it. Those the exception was
+    raised out of are finished and get cleared like any other frame.
+
+    The traceback itself stays intact and can still be formatted or
+    re-raised, but debuggers and outer handlers will no longer see the locals.
+    """
+    pending = [exc]
+    seen = set()
+    while pending:
+        current = pending.pop()
+        if current is None or id(current) in seen:
+            continue
+        seen.add(id(current))
+        tb = current.__traceback__
+        while tb is not None:
+            _clear_frame(tb.tb_frame)
+            tb = tb.tb_next
+        pending.append(current.__cause__)
+        pending.append(current.__context__)
+        if _EXCEPTION_GROUP is not None and isinstance(current, _EXCEPTION_GROUP):
+            pending.extend(current.exceptions)
+
+
+# Before Python 3.13, reading f_locals of a function frame caches a dict
+# snapshot on the frame that is only refreshed on the next read
+_FRAME_CACHES_LOCALS = sys.version_info < (3, 13)
+
+
+# Frames of these code objects may be suspended; clearing them finalizes them
+_RESUMABLE_FLAGS = inspect.CO_GENERATOR | inspect.CO_COROUTINE | inspect.CO_ASYNC_GENERATOR
+
+# A suspended frame's last instruction is a yield (YIELD_FROM is gone in 3.11+)
+_YIELD_OPCODES = frozenset(dis.opmap[name] for name in ("YIELD_VALUE", "YIELD_FROM")
+                           if name in dis.opmap)
+
+
+def _may_be_suspended(frame: FrameType) -> bool:
+    """Whether a generator or coroutine frame stopped at a yield (or await)."""
+    if not frame.f_code.co_flags & _RESUMABLE_FLAGS:
+        return False
+    code = frame.f_code.co_code
+    lasti = frame.f_lasti
+    # A finished frame stopped where the exception left it; a frame that was
+    # finished by an exception thrown in at a yield is kept, to be safe
+    return not 0 <= lasti < len(code) or code[lasti] in _YIELD_OPCODES
+
+
+def _clear_frame(frame: FrameType) -> None:
+    if _may_be_suspended(frame):
+        return
+    try:
+        frame.clear()
+    except RuntimeError:
+        # Still executing; its locals are left alone
+        pass
+    # frame.clear() leaves the snapshot dict cached by capture_snapshot in
+    # place, and for a frame that is still executing that dict would keep the
+    # handled exception (bound in the except clause) alive after the handler
+    # is done. Empty it; the next read of f_locals rebuilds it.
+    if _FRAME_CACHES_LOCALS and frame.f_code.co_flags & inspect.CO_OPTIMIZED:
+        frame.f_locals.clear()
+
+
+# Keyword options consumed by capture_snapshot; the rest belong to log_snapshot
+_CAPTURE_OPTIONS = ("exclude_vars", "rate_limiter", "relevant_locals", "frame_filter",
+                    "limits", "release_frames", "redaction", "attach_snapshot",
+                    "buffer", "sampler", "item_index")
+
+# Options used by both phases: capture converts objects with the serializers,
+# rendering applies them to objects kept by reference
+_SHARED_OPTIONS = ("serializers",)
+
+
+def _split_options(options: Dict[str, Any]) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+    """Split log_exception_state keyword options into capture and render options."""
+    capture_kwargs = {k: v for k, v in options.items()
+                      if k in _CAPTURE_OPTIONS or k in _SHARED_OPTIONS}
+    render_kwargs = {k: v for k, v in options.items() if k not in _CAPTURE_OPTIONS}
+    return capture_kwargs, render_kwargs
+
+
+# A rendered log record: format string and its arguments
+LogRecordArgs = Tuple[str, Tuple[Any, ...]]
+
+
+class _RenderTally:
+    """Metrics accumulated while rendering one snapshot."""
+
+    __slots__ = ("rendered_bytes", "truncations", "serializer_failures")
+
+    def __init__(self):
+        self.rendered_bytes = 0
+        self.truncations = 0
+        self.serializer_failures = 0
+
+
+def _render_local(var_name: str,
+                  var_val: Any,
+                  max_var_length: int,
+                  format_var: Optional[Callable[[str, Any], str]],
+                  max_var_depth: Optional[int],
+                  max_var_items: Optional[int],
+                  serializers: SerializerRegistry,
+                  limits: SnapshotLimits,
+                  tally: _RenderTally,
+                  redaction: Optional[RedactionPolicy] = None) -> Tuple[Any, str]:
+    """Return the structured value stored for a local and its log text."""
+    try:
+        value = var_val
+        serializer = serializers.resolve(type(var_val))
+        if serializer is KEEP_VALUE:
+            # JSON-native values are stored as is, except module-level dunders
+            # such as __builtins__
+            keep = not (var_name.startswith('__') and isinstance(var_val, (list, dict)))
+        elif serializer is not None:
+            try:
+                # Serializer output (e.g. a model dump) is bounded and
+                # redacted like locals
+                value = serializer(var_val)
+                if redaction is not None:
+                    value = redaction.redact_fields(type(var_val), value)
+                value = detach(value, limits, policy=redaction, serializers=serializers)
+                keep = True
+            except Exception:
+                # Fall back to the string representation
+                tally.serializer_failures += 1
+                keep = False
+        else:
+            keep = False
+
+        if format_var is not None:
+            rep = format_var(var_name, var_val)
+        else:
+            rep, truncated = repr_within(value, max_var_length,
+                                         max_depth=max_var_depth,
+                                         max_items=max_var_items)
+            if truncated:
+                rep += TRUNCATION_MARKER
+                tally.truncations += 1
+        if redaction is not None and not keep:
+            # Only representations built from live objects can hold secrets
+            # the capture-time pass did not see
+            rep = redaction.redact_text(rep)
+        tally.rendered_bytes += len(rep)
+        return (value if keep else rep), rep
+
+    except Exception as format_err:
+        rep = f"<unrepresentable: {type(format_err).__name__}>"
+        return rep, rep
+
+
+def _render_snapshot(snapshot: ExceptionSnapshot,
+                     *,
+                     max_var_length: int = 1000,
+                     format_var: Optional[Callable[[str, Any], str]] = None,
+                     max_var_depth: Optional[int] = None,
+                     max_var_items: Optional[int] = None,
+                     serializers: Optional[SerializerRegistry] = None,
+                     source_context: Optional[int] = None
+                     ) -> Tuple[Dict[str, Any], List[LogRecordArgs]]:
+    """Build the structured error data and the log records for a snapshot."""
+    start = time.perf_counter()
+    tally = _RenderTally()
+    error_data, records = _render_snapshot_data(snapshot, tally, max_var_length, format_var,
+                                                max_var_depth, max_var_items,
+                                                serializers or default_registry, source_context)
+    elapsed = time.perf_counter() - start
+    if snapshot.sampler is not None:
+        # Rendering is most of the cost of slow representations
+        snapshot.sampler.record_cost(elapsed)
+    if metrics.enabled:
+        metrics.record_render(elapsed, tally.rendered_bytes,
+                              tally.truncations, tally.serializer_failures)
+    return error_data, records
+
+
+def _render_snapshot_data(snapshot: ExceptionSnapshot,
+                          tally: _RenderTally,
+                          max_var_length: int,
+                          format_var: Optional[Callable[[str, Any], str]],
+                          max_var_depth: Optional[int],
+                          max_var_items: Optional[int],
+                          serializers: SerializerRegistry,
+                          source_context: Optional[int]
+                          ) -> Tuple[Dict[str, Any], List[LogRecordArgs]]:
+    # Build structured data
+    error_data = {
+        "error": snapshot.error,
+        "error_type": snapshot.error_type,
+        "fingerprint": snapshot.fingerprint,
+        "frames": []
+    }
+    if snapshot.level is not None:
+        error_data["sampling_level"] = snapshot.level
+    if snapshot.item_index is not None:
+        error_data["item_index"] = snapshot.item_index
+    records: List[LogRecordArgs] = []
+    for fingerprint, (label, count) in snapshot.report.items():
+        records.append(("Suppressed %d occurrences of %s [fingerprint %s]",
+                        (count, label, fingerprint)))
+
+    if snapshot.suppressed:
+        error_data["suppressed"] = True
+        if snapshot.summary is not None:
+            records.append(("%s", (snapshot.summary,)))
+        return error_data, records
+
+    # Header for context
+    records.append(("Logging exception state for: %s: %s",
+                    (snapshot.error_type, snapshot.error)))
+    if snapshot.item_index is not None:
+        records.append(("Generator failed on item %d", (snapshot.item_index,)))
+    if snapshot.level == sampling.FRAMES:
+        records.append(("Locals not captured (sampling level %s)", (snapshot.level,)))
+
+    def render_frame(frame: FrameSnapshot) -> Dict[str, Any]:
+        return _render_frame(frame, records, max_var_length, format_var, max_var_depth,
+                             max_var_items, serializers, snapshot.limits, tally,
+                             source_context, snapshot.redaction)
+
+    rendered = set()
+    for frame in snapshot.frames:
+        error_data["frames"].append(render_frame(frame))
+        rendered.add(frame.frame_id)
+
+    if snapshot.related:
+        exceptions = error_data["exceptions"] = []
+        chained_frames = error_data["chained_frames"] = []
+        for chained in snapshot.related:
+            exceptions.append({
+                "exception_id": chained.exception_id,
+                "parent": chained.parent,
+                "relation": chained.relation,
+                "error_type": chained.error_type,
+                "error": chained.error,
+                "frame_ids": [frame.frame_id for frame in chained.frames],
+            })
+            records.append(("-- Exception %d (%s of exception %d): %s: %s --",
+                            (chained.exception_id, chained.relation, chained.parent,
+                             chained.error_type, chained.error)))
+            for frame in chained.frames:
+                if frame.frame_id in rendered:
+                    records.append(("-- Frame %d: %r in %s at line %d (shown above) --",
+                                    (frame.frame_number, frame.function, frame.file, frame.line)))
+                    continue
+                chained_frames.append(render_frame(frame))
+                rendered.add(frame.frame_id)
+
+    return error_data, records
+
+
+def _render_frame(frame: FrameSnapshot,
+                  records: List[LogRecordArgs],
+                  max_var_length: int,
+                  format_var: Optional[Callable[[str, Any], str]],
+                  max_var_depth: Optional[int],
+                  max_var_items: Optional[int],
+                  serializers: SerializerRegistry,
+                  limits: SnapshotLimits,
+                  tally: _RenderTally,
+                  source_context: Optional[int] = None,
+                  redaction: Optional[RedactionPolicy] = None) -> Dict[str, Any]:
+    """Build the data of one frame, appending its log records to `records`."""
+    frame_locals: Dict[str, Any] = {}
+    frame_data = {
+        "frame_number": frame.frame_number,
+        "frame_id": frame.frame_id,
+        "function": frame.function,
+        "file": frame.file,
+        "line": frame.line,
+        "locals": frame_locals
+    }
+    location = (frame.frame_number, frame.function, frame.file, frame.line)
+
+    if frame.locals is None:
+        frame_data["locals_omitted"] = True
+        records.append(("-- Frame %d: %r in %s at line %d (locals omitted) --", location))
+    else:
+        records.append(("-- Frame %d: %r in %s at line %d --", location))
+
+    if source_context is not None and frame.code is not None:
+        source = default_source_cache.source_lines(frame.code, frame.line, source_context)
+        frame_data["source"] = [[number, text] for number, text in source]
+        for number, text in source:
+            records.append(("  %s %4d | %s", (">" if number == frame.line else " ", number, text)))
+
+    if frame.locals is None:
+        return frame_data
+
+    for var_name, var_val in frame.locals.items():
+        value, rep = _render_local(var_name, var_val, max_var_length, format_var,
+                                   max_var_depth, max_var_items, serializers, limits, tally,
+                                   redaction)
+        frame_locals[var_name] = value
+        records.append(("    %s = %s", (var_name, rep)))
+    return frame_data
+
+
+def _emit_records(logger: logging.Logger,
+                  level: int,
+                  records: List[LogRecordArgs],
+                  error_data: Dict[str, Any],
+                  batched: bool = False) -> None:
+    """Send rendered records to the logger, one by one or as a single record."""
+    if not records:
+        return
+    if batched:
+        # The whole trace becomes one preformatted record
+        text = "\n".join(msg % args for msg, args in records)
+        logger.log(level, "%s", text, extra={"error_data": error_data})
+    else:
+        for msg, args in records:
+            logger.log(level, msg, *args)
+
+
+def log_snapshot(snapshot: ExceptionSnapshot,
+                 logger: logging.Logger,
+                 level: int = logging.ERROR,
+                 *,
+                 batched: bool = False,
+                 **render_kwargs: Any) -> Dict[str, Any]:
+    """
+    Format and log a snapshot taken by capture_snapshot and return structured data.
+
+    This is the expensive second phase of log_exception_state (repr, model
+    dumping and handler I/O). It no longer needs the traceback, so it can run
+    on another thread, e.g. through a BackgroundEmitter.
+
+    Args:
+        snapshot: The snapshot to log.
+        logger: A logging.Logger (or logger-like) instance.
+        level: The log level to use.
+        batched: Emit the whole trace as a single log record.
+        **render_kwargs: Formatting options of log_exception_state
+                         (max_var_length, format_var, max_var_depth, ...).
+
+    Returns:
+        Dict containing structured exception data with error info and frame details.
+    """
+    error_data, records = _render_snapshot(snapshot, **render_kwargs)
+    _emit_records(logger, level, records, error_data, batched)
+    return error_data
 
 
 def log_exception_state(exc: Exception,
@@ -11,7 +949,22 @@ def log_exception_state(exc: Exception,
                         *,
                         max_var_length: int = 1000,
                         exclude_vars: Optional[List[str]] = None,
-                        format_var: Optional[Callable[[str, Any], str]] = None) -> Dict[str, Any]:
+                        format_var: Optional[Callable[[str, Any], str]] = None,
+                        max_var_depth: Optional[int] = None,
+                        max_var_items: Optional[int] = None,
+                        batched: bool = False,
+                        rate_limiter: Optional[RateLimiter] = None,
+                        serializers: Optional[SerializerRegistry] = None,
+                        relevant_locals: bool = False,
+                        frame_filter: Optional[FrameFilter] = None,
+                        limits: Optional[SnapshotLimits] = None,
+                        release_frames: bool = False,
+                        source_context: Optional[int] = None,
+                        redaction: Optional[RedactionPolicy] = None,
+                        attach_snapshot: bool = False,
+                        buffer: Optional["SnapshotBuffer"] = None,
+                        sampler: Optional[AdaptiveSampler] = None,
+                        item_index: Optional[int] = None) -> Dict[str, Any]:
     """
     Walk the traceback of `exc`, logging each frame's local variables and return structured data.
 
@@ -20,114 +973,109 @@ def log_exception_state(exc: Exception,
         logger: A logging.Logger (or logger-like) instance.
         level: The log level to use (e.g. logging.ERROR, logging.DEBUG).
         max_var_length: If repr(var) exceeds this, it will be truncated with '...'.
+                        The repr stops being built once this budget is spent.
         exclude_vars: List of variable names to exclude from logging (e.g. passwords).
         format_var: Optional function to customize variable formatting: 
-                    format_var(var_name, var_value) -> formatted_string
+                    format_var(var_name, var_value) -> formatted_string;
+                    it receives the captured copy of the value (the live
+                    object with SnapshotLimits(keep_references=True))
+        max_var_depth: Nesting depth beyond which containers are shown as [...]
+                       (None for no limit).
+        max_var_items: Number of items shown per container before '...'
+                       (None for no limit).
+        batched: Emit the whole trace as a single preformatted log record, with
+                 the structured data attached as `record.error_data`, instead of
+                 one record per frame and per variable.
+        rate_limiter: RateLimiter keyed by the exception's fingerprint. Once a
+                      fingerprint exceeds its budget, only a one-line summary
+                      is logged (or nothing) and no locals are captured;
+                      suppressed counts are logged periodically.
+        serializers: SerializerRegistry turning locals into structured data
+                     (defaults to tracelight.serializers.default_registry).
+        relevant_locals: Only capture each frame's arguments and the variables
+                         used on and around its failing line.
+        frame_filter: FrameFilter with include/exclude rules, metadata-only
+                      library frames and innermost/outermost depth limits.
+                      Frames without locals are marked "locals_omitted".
+        limits: SnapshotLimits bounding the detached copies of locals stored
+                in the returned data (defaults to tracelight.detach.DEFAULT_LIMITS).
+        release_frames: Clear the locals of the traceback's frames once they
+                        are captured, breaking the exception/frame reference
+                        cycle so handled exceptions are freed immediately.
+                        Outer handlers and debuggers then see no locals.
+        source_context: Include the failing source line of each frame and this
+                        many lines around it, as "source" ([line, text] pairs)
+                        and in the log. Lines come from a shared, bounded cache
+                        (tracelight.source.default_source_cache). None for no source.
+        redaction: RedactionPolicy hiding secrets in variable names, dict keys,
+                   string values, model fields and exception messages.
+        attach_snapshot: Attach the picklable snapshot to `exc`, so it reaches
+                         a parent process along with the exception (see snapshot_of).
+        buffer: SnapshotBuffer keeping recent snapshots for later queries.
+        sampler: AdaptiveSampler lowering the detail captured (frames only, or
+                 just a count) while exceptions are frequent.
+        item_index: Index of the item a generator was producing when it
+                    failed; logged and stored as "item_index".
                     
     Returns:
         Dict containing structured exception data with error info and frame details.
+        It includes the exception's "fingerprint", and "suppressed": True with
+        no frames when the rate limiter skipped the capture. Chained causes,
+        contexts and ExceptionGroup members are listed under "exceptions",
+        each referring to its frames by "frame_id"; frames not already in
+        "frames" are stored once under "chained_frames". With a sampler,
+        "sampling_level" holds the level the exception was captured with, and
+        "item_index" the generator item that failed (see traced).
     """
-    exclude_vars = exclude_vars or []
-    tb = exc.__traceback__
-    
-    # Build structured data
-    error_data = {
-        "error": str(exc),
-        "error_type": type(exc).__name__,
-        "frames": []
-    }
-    
-    # Header for context
-    logger.log(level, "Logging exception state for: %s: %s",
-              type(exc).__name__, exc)
-    
-    frame_count = 0
-    while tb is not None:
-        frame: FrameType = tb.tb_frame
-        lineno: int = tb.tb_lineno
-        func_name: str = frame.f_code.co_name
-        filename: str = frame.f_code.co_filename
-        
-        frame_count += 1
-        
-        logger.log(level,
-                  "-- Frame %d: %r in %s at line %d --",
-                  frame_count, func_name, filename, lineno)
-
-        # Build frame data
-        frame_data = {
-            "frame_number": frame_count,
-            "function": func_name,
-            "file": filename,
-            "line": lineno,
-            "locals": {}
-        }
+    snapshot = capture_snapshot(exc, exclude_vars=exclude_vars, rate_limiter=rate_limiter,
+                                relevant_locals=relevant_locals, frame_filter=frame_filter,
+                                limits=limits, release_frames=release_frames,
+                                redaction=redaction, attach_snapshot=attach_snapshot,
+                                buffer=buffer, sampler=sampler, item_index=item_index,
+                                serializers=serializers)
+    return log_snapshot(snapshot, logger, level,
+                        max_var_length=max_var_length,
+                        format_var=format_var,
+                        max_var_depth=max_var_depth,
+                        max_var_items=max_var_items,
+                        batched=batched,
+                        serializers=serializers,
+                        source_context=source_context)
 
-        for var_name, var_val in frame.f_locals.items():
-            if var_name in exclude_vars:
-                continue
-                
-            try:
-                # Check if it's a Pydantic BaseModel and handle specially
-                if hasattr(var_val, '__class__'):
-                    # Try model_dump for Pydantic v2
-                    if hasattr(var_val.__class__, 'model_dump'):
-                        try:
-                            frame_data["locals"][var_name] = var_val.model_dump()
-                            continue
-                        except Exception:
-                            # Fall through to next approach
-                            pass
-                    
-                    # Try dict() for Pydantic v1
-                    if hasattr(var_val, 'dict') and callable(var_val.dict):
-                        try:
-                            frame_data["locals"][var_name] = var_val.dict()
-                            continue
-                        except Exception:
-                            # Fall through to regular processing
-                            pass
-                
-                # Regular variable processing
-                if format_var is not None:
-                    rep = format_var(var_name, var_val)
-                else:
-                    rep = repr(var_val)
-                    # truncate if too long
-                    if len(rep) > max_var_length:
-                        rep = rep[:max_var_length] + "...<truncated>"
-                        
-                # Try to keep the actual value if it's JSON-serializable
-                try:
-                    # Test if value is JSON-serializable basic types
-                    if isinstance(var_val, (str, int, float, bool, type(None))) or \
-                       (isinstance(var_val, (list, dict)) and not var_name.startswith('__')):
-                        # For basic types, store the actual value
-                        frame_data["locals"][var_name] = var_val
-                    else:
-                        # For complex types, store the string representation
-                        frame_data["locals"][var_name] = rep
-                except (TypeError, ValueError):
-                    # Fallback to string representation
-                    frame_data["locals"][var_name] = rep
-                    
-            except Exception as format_err:
-                rep = f"<unrepresentable: {type(format_err).__name__}>"
-                frame_data["locals"][var_name] = rep
 
-            logger.log(level, "    %s = %s", var_name, rep)
+async def log_exception_state_async(exc: Exception,
+                                    logger: logging.Logger,
+                                    level: int = logging.ERROR,
+                                    **kwargs: Any) -> Dict[str, Any]:
+    """
+    Async variant of log_exception_state that runs off the event loop.
 
-        error_data["frames"].append(frame_data)
-        tb = tb.tb_next
-    
-    return error_data
+    Only the cheap snapshot is taken on the loop; the repr, formatting and
+    handler I/O happen in the loop's default executor, so tracing a failing
+    coroutine does not stall other tasks on the loop.
+
+    Args:
+        exc: The caught exception.
+        logger: A logging.Logger (or logger-like) instance.
+        level: The log level to use.
+        **kwargs: Keyword options accepted by log_exception_state.
+
+    Returns:
+        Dict containing structured exception data with error info and frame details.
+    """
+    capture_kwargs, render_kwargs = _split_options(kwargs)
+    snapshot = capture_snapshot(exc, **capture_kwargs)
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(
+        None, functools.partial(log_snapshot, snapshot, logger, level, **render_kwargs))
         
 
 class TracedError(Exception):
     """An exception that automatically logs its traceback and all local variables.
     
-    This can be raised directly or used as a context manager to automatically catch,
-    log, and re-raise exceptions with detailed state information.
+    This can be raised directly or used as a context manager (``with`` or
+    ``async with``) to automatically catch, log, and re-raise exceptions with
+    detailed state information.
     """
     
     def __init__(self, 
@@ -135,25 +1083,68 @@ class TracedError(Exception):
                  logger: Optional[logging.Logger] = None,
                  level: int = logging.ERROR,
                  max_var_length: int = 1000,
-                 exclude_vars: Optional[List[str]] = None):
+                 exclude_vars: Optional[List[str]] = None,
+                 batched: bool = False,
+                 rate_limiter: Optional[RateLimiter] = None,
+                 relevant_locals: bool = False,
+                 frame_filter: Optional[FrameFilter] = None,
+                 limits: Optional[SnapshotLimits] = None,
+                 release_frames: bool = False,
+                 source_context: Optional[int] = None,
+                 redaction: Optional[RedactionPolicy] = None,
+                 attach_snapshot: bool = False,
+                 buffer: Optional["SnapshotBuffer"] = None,
+                 sampler: Optional[AdaptiveSampler] = None):
         super().__init__(message)
         self.logger = logger or logging.getLogger(__name__)
         self.level = level
         self.max_var_length = max_var_length
-        self.exclude_vars = exclude_vars or []
+        self.exclude_vars = frozenset(exclude_vars or ())
+        self.batched = batched
+        self.rate_limiter = rate_limiter
+        self.relevant_locals = relevant_locals
+        self.frame_filter = frame_filter
+        self.limits = limits
+        self.release_frames = release_frames
+        self.source_context = source_context
+        self.redaction = redaction
+        self.attach_snapshot = attach_snapshot
+        self.buffer = buffer
+        self.sampler = sampler
         
     def __enter__(self):
         return self
         
+    def _capture_kwargs(self) -> Dict[str, Any]:
+        return {
+            "max_var_length": self.max_var_length,
+            "exclude_vars": self.exclude_vars,
+            "batched": self.batched,
+            "rate_limiter": self.rate_limiter,
+            "relevant_locals": self.relevant_locals,
+            "frame_filter": self.frame_filter,
+            "limits": self.limits,
+            "release_frames": self.release_frames,
+            "source_context": self.source_context,
+            "redaction": self.redaction,
+            "attach_snapshot": self.attach_snapshot,
+            "buffer": self.buffer,
+            "sampler": self.sampler,
+        }
+
     def __exit__(self, exc_type, exc_val, exc_tb):
         if exc_val is not None:
-            log_exception_state(
-                exc_val, 
-                self.logger, 
-                self.level, 
-                max_var_length=self.max_var_length,
-                exclude_vars=self.exclude_vars
-            )
+            log_exception_state(exc_val, self.logger, self.level, **self._capture_kwargs())
             # Don't suppress the exception
             return False
         return True
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        if exc_val is not None:
+            await log_exception_state_async(
+                exc_val, self.logger, self.level, **self._capture_kwargs())
+        # Never suppress the exception
+        return False
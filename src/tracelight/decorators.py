@@ -1,56 +1,329 @@
 import functools
+import inspect
 import logging
-from typing import Any, Callable, Optional, List, TypeVar, cast, Union
+from typing import Any, Callable, Dict, Optional, List, Tuple, TypeVar, cast, Union
 
-from tracelight.core import log_exception_state
+from tracelight.background import BackgroundEmitter
+from tracelight.buffer import SnapshotBuffer
+from tracelight.core import log_exception_state, log_exception_state_async
+from tracelight.fingerprint import RateLimiter
+from tracelight.detach import SnapshotLimits
+from tracelight.frames import FrameFilter
+from tracelight.redaction import RedactionPolicy
+from tracelight.sampling import AdaptiveSampler
 
 # Type variable for decorator to preserve function signature
 F = TypeVar('F', bound=Callable[..., Any])
 
+# Wrapper factories compiled per signature shape
+_MAX_CACHED_SHAPES = 4096
+_wrapper_factories: Dict[Tuple[Any, ...], Callable[..., Any]] = {}
+
+_WRAPPER_TEMPLATE = """\
+def make(_tracelight_func, _tracelight_handle, _tracelight_reraise):
+    def wrapper({params}):
+        try:
+            return _tracelight_func({arguments})
+        except Exception as _tracelight_error:
+            _tracelight_handle(_tracelight_error)
+            if _tracelight_reraise:
+                raise
+            return None
+    return wrapper
+"""
+
+
+def _signature_shape(func: Callable[..., Any]) -> Optional[Tuple[Any, ...]]:
+    """Return the parameter layout of a plain Python function, or None."""
+    if not inspect.isfunction(func):
+        return None
+    code = func.__code__
+    count = code.co_argcount + code.co_kwonlyargcount
+    has_varargs = bool(code.co_flags & inspect.CO_VARARGS)
+    has_varkw = bool(code.co_flags & inspect.CO_VARKEYWORDS)
+    # co_varnames starts with the positional, keyword-only, *args and **kwargs names
+    names = code.co_varnames[:count + has_varargs + has_varkw]
+    if any(name.startswith("_tracelight_") for name in names):
+        return None
+    # co_posonlyargcount exists on Python 3.8+
+    return (names, getattr(code, "co_posonlyargcount", 0), code.co_argcount, code.co_kwonlyargcount,
+            has_varargs, has_varkw)
+
+
+def _wrapper_factory(shape: Tuple[Any, ...]) -> Callable[..., Any]:
+    """Compile (once per shape) a factory of wrappers with exactly that signature."""
+    factory = _wrapper_factories.get(shape)
+    if factory is not None:
+        return factory
+    names, posonly, argcount, kwonly, has_varargs, has_varkw = shape
+    positional = list(names[:argcount])
+    keyword_only = list(names[argcount:argcount + kwonly])
+    params = list(positional)
+    arguments = list(positional)
+    if posonly:
+        params.insert(posonly, "/")
+    index = argcount + kwonly
+    if has_varargs:
+        params.append("*" + names[index])
+        arguments.append("*" + names[index])
+        index += 1
+    elif keyword_only:
+        params.append("*")
+    params.extend(keyword_only)
+    arguments.extend(f"{name}={name}" for name in keyword_only)
+    if has_varkw:
+        params.append("**" + names[index])
+        arguments.append("**" + names[index])
+    source = _WRAPPER_TEMPLATE.format(params=", ".join(params),
+                                      arguments=", ".join(arguments))
+    namespace: Dict[str, Any] = {}
+    exec(compile(source, "<tracelight wrapper>", "exec"), namespace)
+    factory = namespace["make"]
+    if len(_wrapper_factories) >= _MAX_CACHED_SHAPES:
+        _wrapper_factories.clear()
+    _wrapper_factories[shape] = factory
+    return factory
+
+
+def _sync_wrapper(func: Callable[..., Any],
+                  handle: Callable[[Exception], None],
+                  reraise: bool,
+                  specialize: bool = False) -> Callable[..., Any]:
+    """
+    Wrap a regular function so exceptions go to `handle`.
+
+    With `specialize`, plain Python functions get a wrapper compiled with the
+    same parameters (and defaults), so calls are forwarded without packing
+    ``*args`` and ``**kwargs``. Calls with invalid arguments then fail while
+    binding the wrapper, before its ``try``, so they are neither captured nor
+    swallowed by reraise=False. Otherwise, and for other callables, the
+    generic wrapper is used.
+    """
+    shape = _signature_shape(func) if specialize else None
+    if shape is not None:
+        wrapper = _wrapper_factory(shape)(func, handle, reraise)
+        wrapper.__defaults__ = func.__defaults__
+        wrapper.__kwdefaults__ = func.__kwdefaults__
+        return functools.wraps(func)(wrapper)
+
+    @functools.wraps(func)
+    def wrapper(*args: Any, **kwargs: Any) -> Any:
+        try:
+            return func(*args, **kwargs)
+        except Exception as e:
+            handle(e)
+            if reraise:
+                raise
+            return None  # If not reraising
+
+    return wrapper
+
 def traced(logger: Optional[logging.Logger] = None,
            level: int = logging.ERROR,
            max_var_length: int = 1000,
            exclude_vars: Optional[List[str]] = None,
-           reraise: bool = True) -> Callable[[F], F]:
+           reraise: bool = True,
+           batched: bool = False,
+           emitter: Optional[BackgroundEmitter] = None,
+           rate_limiter: Optional[RateLimiter] = None,
+           relevant_locals: bool = False,
+           frame_filter: Optional[FrameFilter] = None,
+           limits: Optional[SnapshotLimits] = None,
+           release_frames: bool = False,
+           source_context: Optional[int] = None,
+           redaction: Optional[RedactionPolicy] = None,
+           attach_snapshot: bool = False,
+           buffer: Optional[SnapshotBuffer] = None,
+           sampler: Optional[AdaptiveSampler] = None,
+           item_index: bool = False,
+           specialize: bool = False) -> Callable[[F], F]:
     """
     Decorator that catches exceptions and logs all local variables in the traceback.
-    
+
+    Works on both regular and ``async def`` functions. For coroutine functions
+    the variable capture and logging run in the event loop's default executor.
+
+    Generator and async generator functions are traced while they are
+    iterated: an exception raised by the ``next``/``send`` (or ``__anext__``/
+    ``asend``) that fails is captured, not just the call creating the
+    generator. Plain generators are delegated to with ``yield from``, so the
+    success path costs nothing per item unless `item_index` is set.
+
     Args:
         logger: Logger to use (creates one if None)
         level: Log level to use
         max_var_length: Maximum length for variable representations
         exclude_vars: Variable names to exclude from logs
         reraise: Whether to re-raise the exception after logging
-    
+        batched: Emit each trace as a single log record (see log_exception_state)
+        emitter: BackgroundEmitter that formats and logs the trace on its worker
+                 thread; only a cheap snapshot is taken on the calling thread
+        rate_limiter: RateLimiter that skips the full capture of repeated failures
+        relevant_locals: Only capture arguments and variables used around the
+                         failing line of each frame
+        frame_filter: FrameFilter selecting which frames keep their locals
+        limits: SnapshotLimits bounding the copies of captured locals
+        release_frames: Clear the traceback's frame locals after capture, so
+                        handled exceptions don't linger in reference cycles
+        source_context: Log the failing source line of each frame with this
+                        many lines of context (None for no source)
+        redaction: RedactionPolicy hiding secrets in captured names and values;
+                   build it once and share it between decorators
+        attach_snapshot: Attach the picklable snapshot to the exception, so it
+                         reaches the parent of a process pool worker with it
+        buffer: SnapshotBuffer keeping recent snapshots for later queries
+        sampler: AdaptiveSampler lowering the captured detail (frames only, or
+                 just a count) while exceptions are frequent
+        item_index: For generators, record the index of the item being produced
+                    when the exception was raised on the snapshot, so it is
+                    logged and stored as "item_index" (counts items as they
+                    are requested)
+        specialize: Compile a wrapper with the function's own signature, which
+                    roughly quarters the success-path overhead; calls with
+                    invalid arguments then raise TypeError without being
+                    captured (or swallowed by reraise=False)
+
     Examples:
         @traced()
         def my_function(x, y):
             return x / y  # Will log all context if y is 0
-            
+
         @traced(logger=my_logger, level=logging.WARNING, reraise=False)
         def safe_operation():
             # Exceptions will be logged with variables but not propagated
             risky_call()
+
+        @traced()
+        async def fetch(url):
+            return await client.get(url)
+
+        @traced(item_index=True)
+        def transform(rows):
+            for row in rows:
+                yield clean(row)  # Logs "... failed on item 1042" and the locals
     """
     _logger = logger or logging.getLogger(__name__)
-    _exclude_vars = exclude_vars or []
-    
+    _capture_kwargs = {
+        "max_var_length": max_var_length,
+        "exclude_vars": tuple(exclude_vars or ()),
+        "batched": batched,
+        "rate_limiter": rate_limiter,
+        "relevant_locals": relevant_locals,
+        "frame_filter": frame_filter,
+        "limits": limits,
+        "release_frames": release_frames,
+        "source_context": source_context,
+        "redaction": redaction,
+        "attach_snapshot": attach_snapshot,
+        "buffer": buffer,
+        "sampler": sampler,
+    }
+
+    def handle(e: Exception, index: Optional[int] = None) -> None:
+        if emitter is not None:
+            emitter.log_exception(e, _logger, level, item_index=index, **_capture_kwargs)
+        else:
+            log_exception_state(e, _logger, level, item_index=index, **_capture_kwargs)
+
+    async def handle_async(e: Exception, index: Optional[int] = None) -> None:
+        if emitter is not None:
+            emitter.log_exception(e, _logger, level, item_index=index, **_capture_kwargs)
+        else:
+            await log_exception_state_async(e, _logger, level, item_index=index,
+                                            **_capture_kwargs)
+
     def decorator(func: F) -> F:
-        @functools.wraps(func)
-        def wrapper(*args: Any, **kwargs: Any) -> Any:
-            try:
-                return func(*args, **kwargs)
-            except Exception as e:
-                log_exception_state(
-                    e, 
-                    _logger, 
-                    level, 
-                    max_var_length=max_var_length,
-                    exclude_vars=_exclude_vars
-                )
-                if reraise:
-                    raise
-                return None  # If not reraising
-                
-        return cast(F, wrapper)
+        wrapped = wrap(func)
+        # Lets trace_class and trace_module skip functions traced already
+        wrapped.__tracelight_traced__ = True  # type: ignore[attr-defined]
+        return wrapped
+
+    def wrap(func: F) -> F:
+        if inspect.isasyncgenfunction(func):
+            @functools.wraps(func)
+            async def async_gen_wrapper(*args: Any, **kwargs: Any) -> Any:
+                agen = func(*args, **kwargs)
+                # Index of the item being produced; async generators can't be
+                # delegated to natively, so counting costs one addition per item
+                index = 0
+                try:
+                    value = await agen.__anext__()
+                    while True:
+                        try:
+                            sent = yield value
+                        except GeneratorExit:
+                            await agen.aclose()
+                            raise
+                        except BaseException as thrown:
+                            index += 1
+                            value = await agen.athrow(thrown)
+                        else:
+                            index += 1
+                            value = await agen.asend(sent)
+                except StopAsyncIteration:
+                    return
+                except Exception as e:
+                    await handle_async(e, index if item_index else None)
+                    if reraise:
+                        raise
+
+            return cast(F, async_gen_wrapper)
+
+        if inspect.isgeneratorfunction(func):
+            if not item_index:
+                @functools.wraps(func)
+                def gen_wrapper(*args: Any, **kwargs: Any) -> Any:
+                    try:
+                        # Delegates next/send/throw/close without per-item work
+                        return (yield from func(*args, **kwargs))
+                    except Exception as e:
+                        handle(e)
+                        if reraise:
+                            raise
+                        return None  # If not reraising
+
+                return cast(F, gen_wrapper)
+
+            @functools.wraps(func)
+            def indexed_gen_wrapper(*args: Any, **kwargs: Any) -> Any:
+                gen = func(*args, **kwargs)
+                index = 0
+                try:
+                    value = next(gen)
+                    while True:
+                        try:
+                            sent = yield value
+                        except GeneratorExit:
+                            gen.close()
+                            raise
+                        except BaseException as thrown:
+                            index += 1
+                            value = gen.throw(thrown)
+                        else:
+                            index += 1
+                            value = gen.send(sent)
+                except StopIteration as stop:
+                    return stop.value
+                except Exception as e:
+                    handle(e, index)
+                    if reraise:
+                        raise
+                    return None  # If not reraising
+
+            return cast(F, indexed_gen_wrapper)
+
+        if inspect.iscoroutinefunction(func):
+            @functools.wraps(func)
+            async def async_wrapper(*args: Any, **kwargs: Any) -> Any:
+                try:
+                    return await func(*args, **kwargs)
+                except Exception as e:
+                    await handle_async(e)
+                    if reraise:
+                        raise
+                    return None  # If not reraising
+
+            return cast(F, async_wrapper)
+
+        return cast(F, _sync_wrapper(func, handle, reraise, specialize))
     return decorator
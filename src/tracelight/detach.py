@@ -0,0 +1,230 @@
+"""Bounded deep copies of captured locals.
+
+Storing live ``list``/``dict`` locals in a snapshot aliases application state:
+the captured data changes after the fact and keeps arbitrarily large objects
+alive for as long as the snapshot is held. detach copies builtin containers
+and strings with limits on element count, depth, string length and the
+estimated bytes of the whole snapshot, so the memory retained per captured
+error is bounded by the limits, not by the application's data. Other objects
+are replaced by their serializer output or a bounded representation, so a
+snapshot never changes after capture, whichever thread renders it.
+"""
+
+from typing import Any, Optional
+
+from tracelight.bounded_repr import TRUNCATION_MARKER, repr_within
+from tracelight.metrics import metrics
+from tracelight.redaction import RedactionPolicy
+from tracelight.serializers import KEEP_VALUE, SerializerRegistry, default_registry
+
+# Estimated sizes used for the byte budget (CPython, 64-bit)
+_CONTAINER_OVERHEAD = 64
+_SLOT_SIZE = 8
+_SCALAR_SIZE = 32
+
+_SCALARS = (int, float, complex, bool, type(None))
+
+# Characters past max_string still scrubbed by a RedactionPolicy
+_REDACTION_MARGIN = 256
+
+
+class SnapshotLimits:
+    """Limits applied when copying locals into a snapshot.
+
+    Args:
+        max_items: Items kept per container; the rest are summarized by a
+            "...<N more items>" entry.
+        max_depth: Container nesting kept; deeper containers are replaced by a
+            "<list with N items>" style summary.
+        max_string: Characters (or bytes) kept per string.
+        max_bytes: Estimated bytes for all values of one snapshot; once spent,
+            remaining values are replaced by "<omitted: snapshot size limit>".
+        max_repr: Characters kept of the representation stored for an object
+            that has no serializer.
+        keep_references: Keep objects other than builtin data by reference
+            instead of converting them at capture. Rendering then sees the live
+            objects (for format_var or a render-time serializer registry), but
+            it runs later, possibly on another thread: it shows the objects as
+            they are then, not as they were when the exception was raised, it
+            may call __repr__ while the application mutates them, and the
+            snapshot keeps them alive.
+
+    Examples:
+        log_exception_state(e, logger, limits=SnapshotLimits(max_items=20))
+    """
+
+    __slots__ = ("max_items", "max_depth", "max_string", "max_bytes", "max_repr",
+                 "keep_references")
+
+    def __init__(self,
+                 max_items: int = 100,
+                 max_depth: int = 6,
+                 max_string: int = 10000,
+                 max_bytes: int = 256 * 1024,
+                 max_repr: int = 1000,
+                 keep_references: bool = False):
+        self.max_items = max_items
+        self.max_depth = max_depth
+        self.max_string = max_string
+        self.max_bytes = max_bytes
+        self.max_repr = max_repr
+        self.keep_references = keep_references
+
+
+DEFAULT_LIMITS = SnapshotLimits()
+
+OMITTED = "<omitted: snapshot size limit>"
+
+
+class DetachedRepr(str):
+    """Representation stored in place of an object; its repr is itself."""
+
+    __slots__ = ()
+
+    def __repr__(self) -> str:
+        return str(self)
+
+
+class ByteBudget:
+    """Estimated bytes left for one snapshot; shared by all its values."""
+
+    __slots__ = ("remaining",)
+
+    def __init__(self, limit: int):
+        self.remaining = limit
+
+
+def _summary(value: Any) -> str:
+    try:
+        return f"<{type(value).__name__} with {len(value)} items>"
+    except Exception:
+        return f"<{type(value).__name__}>"
+
+
+def _copy(value: Any, limits: SnapshotLimits, budget: ByteBudget, depth: int,
+          policy: Optional[RedactionPolicy], serializers: SerializerRegistry) -> Any:
+    if budget.remaining <= 0:
+        return OMITTED
+
+    if isinstance(value, _SCALARS):
+        budget.remaining -= _SCALAR_SIZE
+        return value
+
+    if isinstance(value, (str, bytes)):
+        if policy is not None and isinstance(value, str) and policy.redacts_values:
+            # Scrub a little past the cut, so a secret on the boundary is caught
+            value = policy.redact_text(value[:limits.max_string + _REDACTION_MARGIN]) \
+                + value[limits.max_string + _REDACTION_MARGIN:]
+        if len(value) > limits.max_string:
+            cut = len(value) - limits.max_string
+            head = value[:limits.max_string]
+            value = (head + f"...<{cut} more chars>" if isinstance(value, str)
+                     else head + f"...<{cut} more bytes>".encode())
+        budget.remaining -= _CONTAINER_OVERHEAD + len(value)
+        return value
+
+    if isinstance(value, dict):
+        if depth >= limits.max_depth:
+            budget.remaining -= _CONTAINER_OVERHEAD
+            return _summary(value)
+        budget.remaining -= _CONTAINER_OVERHEAD
+        result = {}
+        for count, (key, item) in enumerate(value.items()):
+            if count >= limits.max_items or budget.remaining <= 0:
+                result["..."] = f"<{len(value) - count} more items>"
+                break
+            budget.remaining -= 2 * _SLOT_SIZE
+            if policy is not None and isinstance(key, str) and policy.matches_name(key):
+                result[key] = policy.replacement
+                continue
+            result[_copy(key, limits, budget, depth + 1, policy, serializers)] = \
+                _copy(item, limits, budget, depth + 1, policy, serializers)
+        return result
+
+    if isinstance(value, list) or type(value) in (tuple, set, frozenset):
+        if depth >= limits.max_depth:
+            budget.remaining -= _CONTAINER_OVERHEAD
+            return _summary(value)
+        budget.remaining -= _CONTAINER_OVERHEAD
+        items = []
+        for count, item in enumerate(value):
+            if count >= limits.max_items or budget.remaining <= 0:
+                items.append(f"...<{len(value) - count} more items>")
+                break
+            budget.remaining -= _SLOT_SIZE
+            items.append(_copy(item, limits, budget, depth + 1, policy, serializers))
+        if isinstance(value, list):
+            return items
+        if isinstance(value, tuple):
+            return tuple(items)
+        # Sets may have lost items or gained a marker; a list keeps both visible
+        return items if len(items) != len(value) else type(value)(items)
+
+    if limits.keep_references:
+        # Turned into structured data or a bounded repr when rendered
+        budget.remaining -= _SLOT_SIZE
+        return value
+    return _detach_object(value, limits, budget, depth, policy, serializers)
+
+
+def _detach_object(value: Any, limits: SnapshotLimits, budget: ByteBudget, depth: int,
+                   policy: Optional[RedactionPolicy], serializers: SerializerRegistry) -> Any:
+    """Replace an object by its (copied) serializer output or a DetachedRepr."""
+    cls = type(value)
+    serializer = serializers.resolve(cls)
+    if serializer is not None and serializer is not KEEP_VALUE and depth < limits.max_depth:
+        try:
+            data = serializer(value)
+            if policy is not None:
+                data = policy.redact_fields(cls, data)
+            # One level deeper, so serializers returning objects terminate
+            return _copy(data, limits, budget, depth + 1, policy, serializers)
+        except Exception:
+            # Fall back to the representation
+            metrics.increment("serializer_failures")
+    try:
+        rep, truncated = repr_within(value, limits.max_repr)
+        if truncated:
+            rep += TRUNCATION_MARKER
+    except Exception as repr_err:
+        rep = f"<unrepresentable: {type(repr_err).__name__}>"
+    if policy is not None:
+        rep = policy.redact_text(rep)
+    budget.remaining -= _CONTAINER_OVERHEAD + len(rep)
+    return DetachedRepr(rep)
+
+
+def detach(value: Any,
+           limits: Optional[SnapshotLimits] = None,
+           budget: Optional[ByteBudget] = None,
+           policy: Optional[RedactionPolicy] = None,
+           serializers: Optional[SerializerRegistry] = None) -> Any:
+    """
+    Return a bounded deep copy of `value`.
+
+    Dicts, lists, tuples, sets, strings and bytes are copied within `limits`;
+    dict and list subclasses become plain dicts and lists. Other objects are
+    replaced by their copied serializer output or, without a serializer, by
+    a DetachedRepr of at most limits.max_repr characters; with
+    limits.keep_references they are returned as is.
+
+    Args:
+        value: The value to copy.
+        limits: Size limits (DEFAULT_LIMITS if None).
+        budget: Byte budget shared with other values of the same snapshot;
+                a fresh one of limits.max_bytes is used if None.
+        policy: RedactionPolicy applied while copying: values under matching
+                dict keys are replaced and strings are scrubbed.
+        serializers: SerializerRegistry converting objects (defaults to
+                     tracelight.serializers.default_registry).
+
+    Returns:
+        The detached copy.
+    """
+    limits = limits or DEFAULT_LIMITS
+    if budget is None:
+        budget = ByteBudget(limits.max_bytes)
+    try:
+        return _copy(value, limits, budget, 0, policy, serializers or default_registry)
+    except Exception as copy_err:
+        return f"<uncopyable: {type(copy_err).__name__}>"
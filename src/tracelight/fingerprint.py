@@ -0,0 +1,227 @@
+"""Exception fingerprints and per-fingerprint rate limiting.
+
+When a dependency goes down the same exception can fire thousands of times per
+second. A fingerprint identifies "the same failure" from the exception type and
+the (file, function, line) chain of its traceback, without touching any local
+variables, so it is cheap enough to compute before deciding whether to capture.
+"""
+
+import atexit
+import hashlib
+import logging
+import threading
+import time
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+# (filename, function name, line number) of one traceback entry
+Location = Tuple[str, str, int]
+
+
+def fingerprint_from(exc_type: type, locations: Sequence[Location]) -> str:
+    """Return the fingerprint for an exception type and its traceback locations."""
+    parts = [f"{exc_type.__module__}.{exc_type.__qualname__}"]
+    parts.extend(f"{filename}:{function}:{line}" for filename, function, line in locations)
+    data = "|".join(parts).encode("utf-8", "surrogatepass")
+    return hashlib.blake2b(data, digest_size=8).hexdigest()
+
+
+def traceback_locations(exc: BaseException) -> List[Location]:
+    """Return the (file, function, line) chain of `exc`'s traceback."""
+    locations: List[Location] = []
+    tb = exc.__traceback__
+    while tb is not None:
+        code = tb.tb_frame.f_code
+        locations.append((code.co_filename, code.co_name, tb.tb_lineno))
+        tb = tb.tb_next
+    return locations
+
+
+def exception_fingerprint(exc: BaseException) -> str:
+    """
+    Compute a stable fingerprint for `exc`.
+
+    The fingerprint combines the exception's qualified type name with the
+    (file, function, line) of every traceback entry. It does not include the
+    message, so failures that differ only by ids or values share a fingerprint.
+    It is stable across processes.
+
+    Args:
+        exc: The caught exception.
+
+    Returns:
+        A 16 character hex string.
+    """
+    return fingerprint_from(type(exc), traceback_locations(exc))
+
+
+def fingerprint_label(exc: BaseException, locations: Sequence[Location]) -> str:
+    """Return a short human readable label for a fingerprint."""
+    if not locations:
+        return type(exc).__name__
+    filename, function, line = locations[-1]
+    return f"{type(exc).__name__} in {function} at {filename}:{line}"
+
+
+class RateLimiter:
+    """Thread-safe limiter allowing N full captures per fingerprint and window.
+
+    The first `max_per_window` occurrences of a fingerprint within `window`
+    seconds are captured in full; later ones are only counted (and, with
+    `summarize`, logged as a one-line summary). Suppressed counts are handed
+    out by collect_report at most every `report_interval` seconds, and are
+    logged with the next capture that finds a report due. When no capture
+    follows (the storm is over), they are only logged by flush, or by the
+    reporting thread of start_reporting.
+
+    Args:
+        max_per_window: Full captures allowed per fingerprint and window.
+        window: Length of the window in seconds.
+        report_interval: Minimum seconds between suppression reports.
+        summarize: Log a one-line summary for each suppressed occurrence.
+        max_fingerprints: Maximum number of fingerprints tracked at once.
+        clock: Monotonic clock, replaceable for tests.
+
+    Examples:
+        limiter = RateLimiter(max_per_window=5, window=60)
+
+        @traced(rate_limiter=limiter)
+        def call_backend():
+            ...
+
+        limiter.start_reporting(logger)  # Log counts even when errors stop
+    """
+
+    def __init__(self,
+                 max_per_window: int = 10,
+                 window: float = 60.0,
+                 report_interval: float = 60.0,
+                 summarize: bool = True,
+                 max_fingerprints: int = 10000,
+                 clock: Callable[[], float] = time.monotonic):
+        self.max_per_window = max_per_window
+        self.window = window
+        self.report_interval = report_interval
+        self.summarize = summarize
+        self.max_fingerprints = max_fingerprints
+        self._clock = clock
+        self._lock = threading.Lock()
+        # fingerprint -> [window start, count in window, suppressed since report, label]
+        self._states: Dict[str, list] = {}
+        self._last_report = clock()
+        self._reporter: Optional[threading.Thread] = None
+        self._stop_reporting = threading.Event()
+
+    def allow(self, fingerprint: str, label: str = "") -> bool:
+        """
+        Record one occurrence of `fingerprint`.
+
+        Returns:
+            True if the occurrence should be captured in full, False if suppressed.
+        """
+        now = self._clock()
+        with self._lock:
+            state = self._states.get(fingerprint)
+            if state is None:
+                if len(self._states) >= self.max_fingerprints:
+                    self._evict(now)
+                state = self._states[fingerprint] = [now, 0, 0, label]
+            if now - state[0] >= self.window:
+                state[0] = now
+                state[1] = 0
+            state[1] += 1
+            if state[1] <= self.max_per_window:
+                return True
+            state[2] += 1
+            return False
+
+    def _evict(self, now: float) -> None:
+        expired = [fp for fp, state in self._states.items()
+                   if now - state[0] >= self.window and not state[2]]
+        for fp in expired:
+            del self._states[fp]
+        if len(self._states) >= self.max_fingerprints:
+            # Still full: forget the oldest fingerprint
+            del self._states[next(iter(self._states))]
+
+    def suppressed(self, fingerprint: str) -> int:
+        """Return how many occurrences of `fingerprint` were suppressed since the last report."""
+        with self._lock:
+            state = self._states.get(fingerprint)
+            return state[2] if state else 0
+
+    def collect_report(self, force: bool = False) -> Dict[str, Tuple[str, int]]:
+        """
+        Return and reset the suppressed counts if a report is due.
+
+        Args:
+            force: Report even if `report_interval` has not elapsed.
+
+        Returns:
+            Mapping of fingerprint to (label, suppressed count); empty if no
+            report is due or nothing was suppressed.
+        """
+        now = self._clock()
+        with self._lock:
+            if not force and now - self._last_report < self.report_interval:
+                return {}
+            self._last_report = now
+            report = {}
+            for fingerprint, state in self._states.items():
+                if state[2]:
+                    report[fingerprint] = (state[3], state[2])
+                    state[2] = 0
+            return report
+
+    def flush(self,
+              logger: logging.Logger,
+              level: int = logging.WARNING,
+              force: bool = True) -> Dict[str, Tuple[str, int]]:
+        """
+        Log the suppressed counts now, without waiting for another capture.
+
+        Args:
+            logger: A logging.Logger (or logger-like) instance.
+            level: The log level to use.
+            force: Report even if `report_interval` has not elapsed.
+
+        Returns:
+            The report that was logged (see collect_report).
+        """
+        report = self.collect_report(force=force)
+        for fingerprint, (label, count) in report.items():
+            logger.log(level, "Suppressed %d occurrences of %s [fingerprint %s]",
+                       count, label, fingerprint)
+        return report
+
+    def start_reporting(self, logger: logging.Logger, level: int = logging.WARNING) -> None:
+        """
+        Start a daemon thread calling flush every `report_interval` seconds.
+
+        The thread is stopped, after a last flush, by stop_reporting or at
+        interpreter exit.
+        """
+        with self._lock:
+            if self._reporter is not None:
+                return
+            self._stop_reporting.clear()
+            thread = threading.Thread(target=self._report_loop, args=(logger, level),
+                                      name="tracelight-rate-report", daemon=True)
+            self._reporter = thread
+        thread.start()
+        atexit.register(self.stop_reporting)
+
+    def stop_reporting(self, timeout: Optional[float] = None) -> None:
+        """Stop the reporting thread of start_reporting; its last flush logs the rest."""
+        with self._lock:
+            thread = self._reporter
+            self._reporter = None
+        if thread is None:
+            return
+        self._stop_reporting.set()
+        thread.join(timeout)
+        atexit.unregister(self.stop_reporting)
+
+    def _report_loop(self, logger: logging.Logger, level: int) -> None:
+        while not self._stop_reporting.wait(self.report_interval):
+            self.flush(logger, level, force=False)
+        self.flush(logger, level)
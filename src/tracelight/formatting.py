@@ -0,0 +1,86 @@
+"""Text tracebacks rendered from captured snapshots.
+
+``traceback.format_exception`` walks the traceback a second time after the
+snapshot was taken. format_traceback renders the familiar text from the
+frames already held by an ExceptionSnapshot instead, so a failure is walked
+once. Frames dropped by a FrameFilter are shown as a skipped-frames line, and
+source lines come from the shared tracelight.source cache.
+"""
+
+import linecache
+from typing import Dict, List, Sequence
+
+from tracelight.core import CAUSE, CONTEXT, GROUP, ChainedException, ExceptionSnapshot, FrameSnapshot
+from tracelight.source import default_source_cache
+
+_CAUSE_LINES = ["\n", "The above exception was the direct cause of the following exception:\n", "\n"]
+_CONTEXT_LINES = ["\n", "During handling of the above exception, another exception occurred:\n", "\n"]
+
+
+def _exception_line(error_type: str, error: str) -> str:
+    return f"{error_type}: {error}\n" if error else f"{error_type}\n"
+
+
+def _format_frames(frames: Sequence[FrameSnapshot]) -> List[str]:
+    lines = ["Traceback (most recent call last):\n"]
+    expected = 1
+    for frame in frames:
+        if frame.frame_number > expected:
+            lines.append(f"  [... {frame.frame_number - expected} frames skipped ...]\n")
+        expected = frame.frame_number + 1
+        lines.append(f'  File "{frame.file}", line {frame.line}, in {frame.function}\n')
+        if frame.code is not None:
+            source = default_source_cache.line(frame.code, frame.line).strip()
+        else:
+            source = linecache.getline(frame.file, frame.line).strip()
+        if source:
+            lines.append(f"    {source}\n")
+    return lines
+
+
+def _format_exception(error_type: str, error: str, frames: Sequence[FrameSnapshot],
+                      exception_id: int, children: Dict[int, List[ChainedException]]) -> List[str]:
+    """Format one exception, preceded by its cause/context and followed by group members."""
+    lines: List[str] = []
+    members = []
+    for child in children.get(exception_id, ()):
+        if child.relation == GROUP:
+            members.append(child)
+        elif child.relation in (CAUSE, CONTEXT):
+            lines.extend(_format_exception(child.qualified_type, child.error, child.frames,
+                                           child.exception_id, children))
+            lines.extend(_CAUSE_LINES if child.relation == CAUSE else _CONTEXT_LINES)
+
+    if frames:
+        lines.extend(_format_frames(frames))
+    lines.append(_exception_line(error_type, error))
+
+    for number, member in enumerate(members, 1):
+        lines.append(f"+---------------- {number} ----------------\n")
+        member_lines = _format_exception(member.qualified_type, member.error, member.frames,
+                                         member.exception_id, children)
+        lines.extend("| " + line if line.strip() else line for line in member_lines)
+    if members:
+        lines.append("+------------------------------------\n")
+    return lines
+
+
+def format_traceback(snapshot: ExceptionSnapshot) -> str:
+    """
+    Render a snapshot as a text traceback, like traceback.format_exception.
+
+    Causes and contexts are printed before the exception they lead to, and
+    ExceptionGroup members after their group, indented with "| ".
+
+    Args:
+        snapshot: Snapshot taken by capture_snapshot.
+
+    Returns:
+        The traceback text. Snapshots suppressed by a rate limiter have no
+        frames and render as the exception line only.
+    """
+    children: Dict[int, List[ChainedException]] = {}
+    for chained in snapshot.related:
+        children.setdefault(chained.parent, []).append(chained)
+    return "".join(_format_exception(snapshot.qualified_type, snapshot.error, snapshot.frames,
+                                     0, children))
@@ -0,0 +1,168 @@
+"""Frame filtering and depth limits for traceback capture.
+
+Deep framework stacks (asyncio, web frameworks, Pydantic internals) can make
+up most of a traceback while telling little about the failure. A FrameFilter
+decides, per frame, whether it is captured with its locals, with metadata only,
+or dropped. Classification is cached per code object, so frames in code that
+was seen before cost a single dict lookup.
+"""
+
+import os
+import sysconfig
+import threading
+from types import CodeType
+from typing import Dict, List, Optional, Sequence, Tuple
+
+# Frame classifications
+FULL = "full"
+METADATA = "metadata"
+SKIP = "skip"
+
+# Limit on cached code objects, so generated code cannot grow the cache forever
+_MAX_CACHE_ENTRIES = 4096
+
+
+def _library_prefixes() -> Tuple[str, ...]:
+    """Return the path prefixes of the standard library and installed packages."""
+    prefixes = set()
+    for name in ("stdlib", "platstdlib", "purelib", "platlib"):
+        try:
+            path = sysconfig.get_path(name)
+        except KeyError:
+            continue
+        if path:
+            prefixes.add(os.path.join(os.path.realpath(path), ""))
+            prefixes.add(os.path.join(path, ""))
+    return tuple(sorted(prefixes))
+
+
+_LIBRARY_PREFIXES = _library_prefixes()
+_LIBRARY_MARKERS = (os.sep + "site-packages" + os.sep, os.sep + "dist-packages" + os.sep)
+
+
+def is_library_file(filename: str) -> bool:
+    """Return True if `filename` belongs to the standard library or an installed package."""
+    if filename.startswith("<"):
+        # <frozen importlib._bootstrap>, <string>, ...
+        return filename.startswith("<frozen ")
+    if any(marker in filename for marker in _LIBRARY_MARKERS):
+        return True
+    return filename.startswith(_LIBRARY_PREFIXES)
+
+
+def _split_rules(rules: Optional[Sequence[str]]) -> Tuple[Tuple[str, ...], Tuple[str, ...]]:
+    """Split rules into path prefixes and module names."""
+    paths: List[str] = []
+    modules: List[str] = []
+    for rule in rules or ():
+        if "/" in rule or os.sep in rule:
+            paths.append(rule)
+        else:
+            modules.append(rule)
+    return tuple(paths), tuple(modules)
+
+
+def _matches(filename: str, module: str,
+             paths: Tuple[str, ...], modules: Tuple[str, ...]) -> bool:
+    if paths and filename.startswith(paths):
+        return True
+    for rule in modules:
+        if module == rule or module.startswith(rule + "."):
+            return True
+    return False
+
+
+class FrameFilter:
+    """Decides which traceback frames are captured, and how.
+
+    Rules are path prefixes (anything containing a path separator, e.g.
+    "/srv/app/") or module names, which also match their submodules (e.g.
+    "asyncio" matches "asyncio.events").
+
+    Args:
+        include: If given, only frames matching one of these rules are kept.
+        exclude: Frames matching one of these rules are dropped.
+        library_metadata_only: Record only function, file and line for frames
+            in the standard library or installed packages, unless they match
+            an include rule.
+        innermost: Keep locals only for this many innermost frames ...
+        outermost: ... plus this many outermost frames; the frames in between
+            are recorded with metadata only. Leave both as None for no cap;
+            if only one is given, the other side keeps no locals.
+
+    Examples:
+        frame_filter = FrameFilter(exclude=["asyncio"],
+                                   library_metadata_only=True,
+                                   innermost=3, outermost=1)
+        log_exception_state(e, logger, frame_filter=frame_filter)
+    """
+
+    def __init__(self,
+                 include: Optional[Sequence[str]] = None,
+                 exclude: Optional[Sequence[str]] = None,
+                 library_metadata_only: bool = False,
+                 innermost: Optional[int] = None,
+                 outermost: Optional[int] = None):
+        self._include_paths, self._include_modules = _split_rules(include)
+        self._exclude_paths, self._exclude_modules = _split_rules(exclude)
+        self._has_include = bool(include)
+        self.library_metadata_only = library_metadata_only
+        self.innermost = innermost
+        self.outermost = outermost
+        self._cache: Dict[CodeType, str] = {}
+        self._lock = threading.Lock()
+
+    def classify(self, code: CodeType, module: str = "") -> str:
+        """
+        Return FULL, METADATA or SKIP for frames running `code`.
+
+        Args:
+            code: The frame's code object (the cache key).
+            module: The frame's module name (its globals' __name__).
+        """
+        result = self._cache.get(code)
+        if result is None:
+            result = self._classify_uncached(code.co_filename, module)
+            with self._lock:
+                if len(self._cache) >= _MAX_CACHE_ENTRIES:
+                    self._cache.clear()
+                self._cache[code] = result
+        return result
+
+    def _classify_uncached(self, filename: str, module: str) -> str:
+        if _matches(filename, module, self._exclude_paths, self._exclude_modules):
+            return SKIP
+        if self._has_include:
+            if not _matches(filename, module, self._include_paths, self._include_modules):
+                return SKIP
+            return FULL
+        if self.library_metadata_only and is_library_file(filename):
+            return METADATA
+        return FULL
+
+    def apply_depth_limits(self, classes: List[str]) -> List[str]:
+        """
+        Downgrade FULL frames beyond the innermost/outermost caps to METADATA.
+
+        Args:
+            classes: Classification of each frame, outermost first.
+
+        Returns:
+            The adjusted classifications.
+        """
+        if self.innermost is None and self.outermost is None:
+            return classes
+        full = [i for i, cls in enumerate(classes) if cls == FULL]
+        outer = full[:self.outermost or 0]
+        inner = full[max(0, len(full) - (self.innermost or 0)):]
+        keep = set(outer) | set(inner)
+        return [METADATA if cls == FULL and i not in keep else cls
+                for i, cls in enumerate(classes)]
+
+
+def frame_module(frame) -> str:
+    """Return the module name of a frame, or "" if unknown."""
+    try:
+        return frame.f_globals.get("__name__") or ""
+    except Exception:
+        return ""
@@ -0,0 +1,213 @@
+"""Process-wide hooks for exceptions nobody catches.
+
+Failures at the top level, in background threads, in ``__del__`` methods and
+in asyncio tasks whose exceptions are never retrieved never reach a
+decorator or log_exception_state. install() registers tracelight with
+``sys.excepthook``, ``threading.excepthook``, ``sys.unraisablehook`` and an
+event loop's exception handler, so those exceptions go through the same
+capture pipeline (sampling, rate limiting, redaction, buffers, emitters) as
+the decorators.
+
+Exceptions already captured by tracelight (e.g. logged by ``@traced`` and
+re-raised) are not captured again, and a hook invoked while tracelight is
+handling an exception on the same thread only calls the previous hook.
+"""
+
+import asyncio
+import logging
+import sys
+import threading
+from typing import Any, Dict, Optional
+
+from tracelight.background import BackgroundEmitter
+from tracelight.bounded_repr import bounded_repr
+from tracelight.core import is_captured, log_exception_state
+
+_internal_logger = logging.getLogger(__name__)
+
+# The hooks currently installed, if any
+_installed: Optional["ExceptionHooks"] = None
+_install_lock = threading.Lock()
+
+
+class ExceptionHooks:
+    """The hooks registered by install(); see install() for the arguments."""
+
+    def __init__(self,
+                 logger: logging.Logger,
+                 level: int,
+                 emitter: Optional[BackgroundEmitter],
+                 chain: bool,
+                 options: Dict[str, Any]):
+        self.logger = logger
+        self.level = level
+        self.emitter = emitter
+        self.chain = chain
+        self.options = options
+        self.loop: Optional[asyncio.AbstractEventLoop] = None
+        self._previous: Dict[str, Any] = {}
+        self._local = threading.local()
+
+    def handle(self, exc: Optional[BaseException], origin: str) -> bool:
+        """
+        Capture and log `exc`, unless tracelight already did.
+
+        Args:
+            exc: The unhandled exception.
+            origin: Where it was raised, for the log line before the trace.
+
+        Returns:
+            True if the exception was captured.
+        """
+        if not isinstance(exc, Exception) or is_captured(exc):
+            return False
+        if getattr(self._local, "active", False):
+            # Raised by tracelight itself or by a log handler it called
+            return False
+        self._local.active = True
+        try:
+            self.logger.log(self.level, "Unhandled exception in %s", origin)
+            if self.emitter is not None:
+                self.emitter.log_exception(exc, self.logger, self.level, **self.options)
+            else:
+                log_exception_state(exc, self.logger, self.level, **self.options)
+            return True
+        except Exception:
+            _internal_logger.debug("Capturing an unhandled exception failed", exc_info=True)
+            return False
+        finally:
+            self._local.active = False
+
+    def _excepthook(self, exc_type: type, exc: BaseException, tb: Any) -> None:
+        self.handle(exc, "main thread")
+        if self.chain:
+            self._previous["excepthook"](exc_type, exc, tb)
+
+    def _threading_excepthook(self, args: Any) -> None:
+        if args.exc_type is not SystemExit:
+            name = args.thread.name if args.thread is not None else "unknown"
+            self.handle(args.exc_value, f"thread {name!r}")
+        if self.chain:
+            self._previous["threading"](args)
+
+    def _unraisablehook(self, unraisable: Any) -> None:
+        origin = unraisable.err_msg or "Exception ignored in"
+        if unraisable.object is not None:
+            try:
+                origin = f"{origin}: {bounded_repr(unraisable.object, 200)}"
+            except Exception:
+                pass
+        self.handle(unraisable.exc_value, origin)
+        if self.chain:
+            self._previous["unraisable"](unraisable)
+
+    def _loop_exception_handler(self, loop: asyncio.AbstractEventLoop,
+                                context: Dict[str, Any]) -> None:
+        self.handle(context.get("exception"),
+                    f"event loop: {context.get('message', 'unhandled exception')}")
+        if self.chain:
+            previous = self._previous.get("loop")
+            if previous is not None:
+                previous(loop, context)
+            else:
+                loop.default_exception_handler(context)
+
+    def _install(self, excepthook: bool, threading_hook: bool, unraisable_hook: bool,
+                 loop: Optional[asyncio.AbstractEventLoop]) -> None:
+        if excepthook:
+            self._previous["excepthook"] = sys.excepthook
+            sys.excepthook = self._excepthook
+        # threading.excepthook and sys.unraisablehook are new in Python 3.8
+        if threading_hook and hasattr(threading, "excepthook"):
+            self._previous["threading"] = threading.excepthook
+            threading.excepthook = self._threading_excepthook
+        if unraisable_hook and hasattr(sys, "unraisablehook"):
+            self._previous["unraisable"] = sys.unraisablehook
+            sys.unraisablehook = self._unraisablehook
+        if loop is not None:
+            self.loop = loop
+            self._previous["loop"] = loop.get_exception_handler()
+            loop.set_exception_handler(self._loop_exception_handler)
+
+    def uninstall(self) -> None:
+        """Restore the previous hooks (those replaced since are left alone)."""
+        previous = self._previous
+        if "excepthook" in previous and sys.excepthook == self._excepthook:
+            sys.excepthook = previous["excepthook"]
+        if "threading" in previous and threading.excepthook == self._threading_excepthook:
+            threading.excepthook = previous["threading"]
+        if "unraisable" in previous and sys.unraisablehook == self._unraisablehook:
+            sys.unraisablehook = previous["unraisable"]
+        loop = self.loop
+        if (loop is not None and not loop.is_closed()
+                and loop.get_exception_handler() == self._loop_exception_handler):
+            loop.set_exception_handler(previous.get("loop"))
+        self._previous = {}
+        self.loop = None
+
+
+def install(logger: Optional[logging.Logger] = None,
+            level: int = logging.ERROR,
+            *,
+            excepthook: bool = True,
+            threading_hook: bool = True,
+            unraisable_hook: bool = True,
+            loop: Optional[asyncio.AbstractEventLoop] = None,
+            emitter: Optional[BackgroundEmitter] = None,
+            chain: bool = True,
+            **options: Any) -> ExceptionHooks:
+    """
+    Capture unhandled exceptions process-wide with tracelight.
+
+    Replaces hooks installed by an earlier call.
+
+    Args:
+        logger: Logger to use (creates one if None).
+        level: Log level to use.
+        excepthook: Hook sys.excepthook (uncaught exceptions of the main thread).
+        threading_hook: Hook threading.excepthook (uncaught exceptions in threads;
+                        Python 3.8+, ignored before).
+        unraisable_hook: Hook sys.unraisablehook (exceptions in __del__,
+                         callbacks and garbage collection; Python 3.8+,
+                         ignored before).
+        loop: Event loop whose exception handler is hooked (e.g. for tasks
+              whose exception is never retrieved); defaults to the running
+              loop, if install() is called from a coroutine.
+        emitter: BackgroundEmitter that formats and logs off the failing thread.
+        chain: Also call the previous hook or handler, e.g. to keep the
+               default traceback on stderr.
+        **options: Options of log_exception_state (sampler, rate_limiter,
+                   redaction, buffer, limits, ...).
+
+    Returns:
+        The installed ExceptionHooks; see uninstall().
+
+    Examples:
+        tracelight.install(logger, sampler=AdaptiveSampler(), buffer=recent)
+
+        async def main():
+            tracelight.install(logger)  # also hooks the running loop
+    """
+    global _installed
+    if loop is None:
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            loop = None
+    hooks = ExceptionHooks(logger or logging.getLogger(__name__), level, emitter, chain,
+                           options)
+    with _install_lock:
+        if _installed is not None:
+            _installed.uninstall()
+        hooks._install(excepthook, threading_hook, unraisable_hook, loop)
+        _installed = hooks
+    return hooks
+
+
+def uninstall() -> None:
+    """Remove the hooks registered by install(), restoring the previous ones."""
+    global _installed
+    with _install_lock:
+        if _installed is not None:
+            _installed.uninstall()
+            _installed = None
@@ -0,0 +1,129 @@
+"""Bulk instrumentation of classes and modules with traced.
+
+trace_class and trace_module apply traced to every matching function of a
+class or module, instead of decorating hundreds of methods by hand. With
+``specialize=True``, traced compiles its wrappers per signature shape (see
+decorators._sync_wrapper), so a successful call pays one extra function call
+and no ``*args``/``**kwargs`` packing, at the price of calls with invalid
+arguments not being captured.
+"""
+
+import fnmatch
+import inspect
+from types import ModuleType
+from typing import Any, Callable, List, Optional, Sequence, TypeVar
+
+from tracelight.decorators import traced
+
+T = TypeVar('T', bound=type)
+
+
+def _selected(name: str,
+              include: Optional[Sequence[str]],
+              exclude: Optional[Sequence[str]]) -> bool:
+    """Match `name` against the fnmatch patterns; dunders only when included."""
+    if include is None:
+        if name.startswith("__") and name.endswith("__"):
+            return False
+    elif not any(fnmatch.fnmatchcase(name, pattern) for pattern in include):
+        return False
+    return not (exclude and any(fnmatch.fnmatchcase(name, pattern) for pattern in exclude))
+
+
+def _is_traced(func: Any) -> bool:
+    return getattr(func, "__tracelight_traced__", False)
+
+
+def trace_class(cls: Optional[T] = None,
+                *,
+                include: Optional[Sequence[str]] = None,
+                exclude: Optional[Sequence[str]] = None,
+                **options: Any) -> Any:
+    """
+    Apply traced to the methods defined in a class.
+
+    Instruments plain, async, generator, static and class methods defined in
+    the class body itself; inherited methods and properties are left alone,
+    as are methods already traced.
+
+    Args:
+        cls: Class to instrument; if None, returns a class decorator.
+        include: fnmatch patterns of method names to trace (default: all
+                 except dunder methods such as __init__, which must be
+                 included by name or pattern).
+        exclude: fnmatch patterns of method names not to trace.
+        **options: Options of traced (logger, level, reraise, sampler,
+                   specialize, ...).
+
+    Returns:
+        The class, instrumented in place.
+
+    Examples:
+        trace_class(OrderService, exclude=["_cache_*"], sampler=sampler, specialize=True)
+
+        @trace_class(include=["handle_*", "__init__"])
+        class Handler:
+            ...
+    """
+    if cls is None:
+        return lambda target: trace_class(target, include=include, exclude=exclude,
+                                          **options)
+
+    decorate = traced(**options)
+    for name, member in list(vars(cls).items()):
+        if not _selected(name, include, exclude):
+            continue
+        if isinstance(member, (staticmethod, classmethod)):
+            func = member.__func__
+            if inspect.isfunction(func) and not _is_traced(func):
+                setattr(cls, name, type(member)(decorate(func)))
+        elif inspect.isfunction(member) and not _is_traced(member):
+            setattr(cls, name, decorate(member))
+    return cls
+
+
+def trace_module(module: ModuleType,
+                 *,
+                 include: Optional[Sequence[str]] = None,
+                 exclude: Optional[Sequence[str]] = None,
+                 classes: bool = True,
+                 **options: Any) -> List[str]:
+    """
+    Apply traced to the functions (and classes) defined in a module.
+
+    Objects imported into the module from elsewhere are skipped. Only the
+    module's attributes are replaced: code that imported a function with
+    ``from module import name`` before the call keeps the untraced one, so
+    call this early, e.g. at application start-up.
+
+    Args:
+        module: Module to instrument.
+        include: fnmatch patterns of function and class names to trace
+                 (default: all except dunder names).
+        exclude: fnmatch patterns of names not to trace.
+        classes: Also instrument the methods of the module's classes (with
+                 trace_class and its default method filter).
+        **options: Options of traced (logger, level, reraise, sampler,
+                   specialize, ...).
+
+    Returns:
+        The names of the functions and classes instrumented.
+
+    Examples:
+        import myapp.pipeline
+        trace_module(myapp.pipeline, exclude=["_*"], emitter=emitter)
+    """
+    decorate: Callable[[Any], Any] = traced(**options)
+    instrumented = []
+    for name, member in list(vars(module).items()):
+        if not _selected(name, include, exclude):
+            continue
+        if getattr(member, "__module__", None) != module.__name__:
+            continue
+        if inspect.isfunction(member) and not _is_traced(member):
+            setattr(module, name, decorate(member))
+            instrumented.append(name)
+        elif classes and inspect.isclass(member):
+            trace_class(member, **options)
+            instrumented.append(name)
+    return instrumented
@@ -0,0 +1,292 @@
+"""Streaming JSON-lines encoder for exception snapshots.
+
+Instead of building the complete ``error_data`` structure and serializing it
+at once, JsonLinesWriter walks a snapshot and writes one small JSON object per
+line straight to a file-like sink, so memory use stays constant in the number
+of frames and variables.
+
+Schema (version 2). Every line is a JSON object with a ``"kind"`` and the
+``"event"`` id of the exception it belongs to, so lines of concurrent events
+can be told apart:
+
+    {"kind": "exception", "schema": 2, "event": "...", "timestamp": 1700000000.0,
+     "error_type": "KeyError", "error": "'users'", "fingerprint": "...",
+     "frame_count": 3, "suppressed": false}
+    {"kind": "frame", "event": "...", "frame_number": 1, "frame_id": 1,
+     "function": "main", "file": "/app/main.py", "line": 12,
+     "locals_omitted": false, "source": [[11, "..."], [12, "..."]]}
+    {"kind": "var", "event": "...", "frame_number": 1, "name": "data",
+     "value": {"members": []}}
+    {"kind": "var", "event": "...", "frame_number": 1, "name": "conn",
+     "repr": "<Connection ...>", "truncated": false}
+    {"kind": "report", "event": "...", "fingerprint": "...", "label": "...",
+     "count": 42}
+    {"kind": "chained", "event": "...", "exception_id": 1, "parent": 0,
+     "relation": "cause", "error_type": "OSError", "error": "...",
+     "frame_ids": [4, 1]}
+    {"kind": "frame", "event": "...", "exception_id": 1, "frame_number": 1,
+     "frame_id": 4, ...}
+    {"kind": "end", "event": "..."}
+
+A variable line carries ``"value"`` when the (serialized) value is valid JSON
+and its representation fits ``max_var_length``; otherwise it carries a bounded
+``"repr"`` and whether it was ``"truncated"``. Lines of one event are written
+in this order: exception, report lines, then each frame followed by its vars,
+then each chained exception (cause, context or ExceptionGroup member; parent 0
+is the primary exception) followed by those of its frames not written before,
+and finally end. Frame lines of chained exceptions carry their
+``"exception_id"``; a chained exception refers to all of its frames by
+``"frame_id"``. Frame lines carry ``"source"`` only if the writer was given a
+``source_context``; the exception line carries ``"sampling_level"`` only for
+snapshots taken with an AdaptiveSampler, and ``"item_index"`` only for
+failures of generators traced with ``item_index=True``. Readers should ignore unknown kinds
+and keys.
+
+Version 2 added frame ids and chained exceptions.
+"""
+
+import json
+import threading
+import uuid
+from typing import Any, Dict, Iterable, Iterator, Optional, TextIO
+
+from tracelight.bounded_repr import repr_within
+from tracelight.core import ExceptionSnapshot, FrameSnapshot, capture_snapshot, _split_options
+from tracelight.detach import DetachedRepr, detach
+from tracelight.redaction import RedactionPolicy
+from tracelight.source import default_source_cache
+from tracelight.serializers import KEEP_VALUE, SerializerRegistry, default_registry
+
+SCHEMA_VERSION = 2
+
+
+class _NotJSON(Exception):
+    """Raised by the json default hook for values without a JSON form."""
+
+
+def _reject(value: Any) -> Any:
+    raise _NotJSON
+
+
+def _dumps(record: Dict[str, Any]) -> str:
+    return json.dumps(record, separators=(",", ":"), allow_nan=False, default=_reject)
+
+
+def _holds_repr(value: Any) -> bool:
+    """Whether a copied value contains the representation stored for an object."""
+    if isinstance(value, DetachedRepr):
+        return True
+    if isinstance(value, dict):
+        return any(_holds_repr(key) or _holds_repr(item) for key, item in value.items())
+    if isinstance(value, (list, tuple, set, frozenset)):
+        return any(_holds_repr(item) for item in value)
+    return False
+
+
+class JsonLinesWriter:
+    """Writes exception snapshots as JSON lines to a file-like sink.
+
+    Args:
+        sink: Text stream with a write method (file, socket wrapper, StringIO).
+        max_var_length: Maximum length of a variable's repr; larger values are
+            written as a truncated repr instead of a JSON value.
+        serializers: SerializerRegistry used for variable values.
+        flush: Call sink.flush() after each event.
+        source_context: Add the failing source line and this many lines around
+            it to frame lines as "source" ([line, text] pairs); None for none.
+
+    Examples:
+        with open("errors.jsonl", "a") as sink:
+            writer = JsonLinesWriter(sink)
+            try:
+                run()
+            except Exception as e:
+                writer.write_exception(e)
+
+        # Or off the request path
+        emitter.submit(writer.write_snapshot, capture_snapshot(e))
+    """
+
+    def __init__(self,
+                 sink: TextIO,
+                 *,
+                 max_var_length: int = 1000,
+                 serializers: Optional[SerializerRegistry] = None,
+                 flush: bool = False,
+                 source_context: Optional[int] = None):
+        self.sink = sink
+        self.max_var_length = max_var_length
+        self.serializers = serializers or default_registry
+        self.flush = flush
+        self.source_context = source_context
+        self._lock = threading.Lock()
+
+    def _write(self, record: Dict[str, Any]) -> None:
+        line = _dumps(record) + "\n"
+        with self._lock:
+            self.sink.write(line)
+
+    def _var_record(self, event: str, frame_number: int, name: str, value: Any,
+                    redaction: Optional[RedactionPolicy] = None) -> Dict[str, Any]:
+        record: Dict[str, Any] = {"kind": "var", "event": event,
+                                  "frame_number": frame_number, "name": name}
+        try:
+            serializer = self.serializers.resolve(type(value))
+            if serializer is not None and serializer is not KEEP_VALUE:
+                dumped = serializer(value)
+                if redaction is not None:
+                    dumped = detach(redaction.redact_fields(type(value), dumped),
+                                    policy=redaction, serializers=self.serializers)
+                value = dumped
+                serializer = KEEP_VALUE
+            rep, truncated = repr_within(value, self.max_var_length)
+            if redaction is not None and serializer is not KEEP_VALUE:
+                rep = redaction.redact_text(rep)
+            if serializer is KEEP_VALUE and not truncated and not _holds_repr(value):
+                try:
+                    # Validate the value on its own, so a bad value can fall back
+                    _dumps(value)
+                    record["value"] = value
+                    return record
+                except (_NotJSON, TypeError, ValueError):
+                    pass
+            record["repr"] = rep
+            record["truncated"] = truncated
+        except Exception as format_err:
+            record["repr"] = f"<unrepresentable: {type(format_err).__name__}>"
+            record["truncated"] = False
+        return record
+
+    def _write_frame(self, event: str, frame: FrameSnapshot, exception_id: int = 0,
+                     redaction: Optional[RedactionPolicy] = None) -> None:
+        record: Dict[str, Any] = {"kind": "frame", "event": event}
+        if exception_id:
+            record["exception_id"] = exception_id
+        record.update({
+            "frame_number": frame.frame_number,
+            "frame_id": frame.frame_id,
+            "function": frame.function,
+            "file": frame.file,
+            "line": frame.line,
+            "locals_omitted": frame.locals is None,
+        })
+        if self.source_context is not None and frame.code is not None:
+            source = default_source_cache.source_lines(frame.code, frame.line,
+                                                       self.source_context)
+            record["source"] = [[number, text] for number, text in source]
+        self._write(record)
+        for name, value in (frame.locals or {}).items():
+            self._write(self._var_record(event, frame.frame_number, name, value, redaction))
+
+    def write_snapshot(self, snapshot: ExceptionSnapshot) -> str:
+        """
+        Write one snapshot as JSON lines.
+
+        Returns:
+            The event id used on every line of this snapshot.
+        """
+        event = uuid.uuid4().hex
+        record: Dict[str, Any] = {
+            "kind": "exception",
+            "schema": SCHEMA_VERSION,
+            "event": event,
+            "timestamp": snapshot.timestamp,
+            "error_type": snapshot.error_type,
+            "error": snapshot.error,
+            "fingerprint": snapshot.fingerprint,
+            "frame_count": len(snapshot.frames),
+            "suppressed": snapshot.suppressed,
+        }
+        if snapshot.level is not None:
+            record["sampling_level"] = snapshot.level
+        if snapshot.item_index is not None:
+            record["item_index"] = snapshot.item_index
+        self._write(record)
+        for fingerprint, (label, count) in snapshot.report.items():
+            self._write({"kind": "report", "event": event, "fingerprint": fingerprint,
+                         "label": label, "count": count})
+        written = set()
+        for frame in snapshot.frames:
+            self._write_frame(event, frame, redaction=snapshot.redaction)
+            written.add(frame.frame_id)
+        for chained in snapshot.related:
+            self._write({
+                "kind": "chained",
+                "event": event,
+                "exception_id": chained.exception_id,
+                "parent": chained.parent,
+                "relation": chained.relation,
+                "error_type": chained.error_type,
+                "error": chained.error,
+                "frame_ids": [frame.frame_id for frame in chained.frames],
+            })
+            for frame in chained.frames:
+                if frame.frame_id not in written:
+                    self._write_frame(event, frame, chained.exception_id, snapshot.redaction)
+                    written.add(frame.frame_id)
+        self._write({"kind": "end", "event": event})
+        if self.flush:
+            self.sink.flush()
+        return event
+
+    def write_exception(self, exc: BaseException, **capture_kwargs: Any) -> str:
+        """
+        Capture `exc` and write it as JSON lines.
+
+        Args:
+            exc: The caught exception.
+            **capture_kwargs: Capture options of log_exception_state
+                              (exclude_vars, frame_filter, relevant_locals, ...).
+
+        Returns:
+            The event id used on every line of this exception.
+        """
+        capture_kwargs, _ = _split_options(capture_kwargs)
+        capture_kwargs.setdefault("serializers", self.serializers)
+        return self.write_snapshot(capture_snapshot(exc, **capture_kwargs))
+
+
+def read_events(lines: Iterable[str]) -> Iterator[Dict[str, Any]]:
+    """
+    Group JSON lines written by JsonLinesWriter back into events.
+
+    Args:
+        lines: Iterable of text lines (e.g. an open file).
+
+    Yields:
+        One dict per completed event: the exception record with its "frames"
+        (each with a "vars" dict of name -> record), "reports", "chained"
+        exceptions and the "chained_frames" written for them.
+    """
+    pending: Dict[str, Dict[str, Any]] = {}
+    # Last frame record of each pending event, which var lines belong to
+    current: Dict[str, Dict[str, Any]] = {}
+    for line in lines:
+        if not line.strip():
+            continue
+        record = json.loads(line)
+        event = record.get("event")
+        kind = record.get("kind")
+        if kind == "exception":
+            record["frames"] = []
+            record["reports"] = []
+            record["chained"] = []
+            record["chained_frames"] = []
+            pending[event] = record
+        elif event not in pending:
+            continue
+        elif kind == "frame":
+            record["vars"] = {}
+            key = "chained_frames" if record.get("exception_id") else "frames"
+            pending[event][key].append(record)
+            current[event] = record
+        elif kind == "var":
+            if event in current:
+                current[event]["vars"][record["name"]] = record
+        elif kind == "report":
+            pending[event]["reports"].append(record)
+        elif kind == "chained":
+            pending[event]["chained"].append(record)
+        elif kind == "end":
+            current.pop(event, None)
+            yield pending.pop(event)
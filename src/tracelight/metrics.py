@@ -0,0 +1,216 @@
+"""Low-overhead metrics about tracelight itself.
+
+Counts and histograms of what capturing and rendering exceptions costs:
+capture and render duration, frames and variables captured, bytes of text
+produced, truncated values, serializer failures, rate-limited events and
+dropped background jobs. Each capture or render updates the metrics under a
+single lock acquisition. Read them with stats(), or export them in the
+Prometheus text format with export_prometheus().
+"""
+
+import bisect
+import os
+import tempfile
+import threading
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple, Union
+
+# Histogram bucket upper bounds
+DURATION_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01,
+                    0.025, 0.05, 0.1, 0.25, 0.5, 1.0)
+COUNT_BUCKETS = (1, 2, 5, 10, 20, 50, 100, 200, 500, 1000)
+
+# name -> help text; exported as tracelight_<name>_total
+_COUNTERS = {
+    "captures": "Exceptions captured.",
+    "suppressed": "Exceptions suppressed by a rate limiter or sampled down to a count.",
+    "sampled_frames": "Exceptions captured without locals by an AdaptiveSampler.",
+    "sampled_count": "Exceptions only counted by an AdaptiveSampler.",
+    "frames_captured": "Frames captured.",
+    "variables_captured": "Local variables captured.",
+    "renders": "Snapshots rendered.",
+    "rendered_bytes": "Characters of rendered variable text.",
+    "truncations": "Variable representations truncated to max_var_length.",
+    "serializer_failures": "Serializers that raised; the repr was used instead.",
+    "emitter_dropped": "Background jobs dropped because the queue was full.",
+    "emitter_errors": "Background jobs that raised.",
+}
+
+# Reduced sampling levels -> counter
+_SAMPLED_LEVELS = {"frames": "sampled_frames", "count": "sampled_count"}
+
+# name -> (help text, bucket bounds)
+_HISTOGRAMS = {
+    "capture_seconds": ("Time spent capturing a snapshot.", DURATION_BUCKETS),
+    "render_seconds": ("Time spent rendering a snapshot.", DURATION_BUCKETS),
+    "frames_per_capture": ("Frames captured per exception.", COUNT_BUCKETS),
+    "variables_per_capture": ("Variables captured per exception.", COUNT_BUCKETS),
+}
+
+
+class Histogram:
+    """Bucketed distribution with a running count and sum (not thread-safe)."""
+
+    __slots__ = ("bounds", "counts", "count", "sum")
+
+    def __init__(self, bounds: Sequence[float]):
+        self.bounds = tuple(bounds)
+        self.counts = [0] * (len(self.bounds) + 1)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect.bisect_left(self.bounds, value)] += 1
+        self.count += 1
+        self.sum += value
+
+    def cumulative(self) -> List[Tuple[str, int]]:
+        """Return (upper bound label, cumulative count) pairs, ending with +Inf."""
+        result = []
+        total = 0
+        for bound, count in zip(self.bounds + (float("inf"),), self.counts):
+            total += count
+            result.append(("+Inf" if bound == float("inf") else repr(bound), total))
+        return result
+
+
+class Metrics:
+    """Thread-safe counters and histograms for tracelight's own work.
+
+    Args:
+        enabled: Record metrics; when False every record call returns at once.
+    """
+
+    def __init__(self, enabled: bool = True):
+        self.enabled = enabled
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self) -> None:
+        """Set all counters and histograms back to zero."""
+        with self._lock:
+            self._counters: Dict[str, int] = dict.fromkeys(_COUNTERS, 0)
+            self._histograms = {name: Histogram(bounds)
+                                for name, (_, bounds) in _HISTOGRAMS.items()}
+
+    def record_capture(self, seconds: float, frames: int, variables: int,
+                       suppressed: bool = False, level: Optional[str] = None) -> None:
+        """Record one capture_snapshot call, with the sampling level it got."""
+        if not self.enabled:
+            return
+        with self._lock:
+            counters = self._counters
+            counters["captures"] += 1
+            self._histograms["capture_seconds"].observe(seconds)
+            if level in _SAMPLED_LEVELS:
+                counters[_SAMPLED_LEVELS[level]] += 1
+            if suppressed:
+                counters["suppressed"] += 1
+                return
+            counters["frames_captured"] += frames
+            counters["variables_captured"] += variables
+            self._histograms["frames_per_capture"].observe(frames)
+            self._histograms["variables_per_capture"].observe(variables)
+
+    def record_render(self, seconds: float, rendered_bytes: int, truncations: int,
+                      serializer_failures: int) -> None:
+        """Record one rendered snapshot."""
+        if not self.enabled:
+            return
+        with self._lock:
+            counters = self._counters
+            counters["renders"] += 1
+            counters["rendered_bytes"] += rendered_bytes
+            counters["truncations"] += truncations
+            counters["serializer_failures"] += serializer_failures
+            self._histograms["render_seconds"].observe(seconds)
+
+    def increment(self, name: str, amount: int = 1) -> None:
+        """Add `amount` to the counter `name`."""
+        if not self.enabled:
+            return
+        with self._lock:
+            self._counters[name] += amount
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Return a consistent copy of all metrics.
+
+        Returns:
+            Counter values by name, and for each histogram a dict with
+            "count", "sum" and cumulative "buckets" (upper bound -> count).
+        """
+        with self._lock:
+            result: Dict[str, Any] = dict(self._counters)
+            for name, histogram in self._histograms.items():
+                result[name] = {"count": histogram.count, "sum": histogram.sum,
+                                "buckets": dict(histogram.cumulative())}
+        return result
+
+    def to_prometheus(self, prefix: str = "tracelight") -> str:
+        """Return all metrics in the Prometheus text exposition format."""
+        with self._lock:
+            counters = dict(self._counters)
+            histograms = {name: (h.cumulative(), h.sum, h.count)
+                          for name, h in self._histograms.items()}
+        lines = []
+        for name, help_text in _COUNTERS.items():
+            metric = f"{prefix}_{name}_total"
+            lines.append(f"# HELP {metric} {help_text}")
+            lines.append(f"# TYPE {metric} counter")
+            lines.append(f"{metric} {counters[name]}")
+        for name, (help_text, _) in _HISTOGRAMS.items():
+            metric = f"{prefix}_{name}"
+            buckets, total, count = histograms[name]
+            lines.append(f"# HELP {metric} {help_text}")
+            lines.append(f"# TYPE {metric} histogram")
+            for bound, cumulative in buckets:
+                lines.append(f'{metric}_bucket{{le="{bound}"}} {cumulative}')
+            lines.append(f"{metric}_sum {total!r}")
+            lines.append(f"{metric}_count {count}")
+        return "\n".join(lines) + "\n"
+
+
+# Metrics updated by capture_snapshot, rendering and BackgroundEmitter
+metrics = Metrics()
+
+
+def stats() -> Dict[str, Any]:
+    """Return a copy of tracelight's metrics (see Metrics.stats)."""
+    return metrics.stats()
+
+
+def export_prometheus(target: Union[str, "os.PathLike[str]", Callable[[str], Any], None] = None,
+                      prefix: str = "tracelight") -> str:
+    """
+    Export the metrics in the Prometheus text format.
+
+    Args:
+        target: A file path, written atomically (e.g. for the node_exporter
+                textfile collector); a callable, called with the text; or None.
+        prefix: Prefix of every metric name.
+
+    Returns:
+        The exported text.
+
+    Examples:
+        export_prometheus("/var/lib/node_exporter/tracelight.prom")
+        export_prometheus(push_to_gateway)
+    """
+    text = metrics.to_prometheus(prefix)
+    if callable(target):
+        target(text)
+    elif target is not None:
+        path = os.fspath(target)
+        directory = os.path.dirname(os.path.abspath(path))
+        handle, tmp_path = tempfile.mkstemp(dir=directory, prefix=".tracelight-", suffix=".prom")
+        try:
+            with os.fdopen(handle, "w") as tmp:
+                tmp.write(text)
+            os.replace(tmp_path, path)
+        except BaseException:
+            try:
+                os.unlink(tmp_path)
+            except OSError:
+                pass
+            raise
+    return text
@@ -0,0 +1,140 @@
+"""Precompiled redaction of captured names and values.
+
+A RedactionPolicy is built once (e.g. when a decorator is applied) and then
+applied while locals are copied into a snapshot, in the same pass: variable
+names and dict keys are checked against a name set, one combined glob pattern
+and the name regexes, string values are scrubbed with each value regex in
+turn, and dumped models have their configured fields replaced. Name checks
+are cached, so the cost per name stays flat as the rule list grows.
+"""
+
+import fnmatch
+import re
+import threading
+from typing import Any, Dict, FrozenSet, Iterable, List, Optional, Pattern, Union
+
+REDACTED = "<redacted>"
+
+# Limit on cached name decisions, so generated keys cannot grow the cache forever
+_MAX_CACHE_ENTRIES = 4096
+
+# Name rules: a glob ("*token*") or a compiled regex (matched in full)
+NameRule = Union[str, Pattern[str]]
+# Value rules: a regex source or a compiled regex (searched anywhere)
+ValueRule = Union[str, Pattern[str]]
+
+
+def _compile(rule: Union[str, Pattern[str]], flags: int = 0) -> Pattern[str]:
+    """Compile a rule on its own, keeping the flags of a compiled regex."""
+    if isinstance(rule, str):
+        return re.compile(rule, flags)
+    return re.compile(rule.pattern, rule.flags | flags) if flags & ~rule.flags else rule
+
+
+class RedactionPolicy:
+    """Rules for hiding secrets in captured state, compiled once.
+
+    Args:
+        names: Exact variable names and dict keys to redact, e.g. "password".
+        name_patterns: Globs ("*token*", "secret_*") or compiled regexes for
+            names; regexes must match the whole name and keep their flags.
+        value_patterns: Regexes whose matches are replaced inside string values,
+            exception messages and variable representations, e.g. email
+            addresses or bearer tokens. Each is compiled on its own (inline
+            flags, named groups and backreferences work as usual) and they
+            are applied in order.
+        fields: "Model.field" rules, applied to the dumped data of instances
+            of classes with that name (e.g. "User.ssn"), on top of `names`.
+        case_sensitive: Match names and globs case-sensitively.
+        replacement: Text that replaces redacted values.
+
+    Examples:
+        policy = RedactionPolicy(names=["password"],
+                                 name_patterns=["*token*", "*secret*"],
+                                 value_patterns=[r"[\\w.+-]+@[\\w-]+\\.[\\w.]+"],
+                                 fields=["User.ssn"])
+
+        @traced(redaction=policy)
+        def login(user, password):
+            ...
+    """
+
+    def __init__(self,
+                 names: Iterable[str] = (),
+                 name_patterns: Iterable[NameRule] = (),
+                 value_patterns: Iterable[ValueRule] = (),
+                 fields: Iterable[str] = (),
+                 case_sensitive: bool = False,
+                 replacement: str = REDACTED):
+        self.case_sensitive = case_sensitive
+        self.replacement = replacement
+        self._names: FrozenSet[str] = frozenset(self._fold(name) for name in names)
+
+        flags = 0 if case_sensitive else re.IGNORECASE
+        globs = []
+        self._name_regexes: List[Pattern[str]] = []
+        for rule in name_patterns:
+            if isinstance(rule, str):
+                # fnmatch.translate anchors the pattern and scopes its flags,
+                # so the globs combine safely into one regex
+                globs.append(fnmatch.translate(self._fold(rule)))
+            else:
+                self._name_regexes.append(_compile(rule, flags))
+        self._glob_pattern = re.compile("|".join(globs), flags) if globs else None
+
+        self._value_patterns: List[Pattern[str]] = [_compile(rule) for rule in value_patterns]
+
+        by_model: Dict[str, set] = {}
+        for rule in fields:
+            model, _, field = rule.rpartition(".")
+            if not model or not field:
+                raise ValueError(f"Field rule must look like 'Model.field': {rule!r}")
+            by_model.setdefault(model, set()).add(self._fold(field))
+        self._fields: Dict[str, FrozenSet[str]] = {
+            model: frozenset(field_names) for model, field_names in by_model.items()}
+
+        self._cache: Dict[str, bool] = {}
+        self._lock = threading.Lock()
+
+    def _fold(self, name: str) -> str:
+        return name if self.case_sensitive else name.lower()
+
+    @property
+    def redacts_values(self) -> bool:
+        """True if the policy has value patterns."""
+        return bool(self._value_patterns)
+
+    def matches_name(self, name: str) -> bool:
+        """Return True if values stored under `name` must be redacted."""
+        result = self._cache.get(name)
+        if result is None:
+            folded = self._fold(name)
+            result = (folded in self._names
+                      or bool(self._glob_pattern is not None and self._glob_pattern.match(folded))
+                      or any(regex.fullmatch(folded) for regex in self._name_regexes))
+            with self._lock:
+                if len(self._cache) >= _MAX_CACHE_ENTRIES:
+                    self._cache.clear()
+                self._cache[name] = result
+        return result
+
+    def redact_text(self, text: str) -> str:
+        """Replace every value-pattern match in `text`."""
+        for pattern in self._value_patterns:
+            text = pattern.sub(self.replacement, text)
+        return text
+
+    def redact_fields(self, cls: type, data: Any) -> Any:
+        """
+        Apply the field rules for `cls` to `data`, the dumped form of an instance.
+
+        Returns:
+            A copy of `data` with the configured top-level fields replaced, or
+            `data` itself if no rule applies.
+        """
+        fields = self._fields.get(cls.__name__)
+        if not fields or not isinstance(data, dict):
+            return data
+        return {key: (self.replacement
+                      if isinstance(key, str) and self._fold(key) in fields else value)
+                for key, value in data.items()}
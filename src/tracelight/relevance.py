@@ -0,0 +1,102 @@
+"""Select the locals that matter for a failing line.
+
+Most locals of a frame have nothing to do with the failure. relevant_names
+analyses a code object's bytecode to find the variable names used on the
+failing line and a few lines around it, plus the function's arguments. The
+bytecode is analysed once per code object and the name sets are cached per
+(code object, line number), so the hot error path only does dict lookups.
+"""
+
+import dis
+import inspect
+import threading
+from types import CodeType
+from typing import Dict, FrozenSet, Set, Tuple
+
+# Lines before and after the failing line whose names are also captured
+DEFAULT_CONTEXT_LINES = 2
+
+# Opcodes whose argument is a local, cell or (module-level) name
+_NAME_OPS = frozenset({
+    "LOAD_FAST", "LOAD_FAST_CHECK", "LOAD_FAST_AND_CLEAR", "LOAD_FAST_LOAD_FAST",
+    "STORE_FAST", "STORE_FAST_LOAD_FAST", "STORE_FAST_STORE_FAST", "DELETE_FAST",
+    "LOAD_NAME", "STORE_NAME", "DELETE_NAME",
+    "LOAD_DEREF", "STORE_DEREF", "DELETE_DEREF", "LOAD_CLOSURE",
+    "LOAD_CLASSDEREF", "LOAD_FROM_DICT_OR_DEREF",
+})
+
+# Limit on cached entries, so generated code cannot grow the caches forever
+_MAX_CACHE_ENTRIES = 4096
+
+_lock = threading.Lock()
+_names_by_line_cache: Dict[CodeType, Dict[int, Set[str]]] = {}
+_relevant_cache: Dict[Tuple[CodeType, int, int], FrozenSet[str]] = {}
+
+
+def _argument_names(code: CodeType) -> Tuple[str, ...]:
+    count = code.co_argcount + code.co_kwonlyargcount
+    if code.co_flags & inspect.CO_VARARGS:
+        count += 1
+    if code.co_flags & inspect.CO_VARKEYWORDS:
+        count += 1
+    return code.co_varnames[:count]
+
+
+def _names_by_line(code: CodeType) -> Dict[int, Set[str]]:
+    """Map each source line of `code` to the variable names it uses."""
+    by_line = _names_by_line_cache.get(code)
+    if by_line is not None:
+        return by_line
+
+    by_line = {}
+    starts = dict(dis.findlinestarts(code))
+    line = code.co_firstlineno
+    for instr in dis.get_instructions(code):
+        line = starts.get(instr.offset, line)
+        if line is None or instr.opname not in _NAME_OPS:
+            continue
+        # Superinstructions (3.13+) carry a pair of names
+        names = instr.argval if isinstance(instr.argval, tuple) else (instr.argval,)
+        by_line.setdefault(line, set()).update(n for n in names if isinstance(n, str))
+
+    with _lock:
+        if len(_names_by_line_cache) >= _MAX_CACHE_ENTRIES:
+            _names_by_line_cache.clear()
+        _names_by_line_cache[code] = by_line
+    return by_line
+
+
+def relevant_names(code: CodeType,
+                   lineno: int,
+                   context_lines: int = DEFAULT_CONTEXT_LINES) -> FrozenSet[str]:
+    """
+    Return the names worth capturing for a frame failing at `lineno`.
+
+    Args:
+        code: The frame's code object.
+        lineno: The line being executed when the exception was raised.
+        context_lines: Lines before and after `lineno` whose names are included.
+
+    Returns:
+        The function's argument names plus every local, cell or module-level
+        name loaded, stored or deleted within the line window.
+    """
+    key = (code, lineno, context_lines)
+    names = _relevant_cache.get(key)
+    if names is not None:
+        return names
+
+    try:
+        by_line = _names_by_line(code)
+    except Exception:
+        by_line = {}
+    selected = set(_argument_names(code))
+    for line in range(lineno - context_lines, lineno + context_lines + 1):
+        selected.update(by_line.get(line, ()))
+    names = frozenset(selected)
+
+    with _lock:
+        if len(_relevant_cache) >= _MAX_CACHE_ENTRIES:
+            _relevant_cache.clear()
+        _relevant_cache[key] = names
+    return names
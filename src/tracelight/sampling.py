@@ -0,0 +1,136 @@
+"""Adaptive sampling of exception captures under load.
+
+Capturing an exception costs the same whether it happens once a minute or ten
+thousand times a second, so an outage of a downstream service can turn
+tracelight into a CPU hog. An AdaptiveSampler picks a detail level for every
+event from the rolling error rate and, optionally, the capture and rendering
+time spent per second:
+
+- LOCALS: frames and their locals (the normal capture)
+- FRAMES: frames only, without locals
+- COUNT: only counted; nothing is logged and the snapshot has no frames
+
+The chosen level is recorded on the snapshot and in the structured data as
+"sampling_level", so the loss of detail is visible.
+"""
+
+import threading
+import time
+from typing import Callable, Dict, Optional
+
+# Detail levels, from most to least detailed
+LOCALS = "locals"
+FRAMES = "frames"
+COUNT = "count"
+
+LEVELS = (LOCALS, FRAMES, COUNT)
+
+
+class _RollingCounter:
+    """Sliding-window sum from two fixed windows (not thread-safe)."""
+
+    __slots__ = ("window", "start", "current", "previous")
+
+    def __init__(self, window: float, now: float):
+        self.window = window
+        self.start = now
+        self.current = 0.0
+        self.previous = 0.0
+
+    def add(self, amount: float, now: float) -> None:
+        self._advance(now)
+        self.current += amount
+
+    def total(self, now: float) -> float:
+        """Estimated sum over the last `window` seconds."""
+        self._advance(now)
+        # Weight the previous window by the part still inside the sliding window
+        overlap = 1.0 - (now - self.start) / self.window
+        return self.current + self.previous * max(0.0, overlap)
+
+    def _advance(self, now: float) -> None:
+        elapsed = now - self.start
+        if elapsed < self.window:
+            return
+        self.previous = self.current if elapsed < 2 * self.window else 0.0
+        self.current = 0.0
+        self.start += self.window * int(elapsed // self.window)
+
+
+class AdaptiveSampler:
+    """Chooses the capture detail level for each exception from the recent load.
+
+    Args:
+        locals_rate: Exceptions per second up to which locals are captured.
+        frames_rate: Exceptions per second up to which frames are captured;
+            above it, exceptions are only counted.
+        cpu_budget: Seconds of capture and rendering time allowed per second
+            (e.g. 0.05 for 5% of one core); while the rolling time spent
+            exceeds it, the level is lowered by one step. None for no budget.
+        window: Seconds over which the rates are computed.
+        clock: Monotonic clock, replaceable for tests.
+
+    Examples:
+        sampler = AdaptiveSampler(locals_rate=20, frames_rate=200, cpu_budget=0.05)
+
+        @traced(sampler=sampler)
+        def handler(request):
+            ...
+    """
+
+    def __init__(self,
+                 locals_rate: float = 10.0,
+                 frames_rate: float = 100.0,
+                 cpu_budget: Optional[float] = None,
+                 window: float = 1.0,
+                 clock: Callable[[], float] = time.monotonic):
+        if window <= 0:
+            raise ValueError("window must be positive")
+        self.locals_rate = locals_rate
+        self.frames_rate = frames_rate
+        self.cpu_budget = cpu_budget
+        self.window = window
+        self._clock = clock
+        now = clock()
+        self._events = _RollingCounter(window, now)
+        self._cost = _RollingCounter(window, now)
+        self._counts: Dict[str, int] = dict.fromkeys(LEVELS, 0)
+        self._lock = threading.Lock()
+
+    def choose(self) -> str:
+        """Count a new exception and return the detail level to capture it with."""
+        now = self._clock()
+        with self._lock:
+            self._events.add(1, now)
+            rate = self._events.total(now) / self.window
+            if rate <= self.locals_rate:
+                index = 0
+            elif rate <= self.frames_rate:
+                index = 1
+            else:
+                index = 2
+            if (self.cpu_budget is not None
+                    and self._cost.total(now) / self.window > self.cpu_budget):
+                index = min(index + 1, len(LEVELS) - 1)
+            level = LEVELS[index]
+            self._counts[level] += 1
+        return level
+
+    def record_cost(self, seconds: float) -> None:
+        """Add the time one capture or rendering took to the CPU budget."""
+        if self.cpu_budget is None:
+            return
+        now = self._clock()
+        with self._lock:
+            self._cost.add(seconds, now)
+
+    def rate(self) -> float:
+        """Return the rolling exception rate per second."""
+        now = self._clock()
+        with self._lock:
+            return self._events.total(now) / self.window
+
+    def counts(self) -> Dict[str, int]:
+        """Return the number of exceptions given each level so far."""
+        with self._lock:
+            return dict(self._counts)
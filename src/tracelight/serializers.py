@@ -0,0 +1,144 @@
+"""Type-dispatched serializers for captured locals.
+
+Each captured variable is turned into structured data by the serializer
+registered for its class. Resolution walks the class' MRO once and is then
+cached per class, so for the common types the per-variable cost is a single
+dict lookup, and objects are never probed for ``model_dump``/``dict`` methods
+they merely happen to have.
+"""
+
+import dataclasses
+import enum
+import threading
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+# Serializer marker: store the value itself (it is already JSON friendly)
+KEEP_VALUE: Callable[[Any], Any] = lambda value: value
+
+Serializer = Callable[[Any], Any]
+Predicate = Callable[[type], bool]
+
+# Marker for classes that resolved to no serializer
+_NO_SERIALIZER = object()
+
+# Limit on cached classes, so dynamically created classes cannot grow it forever
+_MAX_CACHED_CLASSES = 4096
+
+
+def _is_pydantic_v2(cls: type) -> bool:
+    return hasattr(cls, "model_dump") and hasattr(cls, "model_fields")
+
+
+def _is_pydantic_v1(cls: type) -> bool:
+    return hasattr(cls, "__fields__") and hasattr(cls, "parse_obj") and hasattr(cls, "dict")
+
+
+def _is_attrs(cls: type) -> bool:
+    return hasattr(cls, "__attrs_attrs__")
+
+
+def _is_namedtuple(cls: type) -> bool:
+    return issubclass(cls, tuple) and hasattr(cls, "_fields") and hasattr(cls, "_asdict")
+
+
+def _dump_attrs(value: Any) -> Any:
+    import attr
+    return attr.asdict(value)
+
+
+def _dump_enum(value: enum.Enum) -> str:
+    return f"{type(value).__name__}.{value.name}"
+
+
+class SerializerRegistry:
+    """Maps classes to serializers, resolved along the MRO and cached per class.
+
+    A serializer takes a value and returns the structured data stored for it
+    in the captured frame's locals. Classes registered with `register` match
+    themselves and their subclasses; predicates registered with
+    `register_predicate` are consulted, in order, for classes that have no
+    registered base class.
+
+    Args:
+        builtins: Install the default handlers for JSON-native types,
+            Pydantic v1/v2 models, dataclasses, attrs classes, namedtuples and
+            enums.
+
+    Examples:
+        registry = SerializerRegistry()
+        registry.register(Decimal, str)
+        registry.register(np.ndarray, lambda a: a.tolist()[:100])
+    """
+
+    def __init__(self, builtins: bool = True):
+        self._types: Dict[type, Serializer] = {}
+        self._predicates: List[Tuple[Predicate, Serializer]] = []
+        self._cache: Dict[type, Any] = {}
+        self._lock = threading.Lock()
+        if builtins:
+            self._install_builtins()
+
+    def _install_builtins(self) -> None:
+        for cls in (str, int, float, bool, type(None), list, dict):
+            self.register(cls, KEEP_VALUE)
+        self.register(enum.Enum, _dump_enum)
+        self.register_predicate(_is_pydantic_v2, lambda value: value.model_dump())
+        self.register_predicate(_is_pydantic_v1, lambda value: value.dict())
+        self.register_predicate(dataclasses.is_dataclass, dataclasses.asdict)
+        self.register_predicate(_is_attrs, _dump_attrs)
+        self.register_predicate(_is_namedtuple, lambda value: dict(value._asdict()))
+
+    def register(self, cls: type, serializer: Serializer) -> None:
+        """Use `serializer` for instances of `cls` and its subclasses."""
+        with self._lock:
+            self._types[cls] = serializer
+            self._cache.clear()
+
+    def register_predicate(self, predicate: Predicate, serializer: Serializer) -> None:
+        """Use `serializer` for classes matching `predicate` (checked once per class)."""
+        with self._lock:
+            self._predicates.append((predicate, serializer))
+            self._cache.clear()
+
+    def unregister(self, cls: type) -> None:
+        """Remove the serializer registered for exactly `cls`, if any."""
+        with self._lock:
+            self._types.pop(cls, None)
+            self._cache.clear()
+
+    def resolve(self, cls: type) -> Optional[Serializer]:
+        """
+        Return the serializer for instances of `cls`, or None to use repr.
+
+        The first call for a class walks its MRO (then the predicates); the
+        result is cached so later calls are a single dict lookup.
+        """
+        serializer = self._cache.get(cls)
+        if serializer is None:
+            serializer = self._resolve_uncached(cls)
+            if len(self._cache) >= _MAX_CACHED_CLASSES:
+                self._cache.clear()
+            self._cache[cls] = serializer
+        return None if serializer is _NO_SERIALIZER else serializer
+
+    def _resolve_uncached(self, cls: type) -> Any:
+        for base in cls.__mro__:
+            serializer = self._types.get(base)
+            if serializer is not None:
+                return serializer
+        for predicate, serializer in self._predicates:
+            try:
+                if predicate(cls):
+                    return serializer
+            except Exception:
+                continue
+        return _NO_SERIALIZER
+
+
+# Registry used when no other registry is given
+default_registry = SerializerRegistry()
+
+
+def register_serializer(cls: type, serializer: Serializer) -> None:
+    """Register `serializer` for `cls` in the default registry."""
+    default_registry.register(cls, serializer)
@@ -0,0 +1,165 @@
+"""Bounded, process-wide cache of source lines for captured frames.
+
+linecache keeps every file it ever read for the life of the process and
+stats the file again whenever it is asked to check for changes. SourceCache
+keeps only the lines of the code objects that actually failed, evicts the
+least recently used entries beyond a fixed size, and checks a file's mtime at
+most once per `check_interval`, so repeated errors in the same functions are
+served from memory without any disk I/O.
+"""
+
+import dis
+import os
+import threading
+import time
+import tokenize
+from collections import OrderedDict
+from types import CodeType
+from typing import Callable, Dict, List, Optional, Tuple
+
+# Lines of code shown around the failing line by default
+DEFAULT_CONTEXT_LINES = 2
+
+
+class _Entry:
+    __slots__ = ("checked", "stat", "first", "last", "lines")
+
+    def __init__(self, checked: float, stat: Optional[Tuple[float, int]],
+                 first: int, last: int, lines: Dict[int, str]):
+        self.checked = checked
+        self.stat = stat
+        self.first = first
+        self.last = last
+        self.lines = lines
+
+
+def _code_span(code: CodeType) -> Tuple[int, int]:
+    """Return the first and last source line of `code`."""
+    last = code.co_firstlineno
+    for _, line in dis.findlinestarts(code):
+        if line is not None and line > last:
+            last = line
+    return code.co_firstlineno, last
+
+
+def _file_stat(filename: str) -> Optional[Tuple[float, int]]:
+    try:
+        st = os.stat(filename)
+    except (OSError, ValueError):
+        return None
+    return st.st_mtime, st.st_size
+
+
+def _read_lines(filename: str, first: int, last: int) -> Dict[int, str]:
+    lines: Dict[int, str] = {}
+    try:
+        with tokenize.open(filename) as source:
+            for number, text in enumerate(source, 1):
+                if number > last:
+                    break
+                if number >= first:
+                    lines[number] = text.rstrip("\r\n")
+    except (OSError, SyntaxError, UnicodeDecodeError, ValueError):
+        return {}
+    return lines
+
+
+class SourceCache:
+    """Thread-safe LRU cache of source lines, keyed by file and code object.
+
+    Each entry holds the lines of one code object (plus the context margin
+    asked for), not the whole file.
+
+    Args:
+        max_entries: Code objects kept; the least recently used are evicted.
+        check_interval: Seconds between mtime checks of a cached entry's file;
+            0 checks on every lookup.
+        clock: Monotonic clock, replaceable for tests.
+
+    Examples:
+        cache = SourceCache(max_entries=128)
+        cache.source_lines(frame.f_code, frame.f_lineno, context=3)
+    """
+
+    def __init__(self,
+                 max_entries: int = 512,
+                 check_interval: float = 5.0,
+                 clock: Callable[[], float] = time.monotonic):
+        self.max_entries = max_entries
+        self.check_interval = check_interval
+        self._clock = clock
+        self._entries: "OrderedDict[Tuple[str, CodeType], _Entry]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def source_lines(self, code: CodeType, lineno: int,
+                     context: int = 0) -> List[Tuple[int, str]]:
+        """
+        Return the source around `lineno` in the function of `code`.
+
+        Args:
+            code: Code object of the frame.
+            lineno: The line to show.
+            context: Lines before and after `lineno` to include as well.
+
+        Returns:
+            (line number, text) pairs without line endings; empty if the
+            source is not available.
+        """
+        filename = code.co_filename
+        key = (filename, code)
+        now = self._clock()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+
+        if entry is not None and now - entry.checked >= self.check_interval:
+            if _file_stat(filename) != entry.stat:
+                entry = None
+            else:
+                entry.checked = now
+        if entry is not None and not (entry.first <= lineno - context
+                                      and lineno + context <= entry.last):
+            # Context beyond the lines kept for this code object
+            entry = None
+
+        if entry is None:
+            entry = self._load(key, code, lineno, context, now)
+
+        lines = entry.lines
+        return [(number, lines[number])
+                for number in range(lineno - context, lineno + context + 1)
+                if number in lines]
+
+    def line(self, code: CodeType, lineno: int) -> str:
+        """Return the text of `lineno` in `code`'s file, or "" if not available."""
+        lines = self.source_lines(code, lineno)
+        return lines[0][1] if lines else ""
+
+    def _load(self, key: Tuple[str, CodeType], code: CodeType, lineno: int,
+              context: int, now: float) -> _Entry:
+        filename = key[0]
+        first, last = _code_span(code)
+        first = max(1, min(first, lineno) - context)
+        last = max(last, lineno) + context
+        stat = _file_stat(filename)
+        lines = _read_lines(filename, first, last) if stat is not None else {}
+        entry = _Entry(now, stat, first, last, lines)
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return entry
+
+    def clear(self) -> None:
+        """Drop all cached lines."""
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+# Cache shared by rendering and format_traceback
+default_source_cache = SourceCache()
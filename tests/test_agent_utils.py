@@ -1,3 +1,7 @@
+import asyncio
+import dataclasses
+import json
+import threading
 import unittest
 import logging
 from io import StringIO
@@ -10,7 +14,9 @@ src_path = Path(__file__).resolve().parent.parent / 'src'
 if str(src_path) not in sys.path:
     sys.path.insert(0, str(src_path))
 
-from tracelight.agent_utils import traced_tool, format_for_agent
+from tracelight.agent_utils import ToolErrorResponse, traced_tool, format_for_agent
+from tracelight.background import BackgroundEmitter
+from tracelight.metrics import metrics
 
 
 class TestAgentUtils(unittest.TestCase):
@@ -80,6 +86,25 @@ class TestAgentUtils(unittest.TestCase):
         self.assertEqual(result["status"], "success")
         self.assertEqual(result["result"], "custom data")
         
+    def test_traced_tool_async(self):
+        # Test that traced_tool awaits async tools instead of wrapping the coroutine
+
+        @traced_tool(logger=self.logger)
+        async def async_tool(a, b):
+            await asyncio.sleep(0)
+            return a / b
+
+        result = asyncio.run(async_tool(6, 3))
+        self.assertEqual(result, {"status": "success", "result": 2})
+
+        result = asyncio.run(async_tool(5, 0))
+        self.assertEqual(result["status"], "error")
+        self.assertEqual(result["error_type"], "ZeroDivisionError")
+        self.assertIn("Traceback", result["traceback"])
+        frame_functions = [frame["function"] for frame in result["frames"]]
+        self.assertIn("async_tool", frame_functions)
+        self.assertIn("a = 5", self.log_output.getvalue())
+        
     def test_format_for_agent(self):
         # Test the format_for_agent function
         
@@ -114,5 +139,130 @@ class TestAgentUtils(unittest.TestCase):
         self.assertIn("(truncated, length=1000)", formatted)
         
 
+@dataclasses.dataclass
+class Basket:
+    items: list
+
+
+class Counter:
+    def __init__(self):
+        self.value = 0
+
+    def __repr__(self):
+        return f"Counter({self.value})"
+
+
+class TestLazyErrorResponse(unittest.TestCase):
+    def setUp(self):
+        self.log_output = StringIO()
+        self.logger = logging.getLogger("test_agent_utils.lazy")
+        self.logger.handlers[:] = [logging.StreamHandler(self.log_output)]
+        self.logger.propagate = False
+        self.logger.setLevel(logging.DEBUG)
+
+    def failing_tool(self, **options):
+        @traced_tool(logger=self.logger, **options)
+        def tool(items):
+            total = sum(items)
+            return total / 0
+
+        return tool
+
+    def test_returns_complete_plain_dict(self):
+        self.logger.setLevel(logging.CRITICAL)
+        response = self.failing_tool()([1])
+        # Encoders reading the dict storage directly see every entry
+        self.assertIs(type(response), dict)
+        self.assertEqual(list(dict.keys(response)),
+                         ["status", "error_type", "error", "traceback", "frames", "fingerprint"])
+        plain = json.loads(json.dumps(response))
+        self.assertEqual(plain["frames"][-1]["locals"]["items"], [1])
+        self.assertIn("ZeroDivisionError", plain["traceback"])
+
+    def test_lazy_summary_does_not_render(self):
+        self.logger.setLevel(logging.CRITICAL)
+        renders = metrics.stats()["renders"]
+        response = self.failing_tool(lazy=True)([1, 2])
+        self.assertIsInstance(response, ToolErrorResponse)
+        self.assertEqual(response.summary["status"], "error")
+        self.assertEqual(response.summary["error_type"], "ZeroDivisionError")
+        self.assertNotIn("frames", response.summary)
+        self.assertEqual(metrics.stats()["renders"], renders)
+
+        details = response.to_dict()
+        self.assertIs(type(details), dict)
+        self.assertEqual(details["frames"][-1]["locals"]["total"], 3)
+        self.assertIn("ZeroDivisionError", details["traceback"])
+        self.assertIs(response.to_dict(), details)
+        self.assertEqual(metrics.stats()["renders"], renders + 1)
+        self.assertEqual(self.log_output.getvalue(), "")
+
+    def test_lazy_matches_eager(self):
+        self.logger.setLevel(logging.CRITICAL)
+        eager = self.failing_tool()([1])
+        lazy = self.failing_tool(lazy=True)([1]).to_dict()
+        self.assertEqual(list(lazy), list(eager))
+        self.assertEqual(lazy["frames"][-1]["locals"], eager["frames"][-1]["locals"])
+
+    def test_detached_at_exception_time(self):
+        self.logger.setLevel(logging.CRITICAL)
+        items = [1, 2]
+        response = self.failing_tool(lazy=True)(items)
+        items.append(3)
+        self.assertEqual(response.to_dict()["frames"][-1]["locals"]["items"], [1, 2])
+
+    def test_objects_detached_at_exception_time(self):
+        self.logger.setLevel(logging.CRITICAL)
+        for options in ({}, {"max_tokens": 2000}):
+            with self.subTest(**options):
+                @traced_tool(logger=self.logger, lazy=True, **options)
+                def tool(basket, counter):
+                    return len(basket.items) / counter.value
+
+                basket, counter = Basket(["apple"]), Counter()
+                response = tool(basket, counter)
+                basket.items.append("pear")
+                counter.value = 5
+                frame_locals = response.to_dict()["frames"][-1]["locals"]
+                self.assertIn("apple", str(frame_locals["basket"]))
+                self.assertNotIn("pear", str(frame_locals["basket"]))
+                self.assertEqual(str(frame_locals["counter"]), "Counter(0)")
+
+    def test_emitter_and_response_share_one_render(self):
+        emitter = BackgroundEmitter()
+        renders = metrics.stats()["renders"]
+        response = self.failing_tool(emitter=emitter, lazy=True)([4])
+        self.assertTrue(emitter.flush(timeout=5))
+        self.assertIn("total = 4", self.log_output.getvalue())
+        self.assertEqual(response.to_dict()["frames"][-1]["locals"]["total"], 4)
+        self.assertEqual(metrics.stats()["renders"], renders + 1)
+        emitter.shutdown()
+
+    def test_budgeted_response_read_before_log_job(self):
+        emitter = BackgroundEmitter()
+        release = threading.Event()
+        # Keep the worker busy until the response has been read
+        emitter.submit(release.wait, 5)
+        response = self.failing_tool(emitter=emitter, max_tokens=500, lazy=True)([4])
+        self.assertEqual(response.to_dict()["frames"][-1]["locals"]["total"], "4")
+        release.set()
+        self.assertTrue(emitter.flush(timeout=5))
+        self.assertEqual(emitter.errors, 0)
+        self.assertIn("total = 4", self.log_output.getvalue())
+        self.assertIsNone(response._snapshot)
+        emitter.shutdown()
+
+    def test_changes_before_rendering_are_kept(self):
+        self.logger.setLevel(logging.CRITICAL)
+        response = self.failing_tool(lazy=True)([1])
+        response.summary["request_id"] = "r-1"
+        response.summary["error"] = "hidden"
+        details = response.to_dict()
+        self.assertEqual(details["request_id"], "r-1")
+        self.assertEqual(details["frames"][-1]["function"], "tool")
+        self.assertEqual(details["error"], "hidden")
+        self.assertEqual(list(details)[-1], "request_id")
+
+
 if __name__ == "__main__":
     unittest.main()
\ No newline at end of file
@@ -0,0 +1,186 @@
+import unittest
+import logging
+import multiprocessing
+import pickle
+import queue
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from io import StringIO
+import sys
+from pathlib import Path
+
+# Add the src directory to the Python path if not already there
+src_path = Path(__file__).resolve().parent.parent / 'src'
+if str(src_path) not in sys.path:
+    sys.path.insert(0, str(src_path))
+
+from tracelight import (RedactionPolicy, SnapshotAggregator, send_snapshot, snapshot_of,
+                        traced)
+from tracelight.core import SNAPSHOT_FORMAT, ExceptionSnapshot, capture_snapshot, log_snapshot
+
+
+class Connection:
+    """Unpicklable local, like a socket or a database connection."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+
+    def __repr__(self):
+        return "<Connection to db.internal>"
+
+
+def failing_job(count):
+    conn = Connection()
+    items = list(range(count))
+    raise ValueError(f"job {count} failed")
+
+
+worker_logger = logging.getLogger("test_aggregate.worker")
+worker_logger.addHandler(logging.NullHandler())
+worker_logger.propagate = False
+
+
+@traced(logger=worker_logger, attach_snapshot=True)
+def traced_job(count):
+    return failing_job(count)
+
+
+def _fork_context():
+    try:
+        return multiprocessing.get_context("fork")
+    except ValueError:
+        return None
+
+
+class TestPicklableSnapshot(unittest.TestCase):
+    def capture(self, **kwargs):
+        try:
+            failing_job(3)
+        except ValueError as e:
+            return capture_snapshot(e, **kwargs)
+
+    def test_round_trip(self):
+        snapshot = self.capture()
+        with self.assertRaises(TypeError):
+            pickle.dumps(Connection())
+        copy = pickle.loads(pickle.dumps(snapshot))
+        self.assertEqual(copy.error_type, "ValueError")
+        self.assertEqual(copy.error, "job 3 failed")
+        self.assertEqual(copy.fingerprint, snapshot.fingerprint)
+        self.assertEqual(copy.timestamp, snapshot.timestamp)
+        frame = copy.frames[-1]
+        self.assertEqual(frame.function, "failing_job")
+        self.assertIsNone(frame.code)
+        self.assertEqual(frame.locals["items"], [0, 1, 2])
+        self.assertEqual(frame.locals["conn"], "<Connection to db.internal>")
+        # Stored representations render without quotes
+        self.assertEqual(repr(frame.locals["conn"]), "<Connection to db.internal>")
+
+    def test_unpickled_snapshot_renders(self):
+        copy = pickle.loads(pickle.dumps(self.capture()))
+        stream = StringIO()
+        logger = logging.getLogger("test_aggregate.render")
+        logger.handlers[:] = [logging.StreamHandler(stream)]
+        logger.propagate = False
+        error_data = log_snapshot(copy, logger, source_context=1)
+        self.assertEqual(error_data["frames"][-1]["locals"]["conn"],
+                         "<Connection to db.internal>")
+        self.assertIn("conn = <Connection to db.internal>", stream.getvalue())
+
+    def test_redaction_applies_to_representations(self):
+        policy = RedactionPolicy(value_patterns=[r"db\.internal"])
+        copy = pickle.loads(pickle.dumps(self.capture(redaction=policy)))
+        self.assertEqual(copy.frames[-1].locals["conn"], "<Connection to <redacted>>")
+        self.assertIsNone(copy.redaction)
+
+    def test_chained_frames_are_shared(self):
+        try:
+            try:
+                failing_job(1)
+            except ValueError as inner:
+                raise RuntimeError("outer") from inner
+        except RuntimeError as e:
+            snapshot = capture_snapshot(e)
+        copy = pickle.loads(pickle.dumps(snapshot))
+        self.assertEqual(len(copy.related), 1)
+        self.assertEqual(copy.related[0].relation, "cause")
+        self.assertEqual([f.function for f in copy.related[0].frames],
+                         [f.function for f in snapshot.related[0].frames])
+
+    def test_other_format_versions(self):
+        state = self.capture().__getstate__()
+        self.assertEqual(state["format"], SNAPSHOT_FORMAT)
+
+        # A newer version with extra keys
+        newer = dict(state, format=SNAPSHOT_FORMAT + 1, worker="w-1")
+        newer["frames"] = [dict(frame, extra=True) for frame in state["frames"]]
+        copy = ExceptionSnapshot.__new__(ExceptionSnapshot)
+        copy.__setstate__(newer)
+        self.assertEqual(copy.frames[-1].locals["items"], [0, 1, 2])
+
+        # An older or partial state with missing keys
+        older = {"format": 1, "error_type": "KeyError", "error": "'x'"}
+        copy = ExceptionSnapshot.__new__(ExceptionSnapshot)
+        copy.__setstate__(older)
+        self.assertEqual((copy.error_type, copy.frames, copy.related), ("KeyError", [], []))
+
+    def test_attach_snapshot(self):
+        try:
+            failing_job(2)
+        except ValueError as e:
+            snapshot = capture_snapshot(e, attach_snapshot=True)
+            self.assertIs(snapshot_of(e), snapshot)
+            received = pickle.loads(pickle.dumps(e))
+        self.assertIsInstance(received, ValueError)
+        self.assertEqual(snapshot_of(received).frames[-1].locals["items"], [0, 1])
+        self.assertIsNone(snapshot_of(ValueError("plain")))
+
+
+class TestSnapshotAggregator(unittest.TestCase):
+    def test_queue_listener(self):
+        received = []
+        aggregator = SnapshotAggregator(handler=received.append)
+        snapshots = queue.Queue()
+        aggregator.listen(snapshots)
+        for count in (1, 1, 2):
+            try:
+                failing_job(count)
+            except ValueError as e:
+                send_snapshot(snapshots, e, max_var_length=10)
+        aggregator.stop(timeout=5)
+        self.assertEqual(len(received), 3)
+        # Same failure location, same fingerprint
+        self.assertEqual(list(aggregator.counts().values()), [3])
+
+    def test_logs_by_default(self):
+        stream = StringIO()
+        logger = logging.getLogger("test_aggregate.parent")
+        logger.handlers[:] = [logging.StreamHandler(stream)]
+        logger.propagate = False
+        aggregator = SnapshotAggregator(logger, batched=True)
+        try:
+            failing_job(1)
+        except ValueError as e:
+            snapshot = pickle.loads(pickle.dumps(capture_snapshot(e)))
+        self.assertIs(aggregator.submit(snapshot), snapshot)
+        self.assertIn("job 1 failed", stream.getvalue())
+        self.assertIsNone(aggregator.submit(ValueError("no snapshot")))
+
+    @unittest.skipIf(_fork_context() is None, "needs the fork start method")
+    def test_process_pool(self):
+        received = []
+        aggregator = SnapshotAggregator(handler=received.append)
+        with ProcessPoolExecutor(max_workers=1, mp_context=_fork_context()) as pool:
+            future = pool.submit(traced_job, 4)
+            with self.assertRaises(ValueError) as ctx:
+                future.result(timeout=30)
+        aggregator.submit(ctx.exception)
+        self.assertEqual(len(received), 1)
+        frame = received[0].frames[-1]
+        self.assertEqual(frame.function, "failing_job")
+        self.assertEqual(frame.locals["items"], [0, 1, 2, 3])
+        self.assertEqual(frame.locals["conn"], "<Connection to db.internal>")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,144 @@
+import unittest
+import logging
+import threading
+from io import StringIO
+import sys
+from pathlib import Path
+
+# Add the src directory to the Python path if not already there
+src_path = Path(__file__).resolve().parent.parent / 'src'
+if str(src_path) not in sys.path:
+    sys.path.insert(0, str(src_path))
+
+from tracelight.background import BackgroundEmitter
+from tracelight.core import capture_snapshot
+from tracelight.decorators import traced
+from tracelight.agent_utils import traced_tool
+
+
+class TestBackgroundEmitter(unittest.TestCase):
+    def setUp(self):
+        # Create a StringIO object to capture log output
+        self.log_output = StringIO()
+        self.handler = logging.StreamHandler(self.log_output)
+        self.logger = logging.getLogger("test_background")
+        self.logger.addHandler(self.handler)
+        self.logger.setLevel(logging.DEBUG)
+        self.emitter = BackgroundEmitter(maxsize=2)
+
+    def tearDown(self):
+        self.emitter.shutdown(timeout=5)
+        self.logger.removeHandler(self.handler)
+        self.handler.close()
+
+    def block_worker(self):
+        """Occupy the worker thread until the returned event is set."""
+        started = threading.Event()
+        release = threading.Event()
+
+        def job():
+            started.set()
+            release.wait(5)
+
+        self.emitter.submit(job)
+        started.wait(5)
+        return release
+
+    def test_snapshot_is_detached_from_frames(self):
+        try:
+            x = 1
+            password = "secret"
+            raise ValueError("boom")
+        except ValueError as e:
+            snapshot = capture_snapshot(e, exclude_vars=["password"])
+
+        self.assertEqual(snapshot.error_type, "ValueError")
+        self.assertEqual(snapshot.error, "boom")
+        frame = snapshot.frames[0]
+        self.assertEqual(frame.function, "test_snapshot_is_detached_from_frames")
+        self.assertEqual(frame.locals["x"], 1)
+        self.assertNotIn("password", frame.locals)
+
+    def test_traced_logs_on_worker_thread(self):
+        @traced(logger=self.logger, emitter=self.emitter, reraise=False)
+        def failing_function(x, y):
+            return x / y
+
+        failing_function(5, 0)
+        self.assertTrue(self.emitter.flush(timeout=5))
+
+        output = self.log_output.getvalue()
+        self.assertIn("ZeroDivisionError", output)
+        self.assertIn("x = 5", output)
+        self.assertIn("y = 0", output)
+
+    def test_traced_tool_defers_logging_only(self):
+        @traced_tool(logger=self.logger, emitter=self.emitter)
+        def failing_tool(a, b):
+            return a / b
+
+        release = self.block_worker()
+        result = failing_tool(5, 0)
+        # The response is complete before the worker has logged anything
+        self.assertEqual(result["status"], "error")
+        self.assertIn("failing_tool", [frame["function"] for frame in result["frames"]])
+        self.assertEqual(self.log_output.getvalue(), "")
+
+        release.set()
+        self.assertTrue(self.emitter.flush(timeout=5))
+        self.assertIn("a = 5", self.log_output.getvalue())
+
+    def test_drop_newest_when_full(self):
+        release = self.block_worker()
+        ran = []
+        self.assertTrue(self.emitter.submit(ran.append, 1))
+        self.assertTrue(self.emitter.submit(ran.append, 2))
+        self.assertFalse(self.emitter.submit(ran.append, 3))
+        release.set()
+        self.emitter.flush(timeout=5)
+        self.assertEqual(ran, [1, 2])
+        self.assertEqual(self.emitter.dropped, 1)
+
+    def test_drop_oldest_when_full(self):
+        self.emitter.shutdown()
+        self.emitter = BackgroundEmitter(maxsize=2, drop_policy=BackgroundEmitter.DROP_OLDEST)
+        release = self.block_worker()
+        ran = []
+        for i in range(1, 4):
+            self.assertTrue(self.emitter.submit(ran.append, i))
+        release.set()
+        self.emitter.flush(timeout=5)
+        self.assertEqual(ran, [2, 3])
+        self.assertEqual(self.emitter.dropped, 1)
+
+    def test_shutdown_processes_pending_jobs(self):
+        ran = []
+        self.emitter.submit(ran.append, 1)
+        self.emitter.shutdown(timeout=5)
+        self.assertEqual(ran, [1])
+        self.assertFalse(self.emitter.submit(ran.append, 2))
+
+    def test_shutdown_during_submit_runs_the_job(self):
+        emitter = self.emitter
+        self.assertTrue(emitter.submit(int))
+        stopper = threading.Thread(target=emitter.shutdown, kwargs={"timeout": 5})
+        put = emitter._queue.put
+
+        def put_after_shutdown_starts(item, *args, **kwargs):
+            # Let shutdown run between the closed check and the put
+            emitter._queue.put = put
+            stopper.start()
+            stopper.join(0.2)
+            put(item, *args, **kwargs)
+
+        emitter._queue.put = put_after_shutdown_starts
+        ran = []
+        self.assertTrue(emitter.submit(ran.append, 1))
+        stopper.join(5)
+        # The job queued before _STOP instead of behind it
+        self.assertTrue(emitter.flush(timeout=1))
+        self.assertEqual(ran, [1])
+
+
+if __name__ == "__main__":
+    unittest.main()
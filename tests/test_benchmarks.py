@@ -0,0 +1,51 @@
+import unittest
+import sys
+from pathlib import Path
+
+# Add the src and benchmarks directories to the Python path if not already there
+src_path = Path(__file__).resolve().parent.parent / 'src'
+if str(src_path) not in sys.path:
+    sys.path.insert(0, str(src_path))
+bench_path = Path(__file__).resolve().parent.parent / 'benchmarks'
+if str(bench_path) not in sys.path:
+    sys.path.insert(0, str(bench_path))
+
+import bench_capture
+
+
+class TestBenchmarkSuite(unittest.TestCase):
+    def test_quick_run_is_machine_readable(self):
+        results = bench_capture.run(quick=True, iterations=2,
+                                    name_filter="log_exception_state/small/depth=1/")
+        self.assertEqual(results["format"], bench_capture.RESULT_FORMAT)
+        self.assertEqual(len(results["results"]), 1)
+        entry = results["results"][0]
+        self.assertEqual(entry["params"], {"target": "log_exception_state", "payload": "small",
+                                           "depth": 1, "locals": 5})
+        self.assertGreater(entry["latency_us"]["median"], 0)
+        self.assertGreater(entry["peak_bytes"], 0)
+        self.assertIsInstance(entry["allocated_blocks"], int)
+
+    def test_per_call_overhead(self):
+        results = bench_capture.run(quick=True, iterations=2,
+                                    name_filter="per_call/positional/")
+        plain, wrapped = results["results"]
+        self.assertEqual(plain["params"]["variant"], "plain")
+        self.assertGreater(plain["per_call_ns"], 0)
+        self.assertIn("overhead_ns", wrapped)
+
+    def test_compare_flags_regressions(self):
+        def document(median, peak):
+            return {"results": [{"key": "case", "latency_us": {"median": median},
+                                 "peak_bytes": peak}]}
+
+        rows = bench_capture.compare(document(300.0, 1000), document(100.0, 1000))
+        self.assertEqual(len(rows), 1)
+        self.assertTrue(rows[0]["regressed"])
+        self.assertAlmostEqual(rows[0]["latency_ratio"], 3.0)
+        self.assertFalse(bench_capture.compare(document(110.0, 1000),
+                                               document(100.0, 1000))[0]["regressed"])
+
+
+if __name__ == '__main__':
+    unittest.main()
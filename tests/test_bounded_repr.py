@@ -0,0 +1,73 @@
+import unittest
+import sys
+from collections import OrderedDict
+from pathlib import Path
+
+# Add the src directory to the Python path if not already there
+src_path = Path(__file__).resolve().parent.parent / 'src'
+if str(src_path) not in sys.path:
+    sys.path.insert(0, str(src_path))
+
+from tracelight.bounded_repr import bounded_repr
+
+
+def reference(obj, max_length):
+    """The plain repr-then-truncate behaviour bounded_repr must reproduce."""
+    rep = repr(obj)
+    if len(rep) > max_length:
+        rep = rep[:max_length] + "...<truncated>"
+    return rep
+
+
+class CountingRepr:
+    calls = 0
+
+    def __repr__(self):
+        CountingRepr.calls += 1
+        return "<counted>"
+
+
+class MyList(list):
+    pass
+
+
+class MySet(set):
+    pass
+
+
+class TestBoundedRepr(unittest.TestCase):
+    def test_matches_repr_for_builtin_values(self):
+        recursive = [1, 2]
+        recursive.append(recursive)
+        values = [
+            42, 3.5, None, True,
+            "plain", "it's", 'say "hi"', "both ' and \"", "tab\there\n" * 30,
+            "it's" * 100, 'x"' * 50 + "'", b"bytes'" * 40, b"\x00\xff" * 100,
+            [], [1], list(range(500)), (), (1,), tuple(range(300)),
+            {}, {"a": [1, {"b": (2, 3)}]}, {i: str(i) * 3 for i in range(200)},
+            set(), {1, 2, 3}, frozenset(), frozenset({"x"}), MySet({1}), MySet(),
+            MyList([1, 2]), OrderedDict(a=1), recursive,
+        ]
+        for value in values:
+            for max_length in (0, 1, 5, 17, 50, 1000):
+                with self.subTest(value=repr(value)[:40], max_length=max_length):
+                    self.assertEqual(bounded_repr(value, max_length),
+                                     reference(value, max_length))
+
+    def test_stops_once_budget_is_spent(self):
+        CountingRepr.calls = 0
+        big = [CountingRepr() for _ in range(100000)]
+        rep = bounded_repr(big, 100)
+        self.assertTrue(rep.endswith("...<truncated>"))
+        # Only the items needed to fill 100 characters are ever rendered
+        self.assertLess(CountingRepr.calls, 20)
+
+    def test_depth_and_item_limits(self):
+        nested = {"a": {"b": {"c": [1, 2]}}}
+        self.assertEqual(bounded_repr(nested, max_depth=1), "{'a': {'b': {...}}}")
+        self.assertEqual(bounded_repr(list(range(10)), max_items=3), "[0, 1, 2, ...]")
+        self.assertEqual(bounded_repr({1, 2, 3, 4}, max_items=2), "{1, 2, ...}")
+
+
+if __name__ == "__main__":
+    unittest.main()
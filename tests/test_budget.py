@@ -0,0 +1,169 @@
+import unittest
+import json
+import logging
+import sys
+from pathlib import Path
+
+# Add the src directory to the Python path if not already there
+src_path = Path(__file__).resolve().parent.parent / 'src'
+if str(src_path) not in sys.path:
+    sys.path.insert(0, str(src_path))
+
+from tracelight import summarize_for_agent, summarize_snapshot
+from tracelight.agent_utils import traced_tool
+from tracelight.budget import BYTES_PER_TOKEN, budget_bytes
+from tracelight.core import capture_snapshot
+
+
+def step(depth, records):
+    history = ["event %d" % i for i in range(30)]
+    config = {"key%d" % i: "value" * 10 for i in range(10)}
+    if depth == 0:
+        record = records[-1]
+        return record["missing"]
+    return step(depth - 1, records)
+
+
+def translate(depth):
+    labels = ["été — 日本語 %d" % i for i in range(200)]
+    notes = "ligne\n\t« citée »\n" * 300
+    if depth == 0:
+        raise ValueError("échec: 日本")
+    return translate(depth - 1)
+
+
+def run_pipeline(depth=20):
+    records = [{"id": i, "payload": "x" * 50} for i in range(10)]
+    return step(depth, records)
+
+
+class TestSummarizeSnapshot(unittest.TestCase):
+    def capture(self, depth=20):
+        try:
+            run_pipeline(depth)
+        except KeyError as e:
+            return capture_snapshot(e)
+
+    def test_fits_budget(self):
+        snapshot = self.capture()
+        unbounded = summarize_snapshot(snapshot)
+        self.assertGreater(len(json.dumps(unbounded)), 40_000)
+        self.assertIsNone(unbounded["budget"]["used_bytes"])
+
+        for budget in (1500, 4000, 16000):
+            with self.subTest(budget=budget):
+                summary = summarize_snapshot(snapshot, max_bytes=budget)
+                size = len(json.dumps(summary))
+                self.assertLessEqual(size, budget)
+                self.assertEqual(summary["budget"]["max_bytes"], budget)
+                self.assertGreater(summary["budget"]["used_bytes"], size * 0.8)
+
+    def test_non_ascii_and_escapes_fit_budget(self):
+        try:
+            translate(15)
+        except ValueError as e:
+            snapshot = capture_snapshot(e)
+        for budget in (2000, 50_000):
+            with self.subTest(budget=budget):
+                summary = summarize_snapshot(snapshot, max_bytes=budget)
+                encoded = json.dumps(summary)
+                self.assertLessEqual(len(encoded), budget)
+                self.assertLessEqual(len(json.dumps(summary, ensure_ascii=False).encode()),
+                                     budget)
+                self.assertEqual(summary["budget"]["used_bytes"], len(encoded))
+                self.assertFalse(summary["budget"]["exceeded"])
+
+    def test_budget_below_minimum_is_reported(self):
+        snapshot = self.capture()
+        for budget in (100, 200, 300):
+            with self.subTest(budget=budget):
+                summary = summarize_snapshot(snapshot, max_bytes=budget)
+                size = len(json.dumps(summary))
+                self.assertEqual(summary["budget"]["used_bytes"], size)
+                self.assertEqual(summary["budget"]["exceeded"], size > budget)
+        self.assertTrue(summarize_snapshot(snapshot, max_bytes=100)["budget"]["exceeded"])
+
+    def test_innermost_frame_and_failing_line_first(self):
+        summary = summarize_snapshot(self.capture(), max_bytes=3000)
+        innermost = summary["frames"][-1]
+        self.assertEqual(innermost["function"], "step")
+        self.assertEqual(innermost["locals"]["depth"], "0")
+        # Used on the failing line: shown in full before the larger locals
+        self.assertEqual(innermost["locals"]["record"], repr({"id": 9, "payload": "x" * 50}))
+        self.assertTrue(innermost["locals"]["history"].endswith("...<truncated>"))
+
+        # Outer frames degrade: type placeholders, omitted locals or dropped frames
+        budget = summary["budget"]
+        self.assertTrue(budget["omitted_frames"] or budget["omitted_locals"])
+        outer_values = [value for frame in summary["frames"][:-3]
+                        for value in frame["locals"].values()]
+        self.assertTrue(all(len(value) < 100 for value in outer_values))
+
+    def test_tokens(self):
+        self.assertEqual(budget_bytes(max_tokens=500), 500 * BYTES_PER_TOKEN)
+        self.assertEqual(budget_bytes(max_bytes=1000, max_tokens=500), 1000)
+        self.assertIsNone(budget_bytes())
+        try:
+            run_pipeline(5)
+        except KeyError as e:
+            summary = summarize_for_agent(e, max_tokens=500, exclude_vars=["config"])
+        self.assertLessEqual(len(json.dumps(summary)), 500 * BYTES_PER_TOKEN)
+        self.assertNotIn("config", summary["frames"][-1]["locals"])
+
+    def test_log_only_options_ignored(self):
+        try:
+            run_pipeline(2)
+        except KeyError as e:
+            summary = summarize_for_agent(e, max_bytes=2000, source_context=1,
+                                          batched=True, level=logging.WARNING,
+                                          max_var_length=50)
+            self.assertLessEqual(len(json.dumps(summary)), 2000)
+            with self.assertRaises(TypeError) as raised:
+                summarize_for_agent(e, max_bytes=2000, max_var_lenght=50)
+        self.assertIn("max_var_lenght", str(raised.exception))
+
+    def test_long_message_and_chained_exceptions(self):
+        try:
+            try:
+                run_pipeline(3)
+            except KeyError as inner:
+                raise RuntimeError("failed: " + "y" * 10_000) from inner
+        except RuntimeError as e:
+            summary = summarize_for_agent(e, max_bytes=2500)
+        self.assertLessEqual(len(json.dumps(summary)), 2500)
+        self.assertLess(len(summary["error"]), 300)
+        self.assertEqual(summary["exceptions"][0]["relation"], "cause")
+        self.assertIn("chained_frames", summary)
+
+
+class TestTracedToolBudget(unittest.TestCase):
+    def setUp(self):
+        self.logger = logging.getLogger("test_budget")
+        self.logger.handlers[:] = [logging.NullHandler()]
+        self.logger.propagate = False
+
+    def test_response_fits_budget(self):
+        @traced_tool(logger=self.logger, max_tokens=1000)
+        def tool(depth):
+            return run_pipeline(depth)
+
+        response = tool(15)
+        self.assertEqual(response["status"], "error")
+        encoded = json.dumps(response)
+        self.assertLessEqual(len(encoded), 1000 * BYTES_PER_TOKEN + 100)
+        self.assertEqual(response["budget"]["max_bytes"], 1000 * BYTES_PER_TOKEN)
+        self.assertEqual(list(response)[:4], ["status", "error_type", "error", "traceback"])
+        self.assertIn("record", response["frames"][-1]["locals"])
+
+    def test_no_budget_keeps_full_response(self):
+        @traced_tool(logger=self.logger)
+        def tool(depth):
+            return run_pipeline(depth)
+
+        response = tool(2)
+        self.assertNotIn("budget", response)
+        self.assertEqual(response["frames"][-1]["locals"]["depth"], 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,160 @@
+import unittest
+import logging
+import threading
+import sys
+from pathlib import Path
+
+# Add the src directory to the Python path if not already there
+src_path = Path(__file__).resolve().parent.parent / 'src'
+if str(src_path) not in sys.path:
+    sys.path.insert(0, str(src_path))
+
+from tracelight import RateLimiter, SnapshotBuffer, SnapshotLimits, log_exception_state, traced
+from tracelight.agent_utils import traced_tool
+from tracelight.core import capture_snapshot
+
+
+class Resource:
+    def __repr__(self):
+        return "<Resource>"
+
+
+class CountingRepr:
+    calls = 0
+
+    def __repr__(self):
+        CountingRepr.calls += 1
+        return "<CountingRepr>"
+
+
+def hold(value):
+    held = value
+    raise RuntimeError("held")
+
+
+def lookup(key):
+    table = {"a": 1}
+    return table[key]
+
+
+def divide(x):
+    resource = Resource()
+    return 1 / x
+
+
+class TestSnapshotBuffer(unittest.TestCase):
+    def setUp(self):
+        self.logger = logging.getLogger("test_buffer")
+        self.logger.handlers[:] = [logging.NullHandler()]
+        self.logger.propagate = False
+
+    def capture(self, func, arg, **kwargs):
+        try:
+            func(arg)
+        except Exception as e:
+            return capture_snapshot(e, **kwargs)
+
+    def test_count_limit_evicts_oldest(self):
+        buffer = SnapshotBuffer(max_snapshots=3, max_bytes=None)
+        for key in "bcdef":
+            self.capture(lookup, key, buffer=buffer)
+        self.assertEqual(len(buffer), 3)
+        self.assertEqual(buffer.evicted, 2)
+        self.assertEqual([s.error for s in buffer.query()], ["'f'", "'e'", "'d'"])
+
+    def test_byte_limit(self):
+        buffer = SnapshotBuffer(max_snapshots=1000, max_bytes=20_000)
+        for _ in range(200):
+            self.capture(lookup, "x" * 1000, buffer=buffer)
+        self.assertLessEqual(buffer.total_bytes, 20_000)
+        self.assertGreater(len(buffer), 1)
+        self.assertLess(len(buffer), 200)
+        buffer.clear()
+        self.assertEqual((len(buffer), buffer.total_bytes), (0, 0))
+
+    def test_queries(self):
+        buffer = SnapshotBuffer()
+        key_error = self.capture(lookup, "b", buffer=buffer)
+        self.capture(divide, 0, buffer=buffer)
+        self.capture(lookup, "c", buffer=buffer)
+
+        self.assertEqual(len(buffer.query(error_type=KeyError)), 2)
+        self.assertEqual(len(buffer.query(error_type="ZeroDivisionError")), 1)
+        self.assertEqual(len(buffer.query(function="divide")), 1)
+        self.assertEqual(len(buffer.query(fingerprint=key_error.fingerprint)), 2)
+        self.assertEqual(len(buffer.query(error_type=KeyError, limit=1)), 1)
+        self.assertEqual(buffer.query(since=key_error.timestamp + 3600), [])
+        self.assertEqual(len(buffer.query(until=key_error.timestamp + 3600)), 3)
+        self.assertEqual(buffer.latest().error, "'c'")
+
+    def test_stores_portable_copies(self):
+        buffer = SnapshotBuffer()
+        self.capture(divide, 0, buffer=buffer)
+        stored = buffer.latest()
+        self.assertEqual(stored.frames[-1].locals["resource"], "<Resource>")
+        self.assertIsNone(stored.frames[-1].code)
+
+    def test_conversion_deferred_to_first_read(self):
+        buffer = SnapshotBuffer()
+        CountingRepr.calls = 0
+        snapshot = self.capture(hold, CountingRepr(), buffer=buffer,
+                                limits=SnapshotLimits(keep_references=True))
+        # Adding stores the snapshot itself; nothing is converted on capture
+        self.assertEqual(CountingRepr.calls, 0)
+        self.assertIsNotNone(snapshot.frames[-1].code)
+
+        stored = buffer.latest()
+        calls = CountingRepr.calls
+        self.assertGreater(calls, 0)
+        self.assertEqual(stored.frames[-1].locals["held"], "<CountingRepr>")
+        self.assertIsNone(stored.frames[-1].code)
+        # Converted once
+        self.assertIs(buffer.query()[0], stored)
+        self.assertEqual(CountingRepr.calls, calls)
+
+    def test_rate_limited_snapshots_are_not_stored(self):
+        buffer = SnapshotBuffer()
+        limiter = RateLimiter(max_per_window=1, window=60)
+        for _ in range(3):
+            self.capture(lookup, "b", buffer=buffer, rate_limiter=limiter)
+        self.assertEqual(len(buffer), 1)
+
+    def test_decorators_and_log_exception_state(self):
+        buffer = SnapshotBuffer()
+
+        @traced(logger=self.logger, reraise=False, buffer=buffer)
+        def traced_lookup(key):
+            return lookup(key)
+
+        @traced_tool(logger=self.logger, buffer=buffer)
+        def tool_lookup(key):
+            return lookup(key)
+
+        traced_lookup("b")
+        tool_lookup("c")
+        try:
+            lookup("d")
+        except KeyError as e:
+            log_exception_state(e, self.logger, buffer=buffer)
+        self.assertEqual([s.error for s in buffer.query()], ["'d'", "'c'", "'b'"])
+
+    def test_concurrent_inserts(self):
+        buffer = SnapshotBuffer(max_snapshots=50)
+        snapshot = self.capture(lookup, "b")
+
+        def insert():
+            for _ in range(200):
+                buffer.add(snapshot)
+
+        threads = [threading.Thread(target=insert) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(len(buffer), 50)
+        self.assertEqual(buffer.evicted, 750)
+        self.assertEqual(buffer.total_bytes, 50 * SnapshotBuffer._cost(buffer.latest()))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,154 @@
+import unittest
+import logging
+from io import StringIO
+import sys
+from pathlib import Path
+
+# Add the src directory to the Python path if not already there
+src_path = Path(__file__).resolve().parent.parent / 'src'
+if str(src_path) not in sys.path:
+    sys.path.insert(0, str(src_path))
+
+from tracelight.core import CAUSE, CONTEXT, GROUP, capture_snapshot, log_exception_state
+from tracelight.jsonl import JsonLinesWriter, read_events
+
+
+def load_config(path):
+    raise FileNotFoundError(path)
+
+
+def start_service(path):
+    try:
+        load_config(path)
+    except FileNotFoundError as e:
+        raise RuntimeError("service failed to start") from e
+
+
+def cleanup_fails():
+    try:
+        {}["missing"]
+    except KeyError:
+        raise ValueError("cleanup failed")
+
+
+def process(item):
+    raise ValueError(f"bad item {item}")
+
+
+def process_batch(items):
+    errors = []
+    for item in items:
+        try:
+            process(item)
+        except ValueError as e:
+            errors.append(e)
+    raise ExceptionGroup("batch failed", errors)
+
+
+class TestChainedCapture(unittest.TestCase):
+    def setUp(self):
+        # Create a StringIO object to capture log output
+        self.log_output = StringIO()
+        self.handler = logging.StreamHandler(self.log_output)
+        self.logger = logging.getLogger("test_chained")
+        self.logger.addHandler(self.handler)
+        self.logger.setLevel(logging.DEBUG)
+
+    def tearDown(self):
+        self.logger.removeHandler(self.handler)
+        self.handler.close()
+
+    def test_cause_is_captured(self):
+        try:
+            start_service("/etc/app.toml")
+        except RuntimeError as e:
+            result = log_exception_state(e, self.logger)
+
+        self.assertEqual(len(result["exceptions"]), 1)
+        cause = result["exceptions"][0]
+        self.assertEqual((cause["parent"], cause["relation"]), (0, CAUSE))
+        self.assertEqual(cause["error_type"], "FileNotFoundError")
+        by_id = {frame["frame_id"]: frame
+                 for frame in result["frames"] + result["chained_frames"]}
+        functions = [by_id[frame_id]["function"] for frame_id in cause["frame_ids"]]
+        self.assertEqual(functions, ["start_service", "load_config"])
+        self.assertEqual(by_id[cause["frame_ids"][-1]]["locals"]["path"], "/etc/app.toml")
+        self.assertIn("-- Exception 1 (cause of exception 0): FileNotFoundError",
+                      self.log_output.getvalue())
+
+    def test_context_and_suppressed_context(self):
+        try:
+            cleanup_fails()
+        except ValueError as e:
+            snapshot = capture_snapshot(e)
+        self.assertEqual([(c.relation, c.error_type) for c in snapshot.related],
+                         [(CONTEXT, "KeyError")])
+
+        try:
+            try:
+                {}["missing"]
+            except KeyError:
+                raise ValueError("no context") from None
+        except ValueError as e:
+            snapshot = capture_snapshot(e)
+        self.assertEqual(snapshot.related, [])
+
+    def test_plain_exception_has_no_chain(self):
+        try:
+            load_config("x")
+        except FileNotFoundError as e:
+            result = log_exception_state(e, self.logger)
+        self.assertNotIn("exceptions", result)
+        self.assertEqual([frame["frame_id"] for frame in result["frames"]], [1, 2])
+
+    def test_cycles_in_chain_are_captured_once(self):
+        first = ValueError("first")
+        second = KeyError("second")
+        first.__context__ = second
+        second.__context__ = first
+        try:
+            raise first
+        except ValueError as e:
+            snapshot = capture_snapshot(e)
+        self.assertEqual([c.error_type for c in snapshot.related], ["KeyError"])
+
+    @unittest.skipIf(sys.version_info < (3, 11), "ExceptionGroup requires Python 3.11")
+    def test_exception_group_shares_frames(self):
+        try:
+            process_batch(range(50))
+        except ExceptionGroup as e:
+            result = log_exception_state(e, self.logger)
+
+        members = [c for c in result["exceptions"] if c["relation"] == GROUP]
+        self.assertEqual(len(members), 50)
+        # Every member's traceback starts in process_batch at the same line,
+        # which is stored once; each member only adds its own process frame
+        outer_ids = {member["frame_ids"][0] for member in members}
+        self.assertEqual(len(outer_ids), 1)
+        functions = [frame["function"] for frame in result["chained_frames"]]
+        self.assertEqual(functions.count("process_batch"), 1)
+        self.assertEqual(functions.count("process"), 50)
+
+
+class TestChainedJsonLines(unittest.TestCase):
+    def test_round_trip(self):
+        sink = StringIO()
+        try:
+            start_service("/etc/app.toml")
+        except RuntimeError as e:
+            JsonLinesWriter(sink).write_exception(e)
+
+        event = next(read_events(StringIO(sink.getvalue())))
+        self.assertEqual([f["function"] for f in event["frames"]],
+                         ["test_round_trip", "start_service"])
+        self.assertEqual(len(event["chained"]), 1)
+        chained = event["chained"][0]
+        self.assertEqual(chained["relation"], CAUSE)
+        frames = {f["frame_id"]: f for f in event["frames"] + event["chained_frames"]}
+        load_frame = frames[chained["frame_ids"][-1]]
+        self.assertEqual(load_frame["function"], "load_config")
+        self.assertEqual(load_frame["vars"]["path"]["value"], "/etc/app.toml")
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,3 +1,4 @@
+import asyncio
 import unittest
 import logging
 from io import StringIO
@@ -85,6 +86,30 @@ class TestLogExceptionState(unittest.TestCase):
         self.assertIn("...<truncated>", output)
         self.assertNotIn("x" * 60, output)  # Shouldn't have 60 consecutive x's
 
+    def test_batched_single_record(self):
+        # Test that batched mode emits the whole trace as one record
+        records = []
+        collector = logging.Handler()
+        collector.emit = records.append
+        self.logger.addHandler(collector)
+        try:
+            try:
+                x = 1
+                y = 0
+                z = x / y
+            except Exception as e:
+                result = log_exception_state(e, self.logger, batched=True)
+        finally:
+            self.logger.removeHandler(collector)
+
+        self.assertEqual(len(records), 1)
+        self.assertIs(records[0].error_data, result)
+        message = records[0].getMessage()
+        self.assertIn("Logging exception state for: ZeroDivisionError:", message)
+        self.assertIn("-- Frame 1:", message)
+        self.assertIn("x = 1", message)
+        self.assertIn("y = 0", message)
+
 
 class TestTracedError(unittest.TestCase):
     def setUp(self):
@@ -115,6 +140,23 @@ class TestTracedError(unittest.TestCase):
         self.assertIn("x = 10", output)
         self.assertIn("y = 0", output)
 
+    def test_as_async_context_manager(self):
+        # Test TracedError with async with
+
+        async def run():
+            async with TracedError(logger=self.logger):
+                x = 10
+                y = 0
+                await asyncio.sleep(0)
+                z = x / y
+
+        with self.assertRaises(ZeroDivisionError):
+            asyncio.run(run())
+
+        output = self.log_output.getvalue()
+        self.assertIn("ZeroDivisionError", output)
+        self.assertIn("x = 10", output)
+
 
 if __name__ == "__main__":
     unittest.main()
\ No newline at end of file
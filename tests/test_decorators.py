@@ -1,3 +1,5 @@
+import asyncio
+import inspect
 import unittest
 import logging
 from io import StringIO
@@ -68,6 +70,148 @@ class TestTracedDecorator(unittest.TestCase):
         self.assertEqual(documented_function.__doc__, "This function adds two numbers.")
         self.assertTrue(hasattr(documented_function, '__annotations__'))
 
+    def test_traced_async_error(self):
+        # Test that traced awaits coroutine functions and logs their errors
+
+        @traced(logger=self.logger)
+        async def failing_coroutine(x, y):
+            await asyncio.sleep(0)
+            return x / y
+
+        with self.assertRaises(ZeroDivisionError):
+            asyncio.run(failing_coroutine(5, 0))
+
+        output = self.log_output.getvalue()
+        self.assertIn("ZeroDivisionError", output)
+        self.assertIn("x = 5", output)
+        self.assertIn("y = 0", output)
+
+    def test_traced_async_success(self):
+        @traced(logger=self.logger, reraise=False)
+        async def successful_coroutine(x, y):
+            return x + y
+
+        self.assertTrue(asyncio.iscoroutinefunction(successful_coroutine))
+        self.assertEqual(asyncio.run(successful_coroutine(3, 4)), 7)
+        self.assertEqual(self.log_output.getvalue(), "")
+
+    def test_traced_generator_error_during_iteration(self):
+        @traced(logger=self.logger)
+        def parse(rows):
+            for row in rows:
+                value = int(row)
+                yield value
+
+        gen = parse(["1", "2", "x"])
+        self.assertTrue(inspect.isgeneratorfunction(parse))
+        self.assertEqual(self.log_output.getvalue(), "")
+        with self.assertRaises(ValueError):
+            list(gen)
+        output = self.log_output.getvalue()
+        self.assertIn("row = 'x'", output)
+        self.assertNotIn("failed on item", output)
+
+    def test_traced_generator_item_index_and_send(self):
+        @traced(logger=self.logger, item_index=True, reraise=False)
+        def accumulate():
+            total = 0
+            while True:
+                amount = yield total
+                total += amount
+
+        gen = accumulate()
+        self.assertEqual(next(gen), 0)
+        self.assertEqual(gen.send(5), 5)
+        self.assertEqual(gen.send(2), 7)
+        with self.assertRaises(StopIteration):
+            gen.send(None)  # total += None fails; not re-raised
+        output = self.log_output.getvalue()
+        self.assertIn("Generator", output)
+        self.assertIn("failed on item 3", output)
+        self.assertIn("total = 7", output)
+
+    def test_traced_generator_item_index_reaches_every_sink(self):
+        from tracelight import SnapshotBuffer
+        from tracelight.budget import summarize_snapshot
+        from tracelight.jsonl import JsonLinesWriter, read_events
+
+        buffer = SnapshotBuffer()
+        records = []
+        collector = logging.Handler()
+        collector.emit = records.append
+        self.logger.addHandler(collector)
+        self.addCleanup(self.logger.removeHandler, collector)
+
+        @traced(logger=self.logger, item_index=True, batched=True, buffer=buffer)
+        def parse(rows):
+            for row in rows:
+                yield int(row)
+
+        with self.assertRaises(ValueError):
+            list(parse(["1", "2", "x"]))
+        snapshot = buffer.latest()
+        self.assertEqual(snapshot.item_index, 2)
+        self.assertEqual(snapshot.portable().item_index, 2)
+        # The single batched record carries the index with the locals
+        self.assertEqual(len(records), 1)
+        output = records[0].getMessage()
+        self.assertIn("failed on item 2", output)
+        self.assertIn("row = 'x'", output)
+
+        sink = StringIO()
+        JsonLinesWriter(sink).write_snapshot(snapshot)
+        record = next(read_events(sink.getvalue().splitlines()))
+        self.assertEqual(record["item_index"], 2)
+        self.assertEqual(summarize_snapshot(snapshot, max_bytes=4000)["item_index"], 2)
+
+    def test_traced_generator_return_value_and_close(self):
+        closed = []
+
+        @traced(logger=self.logger, item_index=True)
+        def numbers():
+            try:
+                yield 1
+                yield 2
+            finally:
+                closed.append(True)
+            return "done"
+
+        def consume():
+            return (yield from numbers())
+
+        self.assertEqual(list(numbers()), [1, 2])
+        gen = consume()
+        next(gen)
+        next(gen)
+        with self.assertRaises(StopIteration) as ctx:
+            next(gen)
+        self.assertEqual(ctx.exception.value, "done")
+
+        gen = numbers()
+        next(gen)
+        gen.close()
+        self.assertEqual(closed, [True, True, True])
+        self.assertEqual(self.log_output.getvalue(), "")
+
+    def test_traced_async_generator(self):
+        @traced(logger=self.logger, item_index=True)
+        async def stream(rows):
+            for row in rows:
+                await asyncio.sleep(0)
+                yield 10 // row
+
+        async def collect(rows):
+            return [value async for value in stream(rows)]
+
+        self.assertTrue(inspect.isasyncgenfunction(stream))
+        self.assertEqual(asyncio.run(collect([1, 2])), [10, 5])
+        self.assertEqual(self.log_output.getvalue(), "")
+        with self.assertRaises(ZeroDivisionError):
+            asyncio.run(collect([1, 2, 0]))
+        output = self.log_output.getvalue()
+        self.assertIn("failed on item 2", output)
+        self.assertIn("row = 0", output)
+
 
 if __name__ == "__main__":
     unittest.main()
\ No newline at end of file
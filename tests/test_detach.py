@@ -0,0 +1,148 @@
+import dataclasses
+import unittest
+import logging
+from io import StringIO
+import sys
+from pathlib import Path
+
+# Add the src directory to the Python path if not already there
+src_path = Path(__file__).resolve().parent.parent / 'src'
+if str(src_path) not in sys.path:
+    sys.path.insert(0, str(src_path))
+
+from tracelight.core import capture_snapshot, log_exception_state, log_snapshot
+from tracelight.detach import OMITTED, ByteBudget, DetachedRepr, SnapshotLimits, detach
+
+
+@dataclasses.dataclass
+class Order:
+    order_id: int
+    items: list
+
+
+class Cart:
+    def __init__(self):
+        self.items = ["apple"]
+
+    def __repr__(self):
+        return f"Cart({self.items!r})"
+
+
+class TestDetach(unittest.TestCase):
+    def test_copies_do_not_alias(self):
+        original = {"items": [1, 2, {"nested": [3]}]}
+        copy = detach(original)
+        original["items"][2]["nested"].append(4)
+        original["items"].append(5)
+        self.assertEqual(copy, {"items": [1, 2, {"nested": [3]}]})
+
+    def test_item_and_string_limits(self):
+        limits = SnapshotLimits(max_items=3, max_string=5)
+        self.assertEqual(detach(list(range(10)), limits), [0, 1, 2, "...<7 more items>"])
+        self.assertEqual(detach({i: i for i in range(4)}, limits),
+                         {0: 0, 1: 1, 2: 2, "...": "<1 more items>"})
+        self.assertEqual(detach("abcdefgh", limits), "abcde...<3 more chars>")
+        self.assertEqual(detach(b"abcdefgh", limits), b"abcde...<3 more bytes>")
+
+    def test_depth_limit(self):
+        limits = SnapshotLimits(max_depth=2)
+        self.assertEqual(detach([[[1, 2, 3]]], limits), [["<list with 3 items>"]])
+
+    def test_byte_budget(self):
+        limits = SnapshotLimits(max_bytes=1024)
+        copy = detach(["x" * 200 for _ in range(10)], limits)
+        self.assertLess(len(copy), 10)
+        self.assertTrue(copy[-1].startswith("...<"))
+        self.assertEqual(detach("late", limits, budget=ByteBudget(0)), OMITTED)
+
+    def test_other_objects_converted(self):
+        cart = Cart()
+        copy = detach({"cart": cart, "order": Order(7, ["pear"])})
+        self.assertIsInstance(copy["cart"], DetachedRepr)
+        self.assertEqual(repr(copy["cart"]), "Cart(['apple'])")
+        self.assertEqual(copy["order"], {"order_id": 7, "items": ["pear"]})
+        self.assertEqual(detach((1, [2])), (1, [2]))
+
+        limited = detach(Cart(), SnapshotLimits(max_repr=6))
+        self.assertEqual(limited, "Cart([...<truncated>")
+
+    def test_keep_references_opt_in(self):
+        marker = object()
+        limits = SnapshotLimits(keep_references=True)
+        self.assertIs(detach(marker, limits), marker)
+        self.assertIs(detach([marker], limits)[0], marker)
+
+
+def mutate_after_failure(log):
+    data = {"rows": [1, 2, 3]}
+    try:
+        raise ValueError("bad rows")
+    except ValueError as e:
+        snapshot = capture_snapshot(e)
+    data["rows"].append(4)
+    log.append(snapshot)
+
+
+def mutate_objects_after_failure(log, limits=None):
+    order = Order(1, ["apple"])
+    cart = Cart()
+    try:
+        raise ValueError("bad order")
+    except ValueError as e:
+        snapshot = capture_snapshot(e, limits=limits)
+    order.items.append("pear")
+    order.order_id = 2
+    cart.items.append("pear")
+    log.append(snapshot)
+
+
+class TestDetachedCapture(unittest.TestCase):
+    def setUp(self):
+        # Create a StringIO object to capture log output
+        self.log_output = StringIO()
+        self.handler = logging.StreamHandler(self.log_output)
+        self.logger = logging.getLogger("test_detach")
+        self.logger.addHandler(self.handler)
+        self.logger.setLevel(logging.DEBUG)
+
+    def tearDown(self):
+        self.logger.removeHandler(self.handler)
+        self.handler.close()
+
+    def test_snapshot_ignores_later_mutation(self):
+        log = []
+        mutate_after_failure(log)
+        frame = log[0].frames[-1]
+        self.assertEqual(frame.locals["data"], {"rows": [1, 2, 3]})
+
+    def test_snapshot_ignores_later_object_mutation(self):
+        log = []
+        mutate_objects_after_failure(log)
+        result = log_snapshot(log[0], self.logger)
+        frame_locals = result["frames"][-1]["locals"]
+        self.assertEqual(frame_locals["order"], {"order_id": 1, "items": ["apple"]})
+        self.assertEqual(frame_locals["cart"], "Cart(['apple'])")
+        self.assertIn("cart = Cart(['apple'])", self.log_output.getvalue())
+
+    def test_keep_references_renders_later_state(self):
+        log = []
+        mutate_objects_after_failure(log, SnapshotLimits(keep_references=True))
+        result = log_snapshot(log[0], self.logger)
+        self.assertEqual(result["frames"][-1]["locals"]["cart"], "Cart(['apple', 'pear'])")
+
+    def test_limits_apply_to_error_data(self):
+        big = list(range(100000))
+        try:
+            raise RuntimeError("too big")
+        except RuntimeError as e:
+            result = log_exception_state(e, self.logger,
+                                         limits=SnapshotLimits(max_items=10))
+
+        stored = result["frames"][0]["locals"]["big"]
+        self.assertIsNot(stored, big)
+        self.assertEqual(len(stored), 11)
+        self.assertEqual(stored[-1], "...<99990 more items>")
+
+
+if __name__ == '__main__':
+    unittest.main()
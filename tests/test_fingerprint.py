@@ -0,0 +1,133 @@
+import unittest
+import logging
+import time
+from io import StringIO
+import sys
+from pathlib import Path
+
+# Add the src directory to the Python path if not already there
+src_path = Path(__file__).resolve().parent.parent / 'src'
+if str(src_path) not in sys.path:
+    sys.path.insert(0, str(src_path))
+
+from tracelight.core import log_exception_state
+from tracelight.fingerprint import RateLimiter, exception_fingerprint
+
+
+def fail(message):
+    raise ValueError(message)
+
+
+def fail_elsewhere(message):
+    raise ValueError(message)
+
+
+def catch(func, message="boom"):
+    try:
+        func(message)
+    except ValueError as e:
+        return e
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class TestFingerprint(unittest.TestCase):
+    def test_same_site_same_fingerprint(self):
+        # The message is not part of the fingerprint, the call site is
+        self.assertEqual(exception_fingerprint(catch(fail, "id=1")),
+                         exception_fingerprint(catch(fail, "id=2")))
+        self.assertNotEqual(exception_fingerprint(catch(fail)),
+                            exception_fingerprint(catch(fail_elsewhere)))
+
+    def test_rate_limiter_window(self):
+        clock = FakeClock()
+        limiter = RateLimiter(max_per_window=2, window=10, clock=clock)
+        self.assertEqual([limiter.allow("fp") for _ in range(4)], [True, True, False, False])
+        self.assertTrue(limiter.allow("other"))
+        self.assertEqual(limiter.suppressed("fp"), 2)
+
+        clock.now = 11
+        self.assertTrue(limiter.allow("fp"))
+        self.assertEqual(limiter.collect_report(force=True), {"fp": ("", 2)})
+        self.assertEqual(limiter.collect_report(force=True), {})
+
+
+class TestRateLimitedCapture(unittest.TestCase):
+    def setUp(self):
+        # Create a StringIO object to capture log output
+        self.log_output = StringIO()
+        self.handler = logging.StreamHandler(self.log_output)
+        self.logger = logging.getLogger("test_fingerprint")
+        self.logger.addHandler(self.handler)
+        self.logger.setLevel(logging.DEBUG)
+
+    def tearDown(self):
+        self.logger.removeHandler(self.handler)
+        self.handler.close()
+
+    def test_suppressed_capture_and_report(self):
+        clock = FakeClock()
+        limiter = RateLimiter(max_per_window=1, window=60, report_interval=30, clock=clock)
+
+        results = [log_exception_state(catch(fail), self.logger, rate_limiter=limiter)
+                   for _ in range(3)]
+        self.assertGreater(len(results[0]["frames"]), 0)
+        self.assertNotIn("suppressed", results[0])
+        for result in results[1:]:
+            self.assertTrue(result["suppressed"])
+            self.assertEqual(result["frames"], [])
+            self.assertEqual(result["fingerprint"], results[0]["fingerprint"])
+
+        output = self.log_output.getvalue()
+        self.assertEqual(output.count("Logging exception state for"), 1)
+        self.assertEqual(output.count("Suppressed repeated exception ValueError in fail"), 2)
+
+        # The next capture after the report interval logs the suppressed count,
+        # including itself since the window has not ended yet
+        clock.now = 31
+        log_exception_state(catch(fail), self.logger, rate_limiter=limiter)
+        self.assertIn("Suppressed 3 occurrences of ValueError in fail", self.log_output.getvalue())
+
+    def test_flush_reports_without_another_exception(self):
+        clock = FakeClock()
+        limiter = RateLimiter(max_per_window=1, report_interval=30, clock=clock)
+        for _ in range(3):
+            log_exception_state(catch(fail), self.logger, rate_limiter=limiter)
+
+        report = limiter.flush(self.logger)
+        self.assertEqual([count for _, count in report.values()], [2])
+        self.assertIn("Suppressed 2 occurrences of ValueError in fail", self.log_output.getvalue())
+        self.assertEqual(limiter.flush(self.logger), {})
+
+    def test_reporting_thread(self):
+        limiter = RateLimiter(max_per_window=0, report_interval=0.01, summarize=False)
+        limiter.start_reporting(self.logger)
+        self.addCleanup(limiter.stop_reporting)
+        log_exception_state(catch(fail), self.logger, rate_limiter=limiter)
+        for _ in range(200):
+            if "Suppressed 1 occurrences" in self.log_output.getvalue():
+                break
+            time.sleep(0.01)
+        self.assertIn("Suppressed 1 occurrences of ValueError in fail", self.log_output.getvalue())
+
+        # Stopping logs what is left
+        limiter.report_interval = 60
+        log_exception_state(catch(fail), self.logger, rate_limiter=limiter)
+        limiter.stop_reporting()
+        self.assertEqual(self.log_output.getvalue().count("Suppressed 1 occurrences"), 2)
+
+    def test_silent_suppression(self):
+        limiter = RateLimiter(max_per_window=0, summarize=False)
+        result = log_exception_state(catch(fail), self.logger, rate_limiter=limiter)
+        self.assertTrue(result["suppressed"])
+        self.assertEqual(self.log_output.getvalue(), "")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,109 @@
+import unittest
+import json
+import pickle
+import traceback
+from unittest import mock
+import sys
+from pathlib import Path
+
+# Add the src directory to the Python path if not already there
+src_path = Path(__file__).resolve().parent.parent / 'src'
+if str(src_path) not in sys.path:
+    sys.path.insert(0, str(src_path))
+
+from tracelight.agent_utils import traced_tool
+from tracelight.core import capture_snapshot
+from tracelight.formatting import format_traceback
+
+
+def inner(value):
+    return 10 / value
+
+
+def outer(value):
+    return inner(value)
+
+
+def wrap(value):
+    try:
+        outer(value)
+    except ZeroDivisionError as e:
+        raise ValueError("wrap failed") from e
+
+
+class Errors:
+    class ParseError(Exception):
+        pass
+
+
+def parse(text):
+    try:
+        return json.loads(text)
+    except json.JSONDecodeError as e:
+        raise Errors.ParseError("bad document") from e
+
+
+def without_carets(text):
+    # Python 3.11+ adds ^^^ position markers, which need column data
+    return [line for line in text.splitlines() if line.strip().strip("^~")]
+
+
+class TestFormatTraceback(unittest.TestCase):
+    def test_matches_stdlib(self):
+        try:
+            outer(0)
+        except ZeroDivisionError as e:
+            expected = "".join(traceback.format_exception(type(e), e, e.__traceback__))
+            text = format_traceback(capture_snapshot(e))
+        self.assertEqual(without_carets(text), without_carets(expected))
+
+    def test_chained_matches_stdlib(self):
+        try:
+            wrap(0)
+        except ValueError as e:
+            expected = "".join(traceback.format_exception(type(e), e, e.__traceback__))
+            text = format_traceback(capture_snapshot(e))
+        self.assertEqual(without_carets(text), without_carets(expected))
+        self.assertIn("The above exception was the direct cause", text)
+
+    def test_module_qualified_types_match_stdlib(self):
+        try:
+            parse("{")
+        except Errors.ParseError as e:
+            expected = "".join(traceback.format_exception(type(e), e, e.__traceback__))
+            snapshot = capture_snapshot(e)
+        text = format_traceback(snapshot)
+        self.assertEqual(without_carets(text), without_carets(expected))
+        self.assertIn("\njson.decoder.JSONDecodeError: Expecting", text)
+        self.assertTrue(text.endswith(f"{__name__}.Errors.ParseError: bad document\n"))
+        self.assertEqual(snapshot.error_type, "ParseError")
+        # Kept by pickling
+        self.assertEqual(format_traceback(pickle.loads(pickle.dumps(snapshot))).splitlines()[-1],
+                         text.splitlines()[-1])
+
+    def test_skipped_frames(self):
+        try:
+            outer(0)
+        except ZeroDivisionError as e:
+            snapshot = capture_snapshot(e)
+            # As if a FrameFilter had dropped the middle frame
+            snapshot.frames = [snapshot.frames[0], snapshot.frames[2]]
+        text = format_traceback(snapshot)
+        self.assertIn("[... 1 frames skipped ...]", text)
+        self.assertNotIn("in outer", text)
+        self.assertTrue(text.endswith("ZeroDivisionError: division by zero\n"))
+
+    def test_traced_tool_walks_traceback_once(self):
+        @traced_tool()
+        def failing_tool(value):
+            return outer(value)
+
+        with mock.patch.object(traceback, "format_exception",
+                               side_effect=AssertionError("second walk")):
+            result = failing_tool(0)
+        self.assertEqual(result["status"], "error")
+        self.assertIn('in inner\n    return 10 / value\n', result["traceback"])
+
+
+if __name__ == '__main__':
+    unittest.main()
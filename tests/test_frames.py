@@ -0,0 +1,105 @@
+import unittest
+import json
+import logging
+from io import StringIO
+import sys
+from pathlib import Path
+
+# Add the src directory to the Python path if not already there
+src_path = Path(__file__).resolve().parent.parent / 'src'
+if str(src_path) not in sys.path:
+    sys.path.insert(0, str(src_path))
+
+from tracelight.core import log_exception_state
+from tracelight.frames import FULL, METADATA, SKIP, FrameFilter, is_library_file
+
+
+def parse(payload):
+    document = json.loads(payload)
+    return document
+
+
+def level_three(value):
+    return 1 / value
+
+
+def level_two(value):
+    return level_three(value)
+
+
+def level_one(value):
+    return level_two(value)
+
+
+class TestFrameFilter(unittest.TestCase):
+    def test_library_detection(self):
+        self.assertTrue(is_library_file(json.decoder.__file__))
+        self.assertFalse(is_library_file(__file__))
+
+    def test_rules_by_module_and_path(self):
+        code = parse.__code__
+        self.assertEqual(FrameFilter(exclude=[__name__]).classify(code, __name__), SKIP)
+        self.assertEqual(FrameFilter(include=[str(Path(__file__).parent) + "/"])
+                         .classify(code, __name__), FULL)
+        self.assertEqual(FrameFilter(include=["somewhere.else"]).classify(code, __name__), SKIP)
+        self.assertEqual(FrameFilter(library_metadata_only=True)
+                         .classify(json.loads.__code__, "json"), METADATA)
+
+    def test_classification_is_cached_per_code_object(self):
+        frame_filter = FrameFilter(exclude=["json"])
+        self.assertEqual(frame_filter.classify(json.loads.__code__, "json"), SKIP)
+        # The module is not consulted again for a code object already seen
+        self.assertEqual(frame_filter.classify(json.loads.__code__, "other"), SKIP)
+
+    def test_depth_limits(self):
+        frame_filter = FrameFilter(innermost=2, outermost=1)
+        classes = frame_filter.apply_depth_limits([FULL, FULL, SKIP, FULL, FULL, FULL])
+        self.assertEqual(classes, [FULL, METADATA, SKIP, METADATA, FULL, FULL])
+
+
+class TestFilteredCapture(unittest.TestCase):
+    def setUp(self):
+        # Create a StringIO object to capture log output
+        self.log_output = StringIO()
+        self.handler = logging.StreamHandler(self.log_output)
+        self.logger = logging.getLogger("test_frames")
+        self.logger.addHandler(self.handler)
+        self.logger.setLevel(logging.DEBUG)
+
+    def tearDown(self):
+        self.logger.removeHandler(self.handler)
+        self.handler.close()
+
+    def test_library_frames_get_metadata_only(self):
+        try:
+            parse("{not json")
+        except ValueError as e:
+            result = log_exception_state(
+                e, self.logger, frame_filter=FrameFilter(library_metadata_only=True))
+
+        by_function = {frame["function"]: frame for frame in result["frames"]}
+        self.assertEqual(by_function["parse"]["locals"], {"payload": "{not json"})
+        library_frames = [frame for frame in result["frames"] if "json" in frame["file"]]
+        self.assertTrue(library_frames)
+        for frame in library_frames:
+            self.assertTrue(frame["locals_omitted"])
+            self.assertEqual(frame["locals"], {})
+        self.assertIn("(locals omitted)", self.log_output.getvalue())
+
+    def test_innermost_frames_keep_locals(self):
+        try:
+            level_one(0)
+        except ZeroDivisionError as e:
+            result = log_exception_state(e, self.logger, frame_filter=FrameFilter(innermost=1))
+
+        omitted = {frame["function"]: frame.get("locals_omitted", False)
+                   for frame in result["frames"]}
+        self.assertEqual(omitted, {"test_innermost_frames_keep_locals": True,
+                                   "level_one": True, "level_two": True,
+                                   "level_three": False})
+        # Frame numbers keep their position in the traceback
+        self.assertEqual([frame["frame_number"] for frame in result["frames"]], [1, 2, 3, 4])
+
+
+if __name__ == "__main__":
+    unittest.main()
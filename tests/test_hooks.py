@@ -0,0 +1,136 @@
+import unittest
+import asyncio
+import logging
+import sys
+import threading
+from io import StringIO
+from pathlib import Path
+
+# Add the src directory to the Python path if not already there
+src_path = Path(__file__).resolve().parent.parent / 'src'
+if str(src_path) not in sys.path:
+    sys.path.insert(0, str(src_path))
+
+import tracelight
+from tracelight import SnapshotBuffer, traced
+from tracelight.core import is_captured
+
+
+def fail(value):
+    doubled = value * 2
+    raise ValueError(f"bad value {value}")
+
+
+class Reentrant(logging.Handler):
+    """Handler that reports an exception to sys.excepthook while emitting."""
+
+    def emit(self, record):
+        try:
+            raise RuntimeError("handler failure")
+        except RuntimeError as e:
+            sys.excepthook(type(e), e, e.__traceback__)
+
+
+class TestInstall(unittest.TestCase):
+    def setUp(self):
+        self.log_stream = StringIO()
+        self.logger = logging.getLogger("test_hooks")
+        self.logger.setLevel(logging.DEBUG)
+        self.logger.handlers[:] = [logging.StreamHandler(self.log_stream)]
+        self.logger.propagate = False
+        self.buffer = SnapshotBuffer()
+        self.hooks = tracelight.install(self.logger, chain=False, buffer=self.buffer)
+        self.addCleanup(tracelight.uninstall)
+
+    def raise_and_hook(self, value=1):
+        try:
+            fail(value)
+        except ValueError as e:
+            sys.excepthook(type(e), e, e.__traceback__)
+            return e
+
+    def test_excepthook(self):
+        exc = self.raise_and_hook(21)
+        output = self.log_stream.getvalue()
+        self.assertIn("Unhandled exception in main thread", output)
+        self.assertIn("doubled = 42", output)
+        self.assertTrue(is_captured(exc))
+        self.assertEqual(len(self.buffer), 1)
+
+    def test_threading_hook(self):
+        thread = threading.Thread(target=fail, args=(3,), name="worker-1")
+        thread.start()
+        thread.join()
+        output = self.log_stream.getvalue()
+        self.assertIn("Unhandled exception in thread 'worker-1'", output)
+        self.assertIn("doubled = 6", output)
+
+    def test_unraisable_hook(self):
+        class Leaky:
+            def __del__(self):
+                fail(5)
+
+        leaky = Leaky()
+        del leaky
+        output = self.log_stream.getvalue()
+        self.assertIn("Unhandled exception in Exception ignored in: <", output)
+        self.assertIn("doubled = 10", output)
+
+    def test_asyncio_handler(self):
+        async def main():
+            tracelight.install(self.logger, chain=False)
+            loop = asyncio.get_running_loop()
+            try:
+                fail(7)
+            except ValueError as e:
+                loop.call_exception_handler({"message": "Task exception was never retrieved",
+                                             "exception": e})
+
+        asyncio.run(main())
+        output = self.log_stream.getvalue()
+        self.assertIn("event loop: Task exception was never retrieved", output)
+        self.assertIn("doubled = 14", output)
+
+    def test_no_double_capture(self):
+        @traced(logger=self.logger)
+        def decorated():
+            fail(2)
+
+        try:
+            decorated()
+        except ValueError as e:
+            sys.excepthook(type(e), e, e.__traceback__)
+        output = self.log_stream.getvalue()
+        self.assertEqual(output.count("Logging exception state for"), 1)
+        self.assertNotIn("Unhandled exception", output)
+
+    def test_reentrancy(self):
+        self.logger.addHandler(Reentrant())
+        self.raise_and_hook()
+        output = self.log_stream.getvalue()
+        self.assertEqual(output.count("Unhandled exception in"), 1)
+        self.assertNotIn("handler failure", output)
+
+    def test_chain_and_uninstall(self):
+        calls = []
+        tracelight.uninstall()
+        previous_threading, previous_unraisable = threading.excepthook, sys.unraisablehook
+        previous = sys.excepthook
+        sys.excepthook = lambda *args: calls.append(args[1])
+        try:
+            tracelight.install(self.logger)
+            exc = self.raise_and_hook()
+            self.assertEqual(calls, [exc])
+            tracelight.uninstall()
+            self.assertEqual(len(calls), 1)
+            self.assertIsNot(sys.excepthook, previous)
+            sys.excepthook(ValueError, exc, None)
+            self.assertEqual(len(calls), 2)
+        finally:
+            sys.excepthook = previous
+        self.assertIs(threading.excepthook, previous_threading)
+        self.assertIs(sys.unraisablehook, previous_unraisable)
+
+
+if __name__ == "__main__":
+    unittest.main()
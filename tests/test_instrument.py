@@ -0,0 +1,158 @@
+import unittest
+import asyncio
+import inspect
+import logging
+import sys
+import types
+from io import StringIO
+from pathlib import Path
+
+# Add the src directory to the Python path if not already there
+src_path = Path(__file__).resolve().parent.parent / 'src'
+if str(src_path) not in sys.path:
+    sys.path.insert(0, str(src_path))
+
+from tracelight import trace_class, trace_module, traced
+
+
+MODULE_SOURCE = '''
+from os.path import join
+
+def parse(text, *, base=10):
+    number = int(text, base)
+    return number
+
+def _helper(x):
+    return 1 / x
+
+class Job:
+    def run(self, size):
+        items = list(range(size))
+        return items[size]
+'''
+
+
+class TestInstrument(unittest.TestCase):
+    def setUp(self):
+        self.log_stream = StringIO()
+        self.logger = logging.getLogger("test_instrument")
+        self.logger.setLevel(logging.DEBUG)
+        self.logger.handlers[:] = [logging.StreamHandler(self.log_stream)]
+        self.logger.propagate = False
+
+    def test_trace_class(self):
+        class Service:
+            def __init__(self, rate):
+                self.rate = rate
+
+            def charge(self, amount, currency="EUR", *extra, fee=0, **meta):
+                total = amount * self.rate + fee
+                return total / 0
+
+            @staticmethod
+            def check(value):
+                return 1 / value
+
+            @classmethod
+            def build(cls, rate):
+                return cls(rate)
+
+            async def fetch(self, key):
+                raise KeyError(key)
+
+            def skip_me(self):
+                raise ValueError("not traced")
+
+            @property
+            def name(self):
+                return "service"
+
+        trace_class(Service, exclude=["skip_*"], logger=self.logger, specialize=True)
+        service = Service.build(2)
+        self.assertIsInstance(service, Service)
+        self.assertEqual(service.name, "service")
+        self.assertEqual(Service.charge.__name__, "charge")
+        self.assertEqual(inspect.signature(Service.charge),
+                         inspect.signature(Service.charge.__wrapped__))
+        self.assertEqual(Service.charge.__code__.co_varnames[:2], ("self", "amount"))
+
+        with self.assertRaises(ZeroDivisionError):
+            service.charge(10, "USD", "a", fee=1, note="x")
+        self.assertIn("total = 21", self.log_stream.getvalue())
+        with self.assertRaises(ZeroDivisionError):
+            Service.check(0)
+        self.assertIn("value = 0", self.log_stream.getvalue())
+        with self.assertRaises(KeyError):
+            asyncio.run(service.fetch("k"))
+        self.assertIn("key = 'k'", self.log_stream.getvalue())
+
+        self.log_stream.seek(0)
+        self.log_stream.truncate()
+        with self.assertRaises(ValueError):
+            service.skip_me()
+        self.assertFalse(hasattr(Service.__init__, "__wrapped__"))
+        self.assertEqual(self.log_stream.getvalue(), "")
+
+    def test_include_dunders_and_no_double_wrapping(self):
+        @trace_class(include=["__init__", "run"], logger=self.logger)
+        class Task:
+            def __init__(self, size):
+                self.size = 10 // size
+
+            @traced(logger=self.logger)
+            def run(self):
+                raise RuntimeError("once")
+
+        with self.assertRaises(ZeroDivisionError):
+            Task(0)
+        self.assertIn("size = 0", self.log_stream.getvalue())
+        self.assertEqual(Task.run.__wrapped__.__name__, "run")
+        self.assertFalse(hasattr(Task.run.__wrapped__, "__wrapped__"))
+
+    def test_trace_module(self):
+        module = types.ModuleType("instrumented_example")
+        exec(MODULE_SOURCE, module.__dict__)
+        names = trace_module(module, exclude=["_*"], logger=self.logger)
+        self.assertEqual(sorted(names), ["Job", "parse"])
+        self.assertFalse(hasattr(module.join, "__tracelight_traced__"))
+        self.assertFalse(hasattr(module._helper, "__wrapped__"))
+
+        self.assertEqual(module.parse("ff", base=16), 255)
+        with self.assertRaises(ValueError):
+            module.parse("zz")
+        self.assertIn("text = 'zz'", self.log_stream.getvalue())
+        with self.assertRaises(IndexError):
+            module.Job().run(3)
+        self.assertIn("items = [0, 1, 2]", self.log_stream.getvalue())
+
+    def test_invalid_arguments_captured_by_default(self):
+        @traced(logger=self.logger, reraise=False)
+        def pair(a, b):
+            return a, b
+
+        self.assertIsNone(pair(1))
+        self.assertIn("TypeError", self.log_stream.getvalue())
+
+    def test_specialized_wrapper_keeps_call_semantics(self):
+        @traced(logger=self.logger, specialize=True)
+        def positional(a, b=2, /, c=3):
+            return a, b, c
+
+        self.assertEqual(positional(1), (1, 2, 3))
+        self.assertEqual(positional(1, 5, c=6), (1, 5, 6))
+        with self.assertRaises(TypeError):
+            positional(a=1)
+
+        @traced(logger=self.logger, specialize=True)
+        def keyword_only(*, flag=False):
+            return flag
+
+        self.assertTrue(keyword_only(flag=True))
+        with self.assertRaises(TypeError):
+            keyword_only(True)
+        # Argument errors are raised by the wrapper itself, before any capture
+        self.assertEqual(self.log_stream.getvalue(), "")
+
+
+if __name__ == "__main__":
+    unittest.main()
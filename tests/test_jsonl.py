@@ -0,0 +1,83 @@
+import unittest
+import json
+import math
+from io import StringIO
+import sys
+from pathlib import Path
+
+# Add the src directory to the Python path if not already there
+src_path = Path(__file__).resolve().parent.parent / 'src'
+if str(src_path) not in sys.path:
+    sys.path.insert(0, str(src_path))
+
+from tracelight.jsonl import SCHEMA_VERSION, JsonLinesWriter, read_events
+
+
+class Opaque:
+    def __repr__(self):
+        return "<Opaque>"
+
+
+def failing_function(records):
+    count = len(records)
+    opaque = Opaque()
+    ratio = math.nan
+    nested = {"ok": [1, 2], "bad": Opaque()}
+    big = list(range(100000))
+    raise KeyError("users")
+
+
+class TestJsonLinesWriter(unittest.TestCase):
+    def write(self, **options):
+        sink = StringIO()
+        writer = JsonLinesWriter(sink, max_var_length=200, **options)
+        try:
+            failing_function([{"id": 1}])
+        except KeyError as e:
+            event = writer.write_exception(e)
+        return event, sink.getvalue()
+
+    def test_every_line_is_json(self):
+        event, output = self.write()
+        lines = output.splitlines()
+        records = [json.loads(line) for line in lines]
+        self.assertEqual(records[0]["kind"], "exception")
+        self.assertEqual(records[0]["schema"], SCHEMA_VERSION)
+        self.assertEqual(records[0]["error_type"], "KeyError")
+        self.assertEqual(records[-1], {"kind": "end", "event": event})
+        self.assertTrue(all(record["event"] == event for record in records))
+
+    def test_values_fall_back_to_repr(self):
+        _, output = self.write()
+        events = list(read_events(StringIO(output)))
+        self.assertEqual(len(events), 1)
+        frame = events[0]["frames"][-1]
+        self.assertEqual(frame["function"], "failing_function")
+        variables = frame["vars"]
+        self.assertEqual(variables["records"]["value"], [{"id": 1}])
+        self.assertEqual(variables["count"]["value"], 1)
+        self.assertEqual(variables["opaque"]["repr"], "<Opaque>")
+        # NaN and nested unencodable values are not valid JSON values
+        self.assertEqual(variables["ratio"]["repr"], "nan")
+        self.assertIn("<Opaque>", variables["nested"]["repr"])
+        # Large values are cut at max_var_length
+        self.assertTrue(variables["big"]["truncated"])
+        self.assertEqual(len(variables["big"]["repr"]), 200)
+
+    def test_interleaved_events_are_separated(self):
+        _, first = self.write()
+        _, second = self.write()
+        first_lines = first.splitlines()
+        second_lines = second.splitlines()
+        mixed = [line for pair in zip(first_lines, second_lines) for line in pair]
+        mixed += first_lines[len(second_lines):] + second_lines[len(first_lines):]
+        events = list(read_events(mixed))
+        self.assertEqual(len(events), 2)
+        self.assertNotEqual(events[0]["event"], events[1]["event"])
+        for event in events:
+            self.assertEqual([frame["function"] for frame in event["frames"]],
+                             ["write", "failing_function"])
+
+
+if __name__ == "__main__":
+    unittest.main()
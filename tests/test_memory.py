@@ -0,0 +1,150 @@
+import unittest
+import asyncio
+import gc
+import logging
+import sys
+import weakref
+from pathlib import Path
+
+# Add the src directory to the Python path if not already there
+src_path = Path(__file__).resolve().parent.parent / 'src'
+if str(src_path) not in sys.path:
+    sys.path.insert(0, str(src_path))
+
+from tracelight.core import capture_snapshot, clear_exception_frames
+from tracelight.decorators import traced
+
+FAILURES = 3000
+
+
+def failing_with_cycle():
+    payload = bytearray(4096)
+    try:
+        raise ValueError("boom")
+    except ValueError as e:
+        # Keeping the exception in a local creates an exception -> traceback
+        # -> frame -> exception cycle, which refcounting alone cannot free
+        error = e
+        raise
+
+
+class Payload:
+    pass
+
+
+async def failing_tool(payload):
+    await asyncio.sleep(0)
+    raise ValueError("tool failed")
+
+
+def make_logger():
+    logger = logging.getLogger("test_memory")
+    logger.addHandler(logging.NullHandler())
+    logger.propagate = False
+    logger.setLevel(logging.CRITICAL)
+    return logger
+
+
+def retained_growth(func, iterations, warmup=100):
+    """Memory blocks still allocated after `iterations` calls, with the cyclic GC off."""
+    for _ in range(warmup):
+        func()
+    gc.collect()
+    gc.disable()
+    try:
+        before = sys.getallocatedblocks()
+        for _ in range(iterations):
+            func()
+        after = sys.getallocatedblocks()
+    finally:
+        gc.enable()
+        gc.collect()
+    return after - before
+
+
+class TestReleaseFrames(unittest.TestCase):
+    def test_clear_exception_frames(self):
+        try:
+            failing_with_cycle()
+        except ValueError as e:
+            caught = e
+        clear_exception_frames(caught)
+        frame = caught.__traceback__.tb_next.tb_frame
+        self.assertEqual(frame.f_locals, {})
+        # The traceback itself is intact
+        self.assertEqual(frame.f_code.co_name, "failing_with_cycle")
+
+    def test_suspended_generator_survives(self):
+        def worker():
+            errors = []
+            while True:
+                try:
+                    raise ValueError("handled")
+                except ValueError as e:
+                    errors.append(e)
+                value = yield errors[-1]
+                errors.append(value)
+
+        gen = worker()
+        error = next(gen)
+        clear_exception_frames(error)
+        # The generator is still suspended at its yield, not finalized
+        self.assertIsInstance(gen.send(1), ValueError)
+
+    def test_finished_coroutine_is_cleared(self):
+        payload = Payload()
+        ref = weakref.ref(payload)
+        try:
+            asyncio.run(failing_tool(payload))
+        except ValueError as e:
+            caught = e
+        del payload
+        clear_exception_frames(caught)
+        tb = caught.__traceback__
+        while tb.tb_next is not None:
+            tb = tb.tb_next
+        frame = tb.tb_frame
+        self.assertEqual(frame.f_code.co_name, "failing_tool")
+        self.assertEqual(frame.f_locals, {})
+        self.assertIsNone(ref())
+
+    def test_traced_async_releases_frames(self):
+        logger = make_logger()
+        tool = traced(logger=logger, reraise=False, batched=True,
+                      release_frames=True)(failing_tool)
+        payload = Payload()
+        ref = weakref.ref(payload)
+        gc.disable()
+        try:
+            asyncio.run(tool(payload))
+            del payload
+            # Freed by reference counting alone
+            self.assertIsNone(ref())
+        finally:
+            gc.enable()
+
+    def test_snapshot_taken_before_release(self):
+        try:
+            failing_with_cycle()
+        except ValueError as e:
+            snapshot = capture_snapshot(e, release_frames=True)
+        self.assertIn("payload", snapshot.frames[-1].locals)
+
+    def test_cycles_accumulate_without_release(self):
+        # Control: shows the measurement detects leaked frames
+        logger = make_logger()
+        func = traced(logger=logger, reraise=False, batched=True)(failing_with_cycle)
+        self.assertGreater(retained_growth(func, 1000, warmup=10), 10 * 1000)
+
+    def test_retained_heap_stays_flat(self):
+        logger = make_logger()
+        func = traced(logger=logger, reraise=False, batched=True,
+                      release_frames=True)(failing_with_cycle)
+        growth = retained_growth(func, FAILURES)
+        # A leaked failure costs dozens of blocks (see the control above);
+        # allow well under one block per failure
+        self.assertLess(growth, FAILURES // 10)
+
+
+if __name__ == '__main__':
+    unittest.main()
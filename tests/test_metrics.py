@@ -0,0 +1,123 @@
+import unittest
+import logging
+import os
+import tempfile
+import threading
+from io import StringIO
+import sys
+from pathlib import Path
+
+# Add the src directory to the Python path if not already there
+src_path = Path(__file__).resolve().parent.parent / 'src'
+if str(src_path) not in sys.path:
+    sys.path.insert(0, str(src_path))
+
+from tracelight.background import BackgroundEmitter
+from tracelight.core import log_exception_state
+from tracelight.fingerprint import RateLimiter
+from tracelight.metrics import Histogram, export_prometheus, metrics, stats
+from tracelight.serializers import SerializerRegistry
+
+
+class Broken:
+    pass
+
+
+def failing(payload):
+    marker = "x"
+    raise ValueError("failed")
+
+
+class TestMetrics(unittest.TestCase):
+    def setUp(self):
+        # Create a StringIO object to capture log output
+        self.log_output = StringIO()
+        self.handler = logging.StreamHandler(self.log_output)
+        self.logger = logging.getLogger("test_metrics")
+        self.logger.addHandler(self.handler)
+        self.logger.setLevel(logging.DEBUG)
+        metrics.reset()
+
+    def tearDown(self):
+        self.logger.removeHandler(self.handler)
+        self.handler.close()
+        metrics.enabled = True
+        metrics.reset()
+
+    def log_failure(self, payload, **options):
+        try:
+            failing(payload)
+        except ValueError as e:
+            return log_exception_state(e, self.logger, **options)
+
+    def test_capture_and_render_counts(self):
+        self.log_failure("y" * 50, max_var_length=10)
+        current = stats()
+        self.assertEqual(current["captures"], 1)
+        self.assertEqual(current["renders"], 1)
+        self.assertEqual(current["frames_captured"], 2)
+        variables = current["variables_captured"]
+        self.assertGreaterEqual(variables, 4)
+        self.assertEqual(current["variables_per_capture"]["count"], 1)
+        # The payload (and the test's own long locals) were truncated
+        self.assertGreaterEqual(current["truncations"], 1)
+        self.assertGreater(current["rendered_bytes"], 0)
+        self.assertGreater(current["capture_seconds"]["sum"], 0)
+
+    def test_serializer_failures_and_suppressed(self):
+        registry = SerializerRegistry()
+        registry.register(Broken, lambda value: 1 / 0)
+        self.log_failure(Broken(), serializers=registry)
+        # The payload is a local of both frames
+        self.assertEqual(stats()["serializer_failures"], 2)
+
+        limiter = RateLimiter(max_per_window=1)
+        for _ in range(3):
+            self.log_failure(None, rate_limiter=limiter)
+        self.assertEqual(stats()["suppressed"], 2)
+
+    def test_emitter_drops(self):
+        emitter = BackgroundEmitter(maxsize=1)
+        gate = threading.Event()
+        emitter.submit(gate.wait)
+        emitter.flush(0.05)
+        for _ in range(5):
+            emitter.submit(len, "")
+        gate.set()
+        emitter.shutdown(1.0)
+        self.assertEqual(stats()["emitter_dropped"], emitter.dropped)
+        self.assertGreater(emitter.dropped, 0)
+
+    def test_prometheus_export(self):
+        self.log_failure(1)
+        text = export_prometheus()
+        self.assertIn("# TYPE tracelight_captures_total counter\ntracelight_captures_total 1\n", text)
+        self.assertIn('tracelight_capture_seconds_bucket{le="+Inf"} 1\n', text)
+        self.assertIn("tracelight_capture_seconds_count 1\n", text)
+
+        received = []
+        export_prometheus(received.append)
+        self.assertEqual(received, [text])
+
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "tracelight.prom")
+            export_prometheus(path)
+            with open(path) as exported:
+                self.assertEqual(exported.read(), text)
+            self.assertEqual(os.listdir(directory), ["tracelight.prom"])
+
+    def test_disabled(self):
+        metrics.enabled = False
+        self.log_failure(1)
+        self.assertEqual(stats()["captures"], 0)
+
+    def test_histogram_buckets(self):
+        histogram = Histogram((1, 5))
+        for value in (0.5, 1, 3, 10):
+            histogram.observe(value)
+        self.assertEqual(histogram.cumulative(), [("1", 2), ("5", 3), ("+Inf", 4)])
+        self.assertEqual(histogram.sum, 14.5)
+
+
+if __name__ == '__main__':
+    unittest.main()
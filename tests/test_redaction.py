@@ -0,0 +1,202 @@
+import unittest
+import dataclasses
+import io
+import json
+import logging
+import re
+from io import StringIO
+import sys
+from pathlib import Path
+
+# Add the src directory to the Python path if not already there
+src_path = Path(__file__).resolve().parent.parent / 'src'
+if str(src_path) not in sys.path:
+    sys.path.insert(0, str(src_path))
+
+from tracelight import RedactionPolicy, JsonLinesWriter, traced
+from tracelight.agent_utils import traced_tool
+from tracelight.core import capture_snapshot, log_exception_state
+from tracelight.detach import detach
+from tracelight.redaction import REDACTED
+from tracelight.serializers import SerializerRegistry
+
+EMAIL = r"[\w.+-]+@[\w-]+\.[\w.]+"
+
+
+@dataclasses.dataclass
+class User:
+    name: str
+    ssn: str
+
+
+class TestRedactionPolicy(unittest.TestCase):
+    def test_name_rules(self):
+        policy = RedactionPolicy(names=["password"],
+                                 name_patterns=["*token*", re.compile(r"secret_\d+")])
+        self.assertTrue(policy.matches_name("password"))
+        self.assertTrue(policy.matches_name("PASSWORD"))
+        self.assertTrue(policy.matches_name("api_token_value"))
+        self.assertTrue(policy.matches_name("secret_42"))
+        # Regexes must match the whole name
+        self.assertFalse(policy.matches_name("secret_42x"))
+        self.assertFalse(policy.matches_name("username"))
+
+    def test_regex_alternation_matches_whole_name(self):
+        policy = RedactionPolicy(name_patterns=[re.compile("token|secret")])
+        self.assertTrue(policy.matches_name("token"))
+        self.assertTrue(policy.matches_name("secret"))
+        self.assertFalse(policy.matches_name("tokenizer"))
+        self.assertFalse(policy.matches_name("secrets"))
+
+    def test_case_sensitive(self):
+        policy = RedactionPolicy(names=["password"], name_patterns=["*Token"],
+                                 case_sensitive=True)
+        self.assertTrue(policy.matches_name("password"))
+        self.assertFalse(policy.matches_name("Password"))
+        self.assertTrue(policy.matches_name("apiToken"))
+        self.assertFalse(policy.matches_name("apitoken"))
+
+    def test_name_decisions_are_cached(self):
+        policy = RedactionPolicy(name_patterns=[f"*rule{i}*" for i in range(200)])
+        self.assertFalse(policy.matches_name("harmless"))
+        self.assertIn("harmless", policy._cache)
+        self.assertTrue(policy.matches_name("x_rule150_y"))
+        # A cached decision is served without consulting the pattern again
+        policy._glob_pattern = None
+        self.assertTrue(policy.matches_name("x_rule150_y"))
+
+    def test_redact_text(self):
+        policy = RedactionPolicy(value_patterns=[EMAIL, r"Bearer \S+"])
+        self.assertEqual(policy.redact_text("mail a@b.io with Bearer abc123"),
+                         f"mail {REDACTED} with {REDACTED}")
+        self.assertEqual(RedactionPolicy().redact_text("a@b.io"), "a@b.io")
+
+    def test_value_patterns_compile_independently(self):
+        policy = RedactionPolicy(value_patterns=[
+            r"(?i)bearer \S+",
+            r"key=(?P<value>\w+)",
+            r"pin=(?P<value>\d+)",
+            r"(['\"])secret\1",
+            re.compile(r"(\w)\1{3,}"),
+        ])
+        self.assertEqual(policy.redact_text("BEARER abc key=k1 pin=42 'secret' xaaaay"),
+                         f"{REDACTED} {REDACTED} {REDACTED} {REDACTED} x{REDACTED}y")
+
+    def test_name_regex_keeps_flags(self):
+        policy = RedactionPolicy(name_patterns=[re.compile(r"(?x) api _ key"), "*token*"],
+                                 case_sensitive=True)
+        self.assertTrue(policy.matches_name("api_key"))
+        self.assertTrue(policy.matches_name("token"))
+        self.assertFalse(policy.matches_name("API_KEY"))
+
+    def test_field_rules(self):
+        policy = RedactionPolicy(fields=["User.ssn"])
+        data = {"name": "ann", "ssn": "123-45-6789"}
+        self.assertEqual(policy.redact_fields(User, data), {"name": "ann", "ssn": REDACTED})
+        self.assertIs(policy.redact_fields(dict, data), data)
+        with self.assertRaises(ValueError):
+            RedactionPolicy(fields=["ssn"])
+
+    def test_detach_applies_policy(self):
+        policy = RedactionPolicy(names=["password"], value_patterns=[EMAIL])
+        value = {"login": {"email": "ann@example.com", "password": "hunter2"},
+                 "notes": ["contact bob@example.org"]}
+        self.assertEqual(detach(value, policy=policy),
+                         {"login": {"email": REDACTED, "password": REDACTED},
+                          "notes": [f"contact {REDACTED}"]})
+
+
+class TestCaptureRedaction(unittest.TestCase):
+    def setUp(self):
+        self.policy = RedactionPolicy(names=["password"], name_patterns=["*token*"],
+                                      value_patterns=[EMAIL], fields=["User.ssn"])
+        self.log_stream = StringIO()
+        self.logger = logging.getLogger(f"test_redaction_{id(self)}")
+        self.logger.setLevel(logging.DEBUG)
+        self.logger.handlers[:] = [logging.StreamHandler(self.log_stream)]
+        self.logger.propagate = False
+
+    def failing_login(self):
+        password = "hunter2"
+        auth_token = "tok-123"
+        payload = {"email": "ann@example.com", "api_token": "tok-456"}
+        raise ValueError("login failed for ann@example.com")
+
+    def test_snapshot_locals_and_message(self):
+        try:
+            self.failing_login()
+        except ValueError as e:
+            snapshot = capture_snapshot(e, redaction=self.policy)
+        frame_locals = snapshot.frames[-1].locals
+        self.assertEqual(frame_locals["password"], REDACTED)
+        self.assertEqual(frame_locals["auth_token"], REDACTED)
+        self.assertEqual(frame_locals["payload"], {"email": REDACTED, "api_token": REDACTED})
+        self.assertEqual(snapshot.error, f"login failed for {REDACTED}")
+
+    def test_log_output(self):
+        try:
+            self.failing_login()
+        except ValueError as e:
+            error_data = log_exception_state(e, self.logger, redaction=self.policy)
+        output = self.log_stream.getvalue()
+        for secret in ("hunter2", "tok-123", "tok-456", "ann@example.com"):
+            self.assertNotIn(secret, output)
+            self.assertNotIn(secret, json.dumps(error_data, default=str))
+
+    def test_serializer_fields(self):
+        registry = SerializerRegistry()
+        registry.register(User, dataclasses.asdict)
+        user = User("ann", "123-45-6789")
+        try:
+            raise RuntimeError(user.name)
+        except RuntimeError as e:
+            error_data = log_exception_state(e, self.logger, serializers=registry,
+                                             redaction=self.policy)
+        self.assertEqual(error_data["frames"][-1]["locals"]["user"],
+                         {"name": "ann", "ssn": REDACTED})
+        self.assertNotIn("123-45-6789", self.log_stream.getvalue())
+
+    def test_repr_of_live_objects(self):
+        class Account:
+            def __repr__(self):
+                return "Account(owner=ann@example.com)"
+
+        account = Account()
+        try:
+            raise RuntimeError("boom")
+        except RuntimeError as e:
+            error_data = log_exception_state(e, self.logger, redaction=self.policy)
+        self.assertEqual(error_data["frames"][-1]["locals"]["account"],
+                         f"Account(owner={REDACTED})")
+
+    def test_jsonl_writer(self):
+        sink = io.StringIO()
+        writer = JsonLinesWriter(sink)
+        try:
+            self.failing_login()
+        except ValueError as e:
+            writer.write_exception(e, redaction=self.policy)
+        text = sink.getvalue()
+        for secret in ("hunter2", "tok-123", "ann@example.com"):
+            self.assertNotIn(secret, text)
+
+    def test_decorators(self):
+        @traced(logger=self.logger, reraise=False, redaction=self.policy)
+        def login(email, password):
+            raise ValueError(email)
+
+        @traced_tool(logger=self.logger, redaction=self.policy)
+        def tool(email, password):
+            raise ValueError(email)
+
+        login("ann@example.com", "hunter2")
+        response = tool("ann@example.com", "hunter2")
+        self.assertEqual(response["error"], REDACTED)
+        self.assertEqual(response["frames"][-1]["locals"],
+                         {"email": REDACTED, "password": REDACTED})
+        self.assertNotIn("ann@example.com", json.dumps(response, default=str))
+        self.assertNotIn("ann@example.com", self.log_stream.getvalue())
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,72 @@
+import unittest
+import logging
+from io import StringIO
+import sys
+from pathlib import Path
+
+# Add the src directory to the Python path if not already there
+src_path = Path(__file__).resolve().parent.parent / 'src'
+if str(src_path) not in sys.path:
+    sys.path.insert(0, str(src_path))
+
+from tracelight.core import log_exception_state
+from tracelight.relevance import relevant_names
+
+
+def compute(order, rates, *extra, **options):
+    unrelated_a = "a" * 100
+    unrelated_b = list(range(100))
+    unrelated_c = {"x": 1}
+    unrelated_d = None
+    unrelated_e = 0
+    total = order["quantity"]
+    return total / rates[order["currency"]]
+
+
+class TestRelevantNames(unittest.TestCase):
+    def test_names_on_failing_line_and_arguments(self):
+        code = compute.__code__
+        failing_line = code.co_firstlineno + 7
+        names = relevant_names(code, failing_line, context_lines=1)
+        self.assertEqual(names, {"order", "rates", "extra", "options", "total"})
+        # Cached per (code object, line)
+        self.assertIs(relevant_names(code, failing_line, context_lines=1), names)
+
+    def test_closure_names_are_included(self):
+        def outer(values, divisor):
+            return [value / divisor for value in values]
+
+        names = relevant_names(outer.__code__, outer.__code__.co_firstlineno + 1, 0)
+        self.assertTrue({"values", "divisor"} <= names)
+
+
+class TestRelevantCapture(unittest.TestCase):
+    def setUp(self):
+        # Create a StringIO object to capture log output
+        self.log_output = StringIO()
+        self.handler = logging.StreamHandler(self.log_output)
+        self.logger = logging.getLogger("test_relevance")
+        self.logger.addHandler(self.handler)
+        self.logger.setLevel(logging.DEBUG)
+
+    def tearDown(self):
+        self.logger.removeHandler(self.handler)
+        self.handler.close()
+
+    def test_only_relevant_locals_captured(self):
+        try:
+            compute({"quantity": 3, "currency": "EUR"}, {"EUR": 0})
+        except ZeroDivisionError as e:
+            result = log_exception_state(e, self.logger, relevant_locals=True)
+
+        frame = result["frames"][-1]
+        self.assertEqual(frame["function"], "compute")
+        self.assertIn("order", frame["locals"])
+        self.assertIn("rates", frame["locals"])
+        self.assertIn("total", frame["locals"])
+        self.assertNotIn("unrelated_a", frame["locals"])
+        self.assertNotIn("unrelated_b", self.log_output.getvalue())
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,168 @@
+import unittest
+import io
+import json
+import logging
+import time
+from io import StringIO
+import sys
+from pathlib import Path
+
+# Add the src directory to the Python path if not already there
+src_path = Path(__file__).resolve().parent.parent / 'src'
+if str(src_path) not in sys.path:
+    sys.path.insert(0, str(src_path))
+
+from tracelight import AdaptiveSampler, JsonLinesWriter, log_exception_state, traced
+from tracelight.agent_utils import traced_tool
+from tracelight.core import capture_snapshot
+from tracelight.metrics import metrics
+from tracelight.sampling import COUNT, FRAMES, LOCALS
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+def fail(value):
+    secret = value * 2
+    raise ValueError("failed")
+
+
+class TestAdaptiveSampler(unittest.TestCase):
+    def test_levels_follow_rate(self):
+        clock = FakeClock()
+        sampler = AdaptiveSampler(locals_rate=2, frames_rate=4, clock=clock)
+        levels = [sampler.choose() for _ in range(6)]
+        self.assertEqual(levels, [LOCALS, LOCALS, FRAMES, FRAMES, COUNT, COUNT])
+        self.assertEqual(sampler.counts(), {LOCALS: 2, FRAMES: 2, COUNT: 2})
+
+        # Two windows later the rate has decayed
+        clock.now += 2.5
+        self.assertEqual(sampler.rate(), 0)
+        self.assertEqual(sampler.choose(), LOCALS)
+
+    def test_rolling_window_weights_previous(self):
+        clock = FakeClock()
+        sampler = AdaptiveSampler(window=1.0, clock=clock)
+        for _ in range(10):
+            sampler.choose()
+        clock.now += 1.5
+        # Half of the previous window is still inside the sliding window
+        self.assertAlmostEqual(sampler.rate(), 5.0)
+
+    def test_cpu_budget_lowers_level(self):
+        clock = FakeClock()
+        sampler = AdaptiveSampler(locals_rate=100, frames_rate=1000, cpu_budget=0.01,
+                                  clock=clock)
+        self.assertEqual(sampler.choose(), LOCALS)
+        sampler.record_cost(0.05)
+        self.assertEqual(sampler.choose(), FRAMES)
+        clock.now += 3
+        self.assertEqual(sampler.choose(), LOCALS)
+
+
+class SlowRepr:
+    def __repr__(self):
+        time.sleep(0.02)
+        return "<SlowRepr>"
+
+
+def fail_slowly():
+    payload = SlowRepr()
+    raise ValueError("failed")
+
+
+class TestSampledCapture(unittest.TestCase):
+    def setUp(self):
+        self.log_stream = StringIO()
+        self.logger = logging.getLogger("test_sampling")
+        self.logger.setLevel(logging.DEBUG)
+        self.logger.handlers[:] = [logging.StreamHandler(self.log_stream)]
+        self.logger.propagate = False
+        self.clock = FakeClock()
+        self.sampler = AdaptiveSampler(locals_rate=1, frames_rate=2, clock=self.clock)
+
+    def log_failure(self):
+        try:
+            fail(21)
+        except ValueError as e:
+            return log_exception_state(e, self.logger, sampler=self.sampler)
+
+    def test_each_event_records_its_level(self):
+        full, frames_only, counted = (self.log_failure() for _ in range(3))
+        self.assertEqual(full["sampling_level"], LOCALS)
+        self.assertEqual(full["frames"][-1]["locals"]["secret"], 42)
+
+        self.assertEqual(frames_only["sampling_level"], FRAMES)
+        self.assertEqual(frames_only["frames"][-1]["function"], "fail")
+        self.assertTrue(frames_only["frames"][-1]["locals_omitted"])
+
+        self.assertEqual(counted["sampling_level"], COUNT)
+        self.assertEqual(counted["frames"], [])
+        self.assertTrue(counted["suppressed"])
+        self.assertEqual(counted["fingerprint"], full["fingerprint"])
+
+        output = self.log_stream.getvalue()
+        self.assertEqual(output.count("Logging exception state for"), 2)
+        self.assertIn("Locals not captured (sampling level frames)", output)
+
+    def test_render_time_counts_against_cpu_budget(self):
+        sampler = AdaptiveSampler(locals_rate=100, frames_rate=1000, cpu_budget=0.05,
+                                  clock=self.clock)
+        levels = []
+        for _ in range(6):
+            try:
+                fail_slowly()
+            except ValueError as e:
+                levels.append(log_exception_state(e, self.logger,
+                                                  sampler=sampler)["sampling_level"])
+        # Capture alone is far below the budget; the slow repr is not
+        self.assertEqual(levels[0], LOCALS)
+        self.assertIn(FRAMES, levels)
+
+    def test_no_sampler_no_level(self):
+        try:
+            fail(1)
+        except ValueError as e:
+            error_data = log_exception_state(e, self.logger)
+        self.assertNotIn("sampling_level", error_data)
+
+    def test_metrics(self):
+        before = metrics.stats()
+        for _ in range(3):
+            self.log_failure()
+        after = metrics.stats()
+        self.assertEqual(after["sampled_frames"] - before["sampled_frames"], 1)
+        self.assertEqual(after["sampled_count"] - before["sampled_count"], 1)
+
+    def test_decorators(self):
+        @traced(logger=self.logger, reraise=False, sampler=self.sampler)
+        def traced_fail():
+            fail(1)
+
+        @traced_tool(logger=self.logger, sampler=self.sampler)
+        def tool_fail():
+            fail(1)
+
+        traced_fail()
+        self.assertEqual(tool_fail()["sampling_level"], FRAMES)
+        response = tool_fail()
+        self.assertEqual((response["sampling_level"], response["frames"]), (COUNT, []))
+
+    def test_jsonl(self):
+        sink = io.StringIO()
+        writer = JsonLinesWriter(sink)
+        try:
+            fail(1)
+        except ValueError as e:
+            writer.write_snapshot(capture_snapshot(e, sampler=self.sampler))
+        first = json.loads(sink.getvalue().splitlines()[0])
+        self.assertEqual(first["sampling_level"], LOCALS)
+
+
+if __name__ == "__main__":
+    unittest.main()
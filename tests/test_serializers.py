@@ -0,0 +1,131 @@
+import unittest
+import enum
+import logging
+from collections import namedtuple
+from dataclasses import dataclass
+from decimal import Decimal
+from io import StringIO
+import sys
+from pathlib import Path
+
+# Add the src directory to the Python path if not already there
+src_path = Path(__file__).resolve().parent.parent / 'src'
+if str(src_path) not in sys.path:
+    sys.path.insert(0, str(src_path))
+
+from tracelight.core import log_exception_state
+from tracelight.serializers import KEEP_VALUE, SerializerRegistry
+
+
+@dataclass
+class Point:
+    x: int
+    y: int
+
+
+Pair = namedtuple("Pair", "left right")
+
+
+class Color(enum.Enum):
+    RED = 1
+
+
+class FakeV2Model:
+    """Quacks like a Pydantic v2 model without requiring pydantic."""
+    model_fields = {"name": None}
+
+    def __init__(self, name):
+        self.name = name
+
+    def model_dump(self):
+        return {"name": self.name}
+
+
+class HasUnrelatedDict:
+    def __init__(self):
+        self.called = False
+
+    def dict(self):
+        self.called = True
+        return {"should": "not be used"}
+
+
+class TestSerializerRegistry(unittest.TestCase):
+    def setUp(self):
+        self.registry = SerializerRegistry()
+
+    def serialize(self, value):
+        return self.registry.resolve(type(value))(value)
+
+    def test_builtin_handlers(self):
+        self.assertIs(self.registry.resolve(str), KEEP_VALUE)
+        self.assertIs(self.registry.resolve(bool), KEEP_VALUE)
+        self.assertEqual(self.serialize(Point(1, 2)), {"x": 1, "y": 2})
+        self.assertEqual(self.serialize(Pair(1, 2)), {"left": 1, "right": 2})
+        self.assertEqual(self.serialize(Color.RED), "Color.RED")
+        self.assertEqual(self.serialize(FakeV2Model("a")), {"name": "a"})
+        self.assertIsNone(self.registry.resolve(Decimal))
+
+    def test_unrelated_dict_method_is_not_called(self):
+        value = HasUnrelatedDict()
+        self.assertIsNone(self.registry.resolve(type(value)))
+
+    def test_resolution_is_cached_per_class(self):
+        calls = []
+
+        def predicate(cls):
+            calls.append(cls)
+            return cls is Decimal
+
+        self.registry.register_predicate(predicate, str)
+        for _ in range(3):
+            self.assertIs(self.registry.resolve(Decimal), str)
+        self.assertEqual(calls, [Decimal])
+
+    def test_register_overrides_along_mro(self):
+        class Base:
+            pass
+
+        class Child(Base):
+            pass
+
+        self.registry.register(Base, lambda value: "base")
+        self.assertEqual(self.serialize(Child()), "base")
+        self.registry.register(Child, lambda value: "child")
+        self.assertEqual(self.serialize(Child()), "child")
+
+
+class TestSerializedLocals(unittest.TestCase):
+    def setUp(self):
+        # Create a StringIO object to capture log output
+        self.log_output = StringIO()
+        self.handler = logging.StreamHandler(self.log_output)
+        self.logger = logging.getLogger("test_serializers")
+        self.logger.addHandler(self.handler)
+        self.logger.setLevel(logging.DEBUG)
+
+    def tearDown(self):
+        self.logger.removeHandler(self.handler)
+        self.handler.close()
+
+    def test_locals_use_registry(self):
+        registry = SerializerRegistry()
+        registry.register(Decimal, str)
+        try:
+            point = Point(1, 2)
+            amount = Decimal("1.50")
+            other = HasUnrelatedDict()
+            raise ValueError("boom")
+        except ValueError as e:
+            result = log_exception_state(e, self.logger, serializers=registry)
+
+        frame_locals = result["frames"][0]["locals"]
+        self.assertEqual(frame_locals["point"], {"x": 1, "y": 2})
+        self.assertEqual(frame_locals["amount"], "1.50")
+        self.assertIsInstance(frame_locals["other"], str)
+        self.assertFalse(other.called)
+        self.assertIn("point = {'x': 1, 'y': 2}", self.log_output.getvalue())
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,124 @@
+import unittest
+import logging
+import os
+import tempfile
+import tokenize
+from io import StringIO
+from unittest import mock
+import sys
+from pathlib import Path
+
+# Add the src directory to the Python path if not already there
+src_path = Path(__file__).resolve().parent.parent / 'src'
+if str(src_path) not in sys.path:
+    sys.path.insert(0, str(src_path))
+
+from tracelight.core import log_exception_state
+from tracelight.source import SourceCache
+
+MODULE_SOURCE = """\
+def compute(value):
+    scale = 10
+    result = scale / value
+    return result
+
+
+def other():
+    return 1
+"""
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def load_module(path):
+    namespace = {}
+    with open(path) as source:
+        exec(compile(source.read(), path, "exec"), namespace)
+    return namespace
+
+
+class TestSourceCache(unittest.TestCase):
+    def setUp(self):
+        handle, self.path = tempfile.mkstemp(suffix=".py")
+        with os.fdopen(handle, "w") as source:
+            source.write(MODULE_SOURCE)
+        self.namespace = load_module(self.path)
+        self.code = self.namespace["compute"].__code__
+
+    def tearDown(self):
+        os.unlink(self.path)
+
+    def test_lines_with_context(self):
+        cache = SourceCache()
+        self.assertEqual(cache.source_lines(self.code, 3, context=1), [
+            (2, "    scale = 10"),
+            (3, "    result = scale / value"),
+            (4, "    return result"),
+        ])
+        self.assertEqual(cache.line(self.code, 3), "    result = scale / value")
+
+    def test_repeated_lookups_do_no_io(self):
+        cache = SourceCache(check_interval=60.0, clock=FakeClock())
+        cache.source_lines(self.code, 3, context=2)
+        with mock.patch.object(tokenize, "open", side_effect=AssertionError("read")), \
+                mock.patch.object(os, "stat", side_effect=AssertionError("stat")):
+            for _ in range(100):
+                self.assertEqual(len(cache.source_lines(self.code, 3, context=1)), 3)
+
+    def test_changed_file_is_reloaded_after_check_interval(self):
+        clock = FakeClock()
+        cache = SourceCache(check_interval=5.0, clock=clock)
+        self.assertEqual(cache.line(self.code, 2), "    scale = 10")
+        with open(self.path, "w") as source:
+            source.write(MODULE_SOURCE.replace("scale = 10", "scale = 1000"))
+        os.utime(self.path, (1, 1))
+        self.assertEqual(cache.line(self.code, 2), "    scale = 10")
+        clock.now = 10.0
+        self.assertEqual(cache.line(self.code, 2), "    scale = 1000")
+
+    def test_lru_eviction(self):
+        cache = SourceCache(max_entries=1)
+        cache.line(self.code, 3)
+        cache.line(self.namespace["other"].__code__, 8)
+        self.assertEqual(len(cache), 1)
+
+    def test_missing_source(self):
+        code = compile("x = 1", "<generated>", "exec")
+        self.assertEqual(SourceCache().source_lines(code, 1, context=2), [])
+
+
+class TestSourceContextLogging(unittest.TestCase):
+    def setUp(self):
+        # Create a StringIO object to capture log output
+        self.log_output = StringIO()
+        self.handler = logging.StreamHandler(self.log_output)
+        self.logger = logging.getLogger("test_source")
+        self.logger.addHandler(self.handler)
+        self.logger.setLevel(logging.DEBUG)
+
+    def tearDown(self):
+        self.logger.removeHandler(self.handler)
+        self.handler.close()
+
+    def test_frames_include_source(self):
+        try:
+            divisor = 0
+            1 / divisor
+        except ZeroDivisionError as e:
+            result = log_exception_state(e, self.logger, source_context=1)
+
+        source = dict(result["frames"][0]["source"])
+        line = result["frames"][0]["line"]
+        self.assertEqual(source[line].strip(), "1 / divisor")
+        self.assertEqual(source[line - 1].strip(), "divisor = 0")
+        self.assertIn(f"> {line:4d} |             1 / divisor", self.log_output.getvalue())
+
+
+if __name__ == '__main__':
+    unittest.main()